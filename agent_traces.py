@@ -0,0 +1,406 @@
+# Compact agent traces and local trajectory metrics for agent datasets
+# (prompt / response / developer_instruction / tool_declarations /
+# intermediate_events).
+#
+#   traces = AgentTraces.from_dataset(dataset)
+#   traces.tool_sets        # each distinct tool_declarations list, stored once
+#   traces.rows             # one row per trace, with a tool_set_id
+#   traces.events           # one row per function call / response / text part
+#   scores = score_trajectories(traces, expected=dataset["reference_trajectory"])
+#   result, escalated = evaluate_tool_use_with_escalation(AdaptiveRubricEvals(), dataset)
+#
+# Production agent logs repeat the same tool schemas on every row. Interning
+# keeps one copy per distinct schema (rows refer to it by id, and to_dataset()
+# hands the same object back to every row), and calls are flat categorical
+# columns instead of nested dicts, so trajectory metrics run over whole
+# columns with the kernels in reference_metrics.
+#
+# An expected trajectory is a list of {"tool_name": ..., "tool_input": {...}}
+# (the reference_trajectory format of the evals service); {"name", "args"}
+# entries are accepted too.
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+from pydantic.v1 import BaseModel
+
+from instrumentation import get_instrumentation, timed
+
+TRACE_COLUMNS = ["tool_declarations", "intermediate_events"]
+PART_KINDS = ["function_call", "function_response", "text"]
+EVENT_COLUMNS = ["row_index", "event_index", "role", "kind", "name", "payload"]
+
+TRAJECTORY_METRIC_NAMES = [
+    "tool_name_match",
+    "tool_name_recall",
+    "argument_match",
+    "call_count_match",
+    "order_match",
+    "trajectory_exact_match",
+    "declared_tool_rate",
+]
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _plain(value):
+    # Lists read back from Parquet/Arrow come as numpy arrays.
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_CANONICAL_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"), default=_plain)
+
+
+def canonical_json(value) -> str:
+    """Key-sorted compact JSON; equal values give equal strings."""
+    return _CANONICAL_ENCODER.encode(value)
+
+
+def _load(value):
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def intern_tool_declarations(values) -> tuple:
+    """Maps each row's tool_declarations to an id in a table of distinct ones.
+
+    Returns (ids, tool_sets): ids[i] is the position in tool_sets of row i's
+    declarations, or -1 if the row has none.
+    """
+    ids = np.full(len(values), -1, dtype=np.int64)
+    tool_sets = []
+    by_key = {}
+    # Rows built from the same record share the object; skip re-serializing it.
+    by_object = {}
+    for i, value in enumerate(values):
+        if _is_missing(value):
+            continue
+        known = by_object.get(id(value))
+        if known is None:
+            declarations = _load(value)
+            key = canonical_json(declarations)
+            known = by_key.get(key)
+            if known is None:
+                known = by_key[key] = len(tool_sets)
+                tool_sets.append(declarations)
+            by_object[id(value)] = known
+        ids[i] = known
+    return ids, tool_sets
+
+
+def declared_tools(tool_sets: list) -> pd.DataFrame:
+    """One row per (tool_set_id, name) function declared in each tool set."""
+    set_ids, names = [], []
+    for set_id, declarations in enumerate(tool_sets):
+        for tool in declarations or []:
+            for function in (tool or {}).get("function_declarations") or []:
+                set_ids.append(set_id)
+                names.append(function.get("name"))
+    return pd.DataFrame({"tool_set_id": np.asarray(set_ids, dtype=np.int64), "name": names})
+
+
+def flatten_events(values) -> pd.DataFrame:
+    """One row per content part of every row's intermediate_events.
+
+    ``payload`` holds the canonical JSON of a call's args, a response's
+    response or a text part's text. Repeating columns are categorical.
+    """
+    columns = {name: [] for name in EVENT_COLUMNS}
+    for row_index, events in enumerate(values):
+        if _is_missing(events):
+            continue
+        for event_index, event in enumerate(_load(events)):
+            content = (event or {}).get("content") or {}
+            role = content.get("role")
+            for part in content.get("parts") or []:
+                for kind in PART_KINDS:
+                    if kind not in part:
+                        continue
+                    body = part[kind]
+                    if kind == "text":
+                        name, payload = None, body
+                    else:
+                        name = (body or {}).get("name")
+                        payload = (body or {}).get("args" if kind == "function_call" else "response")
+                    columns["row_index"].append(row_index)
+                    columns["event_index"].append(event_index)
+                    columns["role"].append(role)
+                    columns["kind"].append(kind)
+                    columns["name"].append(name)
+                    columns["payload"].append(canonical_json(payload))
+                    break
+
+    events = pd.DataFrame(columns, columns=EVENT_COLUMNS)
+    events["row_index"] = events["row_index"].astype(np.int64)
+    events["event_index"] = events["event_index"].astype(np.int64)
+    for name in ("role", "kind", "name", "payload"):
+        events[name] = events[name].astype("category")
+    return events
+
+
+def flatten_trajectory(values) -> pd.DataFrame:
+    """One row per expected tool call: row_index, name, payload (canonical args)."""
+    rows, names, payloads = [], [], []
+    for row_index, trajectory in enumerate(values):
+        if _is_missing(trajectory):
+            continue
+        for call in _load(trajectory):
+            rows.append(row_index)
+            names.append(call.get("tool_name", call.get("name")))
+            payloads.append(canonical_json(call.get("tool_input", call.get("args"))))
+    return pd.DataFrame(
+        {"row_index": np.asarray(rows, dtype=np.int64), "name": names, "payload": payloads}
+    )
+
+
+class AgentTraces(BaseModel):
+    """An agent dataset with interned tool declarations and flat events."""
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    # Every dataset column except TRACE_COLUMNS, plus tool_set_id (-1: none).
+    rows: pd.DataFrame
+    # tool_set_id -> that tool_declarations list, shared by all its rows.
+    tool_sets: list
+    # EVENT_COLUMNS, ordered by row, event and part.
+    events: pd.DataFrame
+
+    @classmethod
+    @timed("flatten_agent_traces", rows=lambda traces: len(traces.rows))
+    def from_dataset(cls, dataset: pd.DataFrame) -> "AgentTraces":
+        dataset = dataset.reset_index(drop=True)
+        if "tool_declarations" in dataset:
+            tool_set_ids, tool_sets = intern_tool_declarations(dataset["tool_declarations"].tolist())
+        else:
+            tool_set_ids, tool_sets = np.full(len(dataset), -1, dtype=np.int64), []
+        if "intermediate_events" in dataset:
+            events = flatten_events(dataset["intermediate_events"].tolist())
+        else:
+            events = flatten_events([])
+        rows = dataset.drop(columns=[c for c in TRACE_COLUMNS if c in dataset])
+        rows["tool_set_id"] = tool_set_ids
+        return cls(rows=rows, tool_sets=tool_sets, events=events)
+
+    def calls(self) -> pd.DataFrame:
+        """The function_call events."""
+        return self.events[self.events["kind"] == "function_call"]
+
+    def to_dataset(self, row_indices=None) -> pd.DataFrame:
+        """Rebuilds the nested dataset shape the judge expects.
+
+        Rows using the same tool set share one tool_declarations object.
+        Events keep their content role and parts.
+        """
+        rows = self.rows if row_indices is None else self.rows.iloc[np.asarray(row_indices)]
+        dataset = rows.drop(columns=["tool_set_id"]).reset_index(drop=True)
+        dataset["tool_declarations"] = [
+            self.tool_sets[i] if i >= 0 else None for i in rows["tool_set_id"].tolist()
+        ]
+
+        events = self.events
+        if row_indices is not None:
+            events = events[events["row_index"].isin(rows.index)]
+        nested = {}
+        for row_index, event_index, role, kind, name, payload in events.itertuples(index=False, name=None):
+            row_events = nested.setdefault(row_index, [])
+            if not row_events or row_events[-1][0] != event_index:
+                content = {"parts": []}
+                if not _is_missing(role):
+                    content["role"] = role
+                row_events.append((event_index, {"content": content}))
+            body = json.loads(payload)
+            if kind != "text":
+                body = {"name": name, "args" if kind == "function_call" else "response": body}
+            row_events[-1][1]["content"]["parts"].append({kind: body})
+        dataset["intermediate_events"] = [
+            [event for _, event in nested.get(row_index, [])] for row_index in rows.index
+        ]
+        return dataset
+
+
+def _row_lengths(row_index: np.ndarray, rows: int) -> np.ndarray:
+    return np.bincount(row_index, minlength=rows).astype(np.int64)
+
+
+@timed("trajectory_metrics", rows=len)
+def score_trajectories(traces: AgentTraces, expected=None) -> pd.DataFrame:
+    """Scores every trace's tool calls, one float column per metric.
+
+    ``expected`` holds one expected trajectory per row (None where there is
+    none). Metrics comparing against it are NaN on rows without one;
+    tool_name_recall is the share of expected calls whose tool is called at
+    all, whatever the arguments (1.0 when nothing is expected);
+    declared_tool_rate (share of calls to a tool the row declares, 1.0
+    without calls) needs no expectation.
+    """
+    from reference_metrics import lcs_lengths, multiset_overlap, sequences_equal
+
+    rows = len(traces.rows)
+    calls = traces.calls()
+    predicted_rows = calls["row_index"].to_numpy()
+    predicted_lengths = _row_lengths(predicted_rows, rows)
+    predicted_names = calls["name"].astype(object).tolist()
+    predicted_payloads = calls["payload"].astype(object).tolist()
+
+    scores = {}
+    tools = declared_tools(traces.tool_sets)
+    tool_set_ids = traces.rows["tool_set_id"].to_numpy()
+    name_ids, names = pd.factorize(pd.Series(predicted_names + tools["name"].tolist(), dtype=object))
+    vocabulary = max(len(names), 1)
+    declared_keys = tools["tool_set_id"].to_numpy() * vocabulary + name_ids[len(predicted_names):]
+    call_keys = tool_set_ids[predicted_rows] * vocabulary + name_ids[:len(predicted_names)]
+    declared = np.isin(call_keys, declared_keys) & (tool_set_ids[predicted_rows] >= 0)
+    declared_count = np.bincount(predicted_rows, weights=declared, minlength=rows)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores["declared_tool_rate"] = np.where(predicted_lengths > 0, declared_count / predicted_lengths, 1.0)
+
+    if expected is not None:
+        expected = list(expected)
+        if len(expected) != rows:
+            raise ValueError(f"Expected {rows} expected trajectories, got {len(expected)}.")
+        reference = flatten_trajectory(expected)
+        reference_rows = reference["row_index"].to_numpy()
+        reference_lengths = _row_lengths(reference_rows, rows)
+
+        # Shared ids for names and for (name, args) calls on both sides.
+        name_ids, names = pd.factorize(pd.Series(predicted_names + reference["name"].tolist(), dtype=object))
+        payload_ids, payloads = pd.factorize(pd.Series(predicted_payloads + reference["payload"].tolist(), dtype=object))
+        call_ids, call_values = pd.factorize(name_ids.astype(np.int64) * max(len(payloads), 1) + payload_ids)
+        split = len(predicted_names)
+        name_vocabulary, call_vocabulary = max(len(names), 1), max(len(call_values), 1)
+        predicted_name_ids, reference_name_ids = name_ids[:split].astype(np.int64), name_ids[split:].astype(np.int64)
+        predicted_call_ids, reference_call_ids = call_ids[:split].astype(np.int64), call_ids[split:].astype(np.int64)
+
+        name_overlap = multiset_overlap(
+            predicted_lengths, predicted_name_ids, reference_lengths, reference_name_ids, name_vocabulary
+        )
+        call_overlap = multiset_overlap(
+            predicted_lengths, predicted_call_ids, reference_lengths, reference_call_ids, call_vocabulary
+        )
+        in_order = lcs_lengths(
+            predicted_lengths, predicted_name_ids, reference_lengths, reference_name_ids, name_vocabulary
+        )
+        same_count = predicted_lengths == reference_lengths
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            argument_match = np.where(
+                reference_lengths > 0, call_overlap / reference_lengths, (predicted_lengths == 0).astype(float)
+            )
+            tool_name_recall = np.where(reference_lengths > 0, name_overlap / reference_lengths, 1.0)
+        has_expected = np.array([not _is_missing(value) for value in expected], dtype=bool)
+        expected_scores = {
+            "tool_name_match": (same_count & (name_overlap == reference_lengths)).astype(float),
+            "tool_name_recall": tool_name_recall,
+            "argument_match": argument_match,
+            "call_count_match": same_count.astype(float),
+            "order_match": (in_order == reference_lengths).astype(float),
+            "trajectory_exact_match": sequences_equal(
+                predicted_lengths, predicted_call_ids, reference_lengths, reference_call_ids
+            ),
+        }
+        for name, values in expected_scores.items():
+            scores[name] = np.where(has_expected, values, np.nan)
+
+    names = [name for name in TRAJECTORY_METRIC_NAMES if name in scores]
+    return pd.DataFrame({name: scores[name] for name in names})
+
+
+def _metric_results(scores: pd.DataFrame) -> list:
+    from vertexai import types
+
+    names = list(scores.columns)
+    cases = []
+    for row in scores.itertuples(index=False, name=None):
+        case = {}
+        for name, score in zip(names, row):
+            if math.isnan(score):
+                case[name] = types.EvalCaseMetricResult(metric_name=name, error_message="No expected trajectory for this row.")
+            else:
+                case[name] = types.EvalCaseMetricResult(metric_name=name, score=score)
+        cases.append(case)
+    return cases
+
+
+def evaluate_trajectory_metrics(dataset: pd.DataFrame, expected_column: str = "reference_trajectory"):
+    """An EvaluationResult with every trajectory metric per row of an agent dataset."""
+    from eval_results import build_evaluation_result
+
+    dataset = dataset.reset_index(drop=True)
+    traces = AgentTraces.from_dataset(dataset)
+    expected = dataset[expected_column] if expected_column in dataset else None
+    scores = score_trajectories(traces, expected)
+    return build_evaluation_result(_metric_results(scores), list(scores.columns), dataset=dataset)
+
+
+def evaluate_tool_use_with_escalation(
+    evals,
+    dataset: pd.DataFrame = None,
+    expected_column: str = "reference_trajectory",
+    judge_metric: str = "TOOL_USE_QUALITY",
+):
+    """Scores ``judge_metric`` locally where the trajectory settles it.
+
+    A row scores 1.0 without a judge call if its calls exactly match the
+    expected trajectory, and 0.0 if it calls a tool it doesn't declare or
+    none of the expected tools. Every other row, including the right tool
+    called with different arguments, is rebuilt from the interned traces and
+    judged through ``evals.evaluate``; local decisions are filed under the
+    key the judge returns (eval_results.result_key). Returns (eval_result,
+    escalated), where escalated lists the judged rows' row_index.
+    """
+    from vertexai import types
+
+    from eval_results import build_evaluation_result, result_key
+
+    if dataset is None:
+        dataset = evals.get_dataset_for_metric(judge_metric)
+    dataset = dataset.reset_index(drop=True)
+    traces = AgentTraces.from_dataset(dataset)
+    expected = dataset[expected_column] if expected_column in dataset else None
+    scores = score_trajectories(traces, expected)
+
+    undeclared = scores["declared_tool_rate"].to_numpy() < 1
+    if expected is not None:
+        exact = scores["trajectory_exact_match"].to_numpy() == 1
+        # Argument mismatches are left to the judge ("1 " vs 1 may be fine).
+        missed = scores["tool_name_recall"].to_numpy() == 0
+    else:
+        exact = missed = np.zeros(len(dataset), dtype=bool)
+    passed = exact & ~undeclared
+    failed = undeclared | missed
+    escalated_rows = np.flatnonzero(~passed & ~failed)
+
+    instrumentation = get_instrumentation()
+    instrumentation.count("trajectory_escalated_rows", len(escalated_rows))
+    instrumentation.count("trajectory_local_rows", len(dataset) - len(escalated_rows))
+
+    case_metric_results = _metric_results(scores)
+    key = result_key(judge_metric)
+    if len(escalated_rows):
+        judged, _ = evals.evaluate(judge_metric, traces.to_dataset(escalated_rows))
+        key = result_key(judge_metric, judged)
+        for case in judged.eval_case_results or []:
+            row = escalated_rows[case.eval_case_index]
+            for candidate in case.response_candidate_results or []:
+                case_metric_results[row].update(candidate.metric_results or {})
+
+    for row in np.flatnonzero(passed | failed).tolist():
+        if failed[row]:
+            reason = "calls a tool it doesn't declare" if undeclared[row] else "calls none of the expected tools"
+        else:
+            reason = "matches the expected trajectory exactly"
+        case_metric_results[row][key] = types.EvalCaseMetricResult(
+            metric_name=key,
+            score=0.0 if failed[row] else 1.0,
+            explanation=f"Decided locally: the trajectory {reason}.",
+        )
+
+    escalated = pd.DataFrame({"row_index": escalated_rows})
+    metric_names = list(scores.columns) + [key]
+    return build_evaluation_result(case_metric_results, metric_names, dataset=dataset), escalated
@@ -31,44 +31,27 @@ parameters = {
     # BIGQUERY_DESTINATION_PREFIX,
 }
 
-aiplatform.init(project=PROJECT_ID, location=LOCATION, staging_bucket="gs://auto_side_by_side")
+TEMPLATE_PATH = "https://us-kfp.pkg.dev/ml-pipeline/google-cloud-registry/autosxs-template/default"
+STAGING_BUCKET = "gs://auto_side_by_side"
 
-display_name= f'auto_side_by_side_qna_pipe-22'
-job = aiplatform.PipelineJob(
-    display_name=display_name,
-    pipeline_root=os.path.join("gs://auto_side_by_side", display_name),
-    template_path="https://us-kfp.pkg.dev/ml-pipeline/google-cloud-registry/autosxs-template/default",
-    parameter_values=parameters,
-    enable_caching=False,
-)
 
-# Run async (method unblocks). :contentReference[oaicite:5]{index=5}
-job.run()
-# print(f"Started: {job.resource_name}")
-#
-# terminal = {
-#     PipelineState.PIPELINE_STATE_SUCCEEDED,
-#     PipelineState.PIPELINE_STATE_FAILED,
-#     PipelineState.PIPELINE_STATE_CANCELLED,
-# }
-#
-# poll_s = 30
-# while True:
-#     # Re-fetch latest server-side state
-#     latest = aiplatform.PipelineJob.get(job.resource_name)
-#     state = latest.state
-#     state_name = state.name if hasattr(state, "name") else str(state)
-#
-#     print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] state={state_name}")
-#
-#     # Terminal states per PipelineState enum. :contentReference[oaicite:6]{index=6}
-#     if state in terminal or state_name in {s.name for s in terminal}:
-#         job = latest
-#         break
-#
-#     time.sleep(poll_s)
-#
-# if (job.state.name if hasattr(job.state, "name") else str(job.state)) != PipelineState.PIPELINE_STATE_SUCCEEDED.name:
-#     raise RuntimeError(f"Pipeline ended in {job.state}. Error: {getattr(job, 'error', None)}")
-#
-# print("Pipeline succeeded.")
+def create_pipeline_job(display_name: str, parameter_values: dict) -> aiplatform.PipelineJob:
+    """Builds (but doesn't start) an AutoSxS pipeline job."""
+    return aiplatform.PipelineJob(
+        display_name=display_name,
+        pipeline_root=os.path.join(STAGING_BUCKET, display_name),
+        template_path=TEMPLATE_PATH,
+        parameter_values=parameter_values,
+        enable_caching=False,
+    )
+
+
+if __name__ == "__main__":
+    aiplatform.init(project=PROJECT_ID, location=LOCATION, staging_bucket=STAGING_BUCKET)
+
+    display_name= f'auto_side_by_side_qna_pipe-22'
+    job = create_pipeline_job(display_name, parameters)
+
+    # Blocks until the pipeline finishes; use autosxs_job_manager.py to
+    # supervise many jobs concurrently instead.
+    job.run()
@@ -0,0 +1,258 @@
+# Submits many AutoSxS pipeline jobs and supervises them from one asyncio
+# loop, polling each with jittered exponential backoff instead of a thread
+# and a fixed sleep per job.
+#
+#   python autosxs_job_manager.py          # simulated jobs (FakePipelineJobService)
+#   python autosxs_job_manager.py --live   # real Vertex AI pipeline jobs
+
+import asyncio
+import random
+import sys
+import time
+
+from pydantic.v1 import BaseModel
+
+TERMINAL_STATES = {
+    "PIPELINE_STATE_SUCCEEDED",
+    "PIPELINE_STATE_FAILED",
+    "PIPELINE_STATE_CANCELLED",
+}
+
+
+class JobSpec(BaseModel):
+    display_name: str
+    parameter_values: dict
+
+
+class JobEvent(BaseModel):
+    """A state transition observed for one job."""
+
+    display_name: str
+    resource_name: str
+    previous_state: str = None
+    state: str
+    timestamp: float
+    error: str = None
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.state in TERMINAL_STATES
+
+
+class VertexPipelineJobService:
+    """Submits and polls real aiplatform.PipelineJob runs.
+
+    The SDK calls block, so they run in worker threads.
+    """
+
+    def __init__(self):
+        from google.cloud import aiplatform
+
+        from auto_side_by_side_async import LOCATION, PROJECT_ID, STAGING_BUCKET
+
+        aiplatform.init(project=PROJECT_ID, location=LOCATION, staging_bucket=STAGING_BUCKET)
+        self._aiplatform = aiplatform
+
+    async def submit(self, spec: JobSpec) -> str:
+        from auto_side_by_side_async import create_pipeline_job
+
+        def _submit():
+            job = create_pipeline_job(spec.display_name, spec.parameter_values)
+            job.submit()
+            return job.resource_name
+
+        return await asyncio.to_thread(_submit)
+
+    async def get_state(self, resource_name: str) -> tuple:
+        """Returns (state_name, error_message_or_None)."""
+
+        def _get():
+            job = self._aiplatform.PipelineJob.get(resource_name)
+            state = job.state
+            error = getattr(job, "error", None)
+            return (state.name if hasattr(state, "name") else str(state)), (str(error) if error else None)
+
+        return await asyncio.to_thread(_get)
+
+
+class FakePipelineJobService:
+    """Simulates pipeline jobs moving through their states.
+
+    Each job spends a random ``step_s`` range in every state of ``states``
+    and fails with probability ``failure_rate``.
+    """
+
+    def __init__(
+        self,
+        states: tuple = (
+            "PIPELINE_STATE_PENDING",
+            "PIPELINE_STATE_RUNNING",
+            "PIPELINE_STATE_SUCCEEDED",
+        ),
+        step_s: tuple = (0.05, 0.2),
+        failure_rate: float = 0.0,
+        seed: int = None,
+    ):
+        self.states = states
+        self.step_s = step_s
+        self.failure_rate = failure_rate
+        self.poll_calls = 0
+        self._rng = random.Random(seed)
+        self._jobs = {}
+
+    async def submit(self, spec: JobSpec) -> str:
+        resource_name = f"projects/fake/locations/fake/pipelineJobs/{spec.display_name}-{len(self._jobs)}"
+        states = list(self.states)
+        if self._rng.random() < self.failure_rate:
+            states[-1] = "PIPELINE_STATE_FAILED"
+        schedule = []
+        t = time.monotonic()
+        for state in states:
+            schedule.append((t, state))
+            t += self._rng.uniform(*self.step_s)
+        self._jobs[resource_name] = schedule
+        return resource_name
+
+    async def get_state(self, resource_name: str) -> tuple:
+        self.poll_calls += 1
+        now = time.monotonic()
+        state = next(s for t, s in reversed(self._jobs[resource_name]) if t <= now)
+        error = "Simulated pipeline failure." if state == "PIPELINE_STATE_FAILED" else None
+        return state, error
+
+
+class AutoSxSJobManager:
+    """Submits AutoSxS jobs and polls them all concurrently.
+
+    Each job is polled after ``initial_delay_s``; while its state doesn't
+    change the delay doubles up to ``max_delay_s``, and every delay is
+    jittered to between half and all of its value so polls of jobs launched
+    together spread out. A state change resets the delay. At most
+    ``max_concurrent_requests`` submit/poll calls are in flight at once.
+    """
+
+    def __init__(
+        self,
+        service,
+        initial_delay_s: float = 5.0,
+        max_delay_s: float = 120.0,
+        backoff_factor: float = 2.0,
+        max_concurrent_requests: int = 16,
+        seed: int = None,
+    ):
+        self.service = service
+        self.initial_delay_s = initial_delay_s
+        self.max_delay_s = max_delay_s
+        self.backoff_factor = backoff_factor
+        self.max_concurrent_requests = max_concurrent_requests
+        self._rng = random.Random(seed)
+
+    def _jittered(self, delay: float) -> float:
+        return delay * self._rng.uniform(0.5, 1.0)
+
+    async def _supervise(self, spec: JobSpec, semaphore: asyncio.Semaphore, events: asyncio.Queue):
+        async with semaphore:
+            resource_name = await self.service.submit(spec)
+
+        state = None
+        delay = self.initial_delay_s
+        while True:
+            async with semaphore:
+                new_state, error = await self.service.get_state(resource_name)
+            if new_state != state:
+                event = JobEvent(
+                    display_name=spec.display_name,
+                    resource_name=resource_name,
+                    previous_state=state,
+                    state=new_state,
+                    timestamp=time.time(),
+                    error=error,
+                )
+                await events.put(event)
+                state = new_state
+                delay = self.initial_delay_s
+                if event.is_terminal:
+                    return
+            else:
+                delay = min(delay * self.backoff_factor, self.max_delay_s)
+            await asyncio.sleep(self._jittered(delay))
+
+    async def stream(self, specs: list):
+        """Submits every job and yields JobEvents as states change.
+
+        The stream ends once every job has reached a terminal state. If a
+        submit or poll raises, the remaining jobs are cancelled and the
+        error propagates.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        events = asyncio.Queue()
+        tasks = [asyncio.create_task(self._supervise(spec, semaphore, events)) for spec in specs]
+        pending = set(tasks)
+        try:
+            while pending or not events.empty():
+                if events.empty():
+                    getter = asyncio.create_task(events.get())
+                    try:
+                        done, _ = await asyncio.wait(pending | {getter}, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done - {getter}:
+                            pending.discard(task)
+                            task.result()  # re-raise failures
+                    finally:
+                        # Also when a job failed or the stream was cancelled.
+                        if not getter.done():
+                            getter.cancel()
+                    if getter not in done:
+                        continue
+                    yield getter.result()
+                else:
+                    yield events.get_nowait()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run(self, specs: list, on_event=None) -> dict:
+        """Runs all jobs to completion and returns {display_name: terminal JobEvent}."""
+        results = {}
+        async for event in self.stream(specs):
+            if on_event is not None:
+                on_event(event)
+            if event.is_terminal:
+                results[event.display_name] = event
+        return results
+
+
+def build_job_specs(base_parameters: dict, variants: dict) -> list:
+    """One JobSpec per variant, each overriding some of the base parameter_values."""
+    return [
+        JobSpec(display_name=name, parameter_values={**base_parameters, **overrides})
+        for name, overrides in variants.items()
+    ]
+
+
+def _print_event(event: JobEvent):
+    print(
+        f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.timestamp))}] "
+        f"{event.display_name}: {event.previous_state} -> {event.state}"
+        + (f" ({event.error})" if event.error else "")
+    )
+
+
+if __name__ == "__main__":
+    if "--live" in sys.argv:
+        from auto_side_by_side_async import parameters
+
+        service = VertexPipelineJobService()
+        manager = AutoSxSJobManager(service)
+    else:
+        parameters = {"evaluation_dataset": "gs://auto_side_by_side/s_x_s_dataset.jsonl"}
+        service = FakePipelineJobService(failure_rate=0.1, seed=0)
+        manager = AutoSxSJobManager(service, initial_delay_s=0.02, max_delay_s=0.5, seed=0)
+
+    specs = build_job_specs(
+        parameters,
+        {f"auto_side_by_side_qna_pipe-{i}": {} for i in range(20)},
+    )
+    start = time.perf_counter()
+    results = asyncio.run(manager.run(specs, on_event=_print_event))
+    succeeded = sum(e.state == "PIPELINE_STATE_SUCCEEDED" for e in results.values())
+    print(f"{succeeded}/{len(results)} pipelines succeeded in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,213 @@
+# Aggregates AutoSxS pairwise judgments (judgments_format: 'jsonl') into
+# per-model win/tie rates with bootstrap confidence intervals and
+# position-bias diagnostics.
+#
+#   python autosxs_judgments.py 'judgments/*.jsonl' [id_column ...]
+#
+# Judgment rows carry a ``choice`` of "A" or "B" (anything else counts as a
+# tie). Rows are reduced to outcome counts per group as they are read, so
+# memory depends on the number of groups, not rows, and new shard files are
+# folded in by calling update() again.
+
+import glob
+import io
+import json
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+OUTCOMES = ("model_a", "model_b", "tie")
+OVERALL = "__overall__"
+# win_rates draws n_bootstrap * groups outcome counts in blocks of about
+# this many, to bound memory with many groups.
+BOOTSTRAP_BLOCK = 2_000_000
+
+
+def _two_sided_p(z: float) -> float:
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def _is_json_object(line: bytes) -> bool:
+    try:
+        return isinstance(json.loads(line), dict)
+    except ValueError:
+        return False
+
+
+class JudgmentAggregator:
+    """Incrementally aggregates AutoSxS judgment shards.
+
+    ``group_by`` columns (e.g. the pipeline's ``id_columns`` or a slice
+    column) split the rates per group in addition to the overall rates.
+    If ``swap_column`` is given, rows where it is true had model B's
+    response in position A; outcomes are mapped back to models and
+    position bias is measured separately from model preference. Without
+    it, a preference for position A can't be told apart from a preference
+    for model A.
+    """
+
+    def __init__(self, group_by: list = None, swap_column: str = None, chunk_rows: int = 200_000):
+        self.group_by = list(group_by or [])
+        self.swap_column = swap_column
+        self.chunk_rows = chunk_rows
+        # group key -> [model_a wins, model_b wins, ties]
+        self.counts = {}
+        # [position A chosen, position B chosen, tie]
+        self.position_counts = np.zeros(3, dtype=np.int64)
+        # path -> byte offset already consumed
+        self._offsets = {}
+
+    def _add_chunk(self, chunk: pd.DataFrame):
+        choice = chunk["choice"].astype(str).str.strip().str.upper().to_numpy()
+        position = np.where(choice == "A", 0, np.where(choice == "B", 1, 2))
+        self.position_counts += np.bincount(position, minlength=3)
+
+        outcome = position
+        if self.swap_column is not None and self.swap_column in chunk:
+            swapped = chunk[self.swap_column].fillna(False).astype(bool).to_numpy()
+            outcome = np.where(swapped & (position < 2), 1 - position, position)
+
+        frame = pd.DataFrame({"outcome": outcome})
+        for column in self.group_by:
+            frame[column] = chunk[column].astype(str) if column in chunk else "<missing>"
+        tallies = [(OVERALL, np.bincount(outcome, minlength=3))]
+        if self.group_by:
+            grouped = frame.groupby(self.group_by + ["outcome"], sort=False).size()
+            table = grouped.unstack("outcome", fill_value=0).reindex(columns=range(3), fill_value=0)
+            tallies.extend(zip(table.index, table.to_numpy()))
+        for key, row in tallies:
+            if key not in self.counts:
+                self.counts[key] = np.zeros(3, dtype=np.int64)
+            self.counts[key] += row
+
+    def _parse_lines(self, buffer: bytes) -> pd.DataFrame:
+        columns = ["choice", *self.group_by]
+        if self.swap_column is not None:
+            columns.append(self.swap_column)
+        try:
+            # pyarrow's multithreaded JSON reader is several times faster.
+            import pyarrow.json as pa_json
+        except ImportError:
+            chunk = pd.read_json(io.BytesIO(buffer), lines=True, dtype=False)
+            return chunk[[c for c in columns if c in chunk]]
+        table = pa_json.read_json(io.BytesIO(buffer))
+        return table.select([c for c in columns if c in table.column_names]).to_pandas()
+
+    def _add_lines(self, lines: list):
+        if not lines:
+            return
+        chunk = self._parse_lines(b"".join(lines))
+        if "choice" in chunk:
+            self._add_chunk(chunk)
+
+    def _read_new_rows(self, path: str):
+        """Reads the part of ``path`` not consumed yet (shards may still be growing)."""
+        offset = self._offsets.get(path, 0)
+        if os.path.getsize(path) <= offset:
+            return
+        with open(path, "rb") as f:
+            f.seek(offset)
+            lines = []
+            consumed = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # The last line of a finished shard may have no newline;
+                    # one still being written isn't a complete JSON object
+                    # yet and is picked up on the next update.
+                    if not _is_json_object(line):
+                        break
+                    line += b"\n"
+                    consumed -= 1
+                consumed += len(line)
+                if line.strip():
+                    lines.append(line)
+                if len(lines) >= self.chunk_rows:
+                    self._add_lines(lines)
+                    offset += consumed
+                    self._offsets[path] = offset
+                    lines, consumed = [], 0
+            self._add_lines(lines)
+            self._offsets[path] = offset + consumed
+
+    def update(self, paths) -> "JudgmentAggregator":
+        """Folds in new shard files (a glob pattern or a list of paths)."""
+        if isinstance(paths, str):
+            paths = sorted(glob.glob(paths))
+        for path in paths:
+            self._read_new_rows(path)
+        return self
+
+    def win_rates(self, n_bootstrap: int = 2000, confidence: float = 0.95, seed: int = 0) -> pd.DataFrame:
+        """Win/tie rates per group with bootstrap CIs for each rate.
+
+        Resampling rows with replacement is the same as drawing the outcome
+        counts from a multinomial at the observed rates, so every bootstrap
+        replicate costs O(1) regardless of how many judgments there are.
+        Groups with the same counts share one bootstrap, and the multinomial
+        is drawn for all distinct counts at once as two binomials (model A
+        wins, then model B wins among the rest), a block at a time.
+        """
+        rng = np.random.default_rng(seed)
+        alpha = (1 - confidence) / 2
+        counts = np.array(list(self.counts.values()), dtype=np.int64).reshape(-1, 3)
+        judged = counts.sum(axis=1) > 0
+        keys = [key for key, keep in zip(self.counts, judged.tolist()) if keep]
+        counts = counts[judged]
+        inverse = pd.DataFrame(counts).groupby([0, 1, 2], sort=False).ngroup().to_numpy()
+        first = np.zeros(int(inverse.max(initial=-1)) + 1, dtype=np.int64)
+        first[inverse[::-1]] = np.arange(len(inverse))[::-1]
+        distinct = counts[first]
+        n = distinct.sum(axis=1)
+        rates = distinct / np.maximum(n, 1)[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            b_given_not_a = np.clip(np.where(rates[:, 0] < 1, rates[:, 1] / (1 - rates[:, 0]), 0.0), 0.0, 1.0)
+
+        lo, hi = np.empty_like(rates), np.empty_like(rates)
+        block = max(1, BOOTSTRAP_BLOCK // max(n_bootstrap, 1))
+        for start in range(0, len(distinct), block):
+            rows = slice(start, start + block)
+            a_wins = rng.binomial(n[rows], rates[rows, 0], size=(n_bootstrap, len(n[rows])))
+            rest = n[rows] - a_wins
+            b_wins = rng.binomial(rest, b_given_not_a[rows])
+            samples = np.stack((a_wins, b_wins, rest - b_wins), axis=-1) / n[rows, None]
+            lo[rows], hi[rows] = np.quantile(samples, [alpha, 1 - alpha], axis=0)
+
+        table = {"group": pd.Series(keys, dtype=object), "n": n[inverse]}
+        for i, outcome in enumerate(OUTCOMES):
+            table[f"{outcome}_rate"] = rates[inverse, i]
+            table[f"{outcome}_ci_low"] = lo[inverse, i]
+            table[f"{outcome}_ci_high"] = hi[inverse, i]
+        return pd.DataFrame(table)
+
+    def position_bias(self) -> dict:
+        """How often the judge picked position A among decisive judgments.
+
+        z/p_value test that rate against 0.5. With swap_column set this is
+        pure position bias; otherwise it also reflects model preference.
+        """
+        a, b, ties = (int(c) for c in self.position_counts)
+        decisive = a + b
+        if decisive == 0:
+            return {"decisive": 0, "ties": ties, "position_a_rate": None, "z": None, "p_value": None}
+        rate = a / decisive
+        z = (rate - 0.5) / math.sqrt(0.25 / decisive)
+        return {
+            "decisive": decisive,
+            "ties": ties,
+            "position_a_rate": rate,
+            "z": z,
+            "p_value": _two_sided_p(z),
+        }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python autosxs_judgments.py '<judgments glob>' [id_column ...]")
+        sys.exit(1)
+
+    aggregator = JudgmentAggregator(group_by=sys.argv[2:]).update(sys.argv[1])
+    print(aggregator.win_rates().to_string(index=False))
+    print(aggregator.position_bias())
@@ -0,0 +1,678 @@
+# Headless batch runner: evaluates a dataset file with any mix of metrics,
+# optionally split across machines, and merges the shard outputs.
+#
+#   python batch_runner.py run data/agent --metrics TOOL_USE_QUALITY,tool_name_match \
+#       --shard 0/4 --workers 16 --out runs/sweep-1
+#   ...the same with --shard 1/4, 2/4 and 3/4 on other nodes...
+#   python batch_runner.py merge runs/sweep-1
+#
+#   python batch_runner.py estimate data/agent --metrics TOOL_USE_QUALITY --max-prompt-tokens 32000
+#
+# ``estimate`` prints judge tokens, cost and wall time without sending
+# anything (see token_budget.py); --max-prompt-tokens/--oversize on ``run``
+# apply the same budget to the judge requests.
+#
+# The dataset is a JSONL / JSONL.gz / Parquet file, a directory of them, or a
+# directory written by synthetic_data_generator.py (read in manifest order).
+# Metrics can be:
+#
+#   judge   RubricMetric names (GENERAL_QUALITY, ...) and context_relevance;
+#           prompt-builder metrics are composed into one request per row.
+#   local   ssn_or_credit_card_detected, the reference metrics (exact_match,
+#           token_f1, ...) and the trajectory metrics (tool_name_match, ...),
+#           scored vectorized per batch.
+#   custom  "module:function" custom functions, run by LocalCustomFunctionExecutor.
+#
+# Shard i of N gets the contiguous rows [i*T//N, (i+1)*T//N) of the T-row
+# dataset, so the split depends only on the dataset and N, and only the files
+# overlapping that range are parsed. Finding T is cheap for Parquet files
+# (footer metadata) and generator directories (their manifest), but every node
+# counts the lines of every file in a plain JSONL directory, a full read of
+# the dataset; write a manifest for large JSONL sweeps. Each shard writes flattened cases/verdicts
+# (see result_store.py) one Parquet part per batch, keyed by global row
+# number, to <out>/shard-<i>-of-<N>/. Parts are renamed into place once
+# written, so re-running a shard skips the batches already done. Merging
+# checks that every shard is complete and was run with the same dataset
+# (file names and row counts, not paths, so nodes can mount it anywhere) and
+# metrics, concatenates the parts in row order into <out>/merged/ (an Arrow
+# result store readable with load_result_store) and computes summary.json
+# over all rows, not from per-shard averages. Each part also gets the
+# run_diff row keys of its rows, merged into merged/rows.arrow, so merged
+# runs can be compared with run_diff.compare_runs.
+
+import argparse
+import glob
+import gzip
+import importlib
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import get_instrumentation
+
+DEFAULT_BATCH_SIZE = 1000
+DATASET_SUFFIXES = (".jsonl", ".jsonl.gz", ".parquet")
+SHARD_MANIFEST = "shard.json"
+MERGED_DIR = "merged"
+SUMMARY_FILE = "summary.json"
+_SHARD_DIR_RE = re.compile(r"^shard-(\d+)-of-(\d+)$")
+
+
+def _local_metric_names() -> list:
+    from agent_traces import TRAJECTORY_METRIC_NAMES
+    from reference_metrics import REFERENCE_METRIC_NAMES
+
+    return ["ssn_or_credit_card_detected"] + REFERENCE_METRIC_NAMES + TRAJECTORY_METRIC_NAMES
+
+
+def resolve_metrics(names: list) -> dict:
+    """Sorts metric names into {"judge": [...], "local": [...], "custom": [...]}.
+
+    Judge and custom entries are metric objects, local entries are names.
+    Raises ValueError for names that are none of these.
+    """
+    from vertexai import types
+
+    from adaptive_rubric_example import AVAILABLE_METRICS
+    from static_rubric_customization import _build_relevance_metric
+
+    local_names = _local_metric_names()
+    resolved = {"judge": [], "local": [], "custom": []}
+    for name in names:
+        if name in local_names:
+            resolved["local"].append(name)
+        elif name == "context_relevance":
+            resolved["judge"].append(_build_relevance_metric())
+        elif ":" in name:
+            module_name, function_name = name.split(":", 1)
+            function = getattr(importlib.import_module(module_name), function_name)
+            resolved["custom"].append(types.Metric(name=function_name, custom_function=function))
+        elif name in AVAILABLE_METRICS or (name.isupper() and hasattr(types.RubricMetric, name)):
+            resolved["judge"].append(getattr(types.RubricMetric, name))
+        else:
+            raise ValueError(
+                f"Unknown metric '{name}': expected a RubricMetric name, context_relevance, "
+                f"one of {local_names} or a 'module:function' custom function."
+            )
+    return resolved
+
+
+def parse_shard(spec: str) -> tuple:
+    """Parses "i/N" into (i, N)."""
+    match = re.fullmatch(r"(\d+)/(\d+)", spec.strip())
+    if not match:
+        raise ValueError(f"Shard must look like 'i/N', got '{spec}'.")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be in [0, {count}), got '{spec}'.")
+    return index, count
+
+
+def shard_range(total_rows: int, index: int, count: int) -> tuple:
+    """The [start, stop) rows of shard ``index`` of ``count``."""
+    return total_rows * index // count, total_rows * (index + 1) // count
+
+
+def _count_jsonl_rows(path: str) -> int:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def dataset_files(path: str) -> list:
+    """Returns [{"path", "rows"}] for the files making up a dataset, in row order.
+
+    Row counts come from the manifest or Parquet metadata where there is one;
+    JSONL files without a manifest are read in full to count their lines.
+    """
+    if os.path.isfile(path):
+        paths = [path]
+    else:
+        manifest_path = os.path.join(path, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            return [
+                {"path": os.path.join(path, entry["path"]), "rows": entry["rows"]}
+                for entry in sorted(manifest["shards"], key=lambda entry: entry["first_row"])
+            ]
+        paths = sorted(p for p in glob.glob(os.path.join(path, "*")) if p.endswith(DATASET_SUFFIXES))
+        if not paths:
+            raise ValueError(f"No {'/'.join(DATASET_SUFFIXES)} files in '{path}'.")
+
+    files = []
+    for file_path in paths:
+        if file_path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            rows = pq.ParquetFile(file_path).metadata.num_rows
+        elif file_path.endswith((".jsonl", ".jsonl.gz")):
+            rows = _count_jsonl_rows(file_path)
+        else:
+            raise ValueError(f"Unsupported dataset file '{file_path}', expected one of {DATASET_SUFFIXES}.")
+        files.append({"path": file_path, "rows": rows})
+    return files
+
+
+def _iter_file_rows(path: str, skip: int, take: int, batch_size: int):
+    """Yields rows [skip, skip + take) of one file as DataFrames of at most batch_size rows."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        from synthetic_data_generator import NESTED_COLUMNS
+
+        position = 0
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            begin, end = max(skip - position, 0), min(skip + take - position, record_batch.num_rows)
+            position += record_batch.num_rows
+            if begin < end:
+                frame = record_batch.slice(begin, end - begin).to_pandas()
+                for column in NESTED_COLUMNS:
+                    # Nested values are stored as JSON strings in Parquet.
+                    if column in frame:
+                        frame[column] = [json.loads(v) if isinstance(v, str) else v for v in frame[column]]
+                yield frame
+            if position >= skip + take:
+                break
+        return
+
+    opener = gzip.open if path.endswith(".gz") else open
+    records = []
+    row = 0
+    with opener(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if row >= skip + take:
+                break
+            if row >= skip:
+                records.append(json.loads(line))
+                if len(records) >= batch_size:
+                    yield pd.DataFrame.from_records(records)
+                    records = []
+            row += 1
+    if records:
+        yield pd.DataFrame.from_records(records)
+
+
+def iter_row_batches(files: list, start: int, stop: int, batch_size: int):
+    """Yields (first_row, DataFrame) batches covering rows [start, stop) across ``files``.
+
+    Batches are ``batch_size`` rows (the last may be shorter) whatever the
+    file boundaries, so batch k of a shard always holds the same rows.
+    """
+    buffered = []
+    buffered_rows = 0
+    first_row = start
+    offset = 0
+    for entry in files:
+        file_start, file_stop = offset, offset + entry["rows"]
+        offset = file_stop
+        if file_stop <= start or file_start >= stop:
+            continue
+        skip = max(start - file_start, 0)
+        take = min(stop, file_stop) - file_start - skip
+        for frame in _iter_file_rows(entry["path"], skip, take, batch_size):
+            buffered.append(frame)
+            buffered_rows += len(frame)
+            while buffered_rows >= batch_size:
+                combined = pd.concat(buffered, ignore_index=True)
+                yield first_row, combined.iloc[:batch_size].reset_index(drop=True)
+                first_row += batch_size
+                rest = combined.iloc[batch_size:].reset_index(drop=True)
+                buffered, buffered_rows = ([rest], len(rest)) if len(rest) else ([], 0)
+    if buffered_rows:
+        yield first_row, pd.concat(buffered, ignore_index=True)
+
+
+def _skip_row_batches(files: list, start: int, stop: int, batch_size: int, done: set):
+    """iter_row_batches, minus the batches in ``done``, without parsing their rows."""
+    batches = range(start, stop, batch_size)
+    todo = [k for k in range(len(batches)) if k not in done]
+    # Contiguous runs of pending batches are read as one range each.
+    runs = []
+    for k in todo:
+        if runs and runs[-1][1] == k:
+            runs[-1][1] = k + 1
+        else:
+            runs.append([k, k + 1])
+    for first, last in runs:
+        run_start = start + first * batch_size
+        run_stop = min(stop, start + last * batch_size)
+        for first_row, batch in iter_row_batches(files, run_start, run_stop, batch_size):
+            yield (first_row - start) // batch_size, first_row, batch
+
+
+def score_local_metrics(batch: pd.DataFrame, names: list) -> dict:
+    """Scores ``batch`` with local metrics. Returns {name: (scores, explanations or None)}.
+
+    Scores are NaN on rows a metric doesn't apply to (no reference trajectory).
+    """
+    from agent_traces import TRAJECTORY_METRIC_NAMES, AgentTraces, score_trajectories
+    from reference_metrics import REFERENCE_METRIC_NAMES, score_reference_metrics
+
+    scored = {}
+    if "ssn_or_credit_card_detected" in names:
+        from custom_function_metric import scan_ssn_or_credit_card
+
+        pii = scan_ssn_or_credit_card(batch["response"])
+        scored["ssn_or_credit_card_detected"] = (pii["score"].to_numpy(), pii["explanation"].to_numpy())
+
+    reference = [name for name in names if name in REFERENCE_METRIC_NAMES]
+    if reference:
+        scores = score_reference_metrics(batch, reference)
+        for name in reference:
+            scored[name] = (scores[name].to_numpy(dtype=float), None)
+
+    trajectory = [name for name in names if name in TRAJECTORY_METRIC_NAMES]
+    if trajectory:
+        expected = batch["reference_trajectory"] if "reference_trajectory" in batch else None
+        scores = score_trajectories(AgentTraces.from_dataset(batch), expected)
+        for name in trajectory:
+            values = scores[name].to_numpy(dtype=float) if name in scores else np.full(len(batch), np.nan)
+            scored[name] = (values, None)
+    return scored
+
+
+def _local_cases(scored: dict, rows: int) -> pd.DataFrame:
+    from result_store import CASE_COLUMNS
+
+    frames = []
+    for name, (scores, explanations) in scored.items():
+        missing = np.isnan(scores)
+        frames.append(pd.DataFrame({
+            "eval_case_index": np.arange(rows, dtype=np.int64),
+            "response_index": np.zeros(rows, dtype=np.int64),
+            "metric_name": name,
+            "score": np.where(missing, np.nan, scores),
+            "pairwise_choice": None,
+            "explanation": explanations,
+            "error_message": np.where(missing, "Metric does not apply to this row.", None),
+        }, columns=CASE_COLUMNS))
+    # Interleave metrics per row, the order flatten_eval_result uses.
+    cases = pd.concat(frames, ignore_index=True)
+    return cases.sort_values("eval_case_index", kind="stable", ignore_index=True)
+
+
+class BatchRunner:
+    """Evaluates row batches with resolved metrics (see resolve_metrics)."""
+
+    def __init__(
+        self, metrics: dict, workers: int = 1, eval_client=None, cache=None, dedup: bool = False, budget=None
+    ):
+        self.metrics = metrics
+        self.workers = workers
+        self.budget = budget
+        self.eval_client = eval_client
+        self.cache = cache
+        self.dedup = dedup
+        self._scheduler = None
+
+    def _client(self):
+        if self.eval_client is None:
+            from adaptive_rubric_example import LOCATION, PROJECT_ID
+            from client_provider import get_client
+
+            self.eval_client = get_client(PROJECT_ID, LOCATION)
+        return self.eval_client
+
+    def evaluate_batch(self, batch: pd.DataFrame, first_row: int) -> tuple:
+        """Returns flattened (cases, verdicts) for ``batch``, indexed by global row."""
+        from local_executor import LocalCustomFunctionExecutor
+        from multi_metric import evaluate_batched
+        from result_store import VERDICT_COLUMNS, _typed_frame, flatten_eval_result
+        from streaming_dataset import validate_batch
+
+        case_frames, verdict_frames = [], [pd.DataFrame(columns=VERDICT_COLUMNS)]
+        if self.metrics["judge"]:
+            from judge_scheduler import JudgeScheduler
+
+            for metric in self.metrics["judge"]:
+                validate_batch(batch, metric.name, first_row + 1)
+            if self._scheduler is None and (self.workers > 1 or self.budget is not None):
+                self._scheduler = JudgeScheduler(max_workers=self.workers, budget=self.budget)
+            result = evaluate_batched(
+                self._client(), batch, self.metrics["judge"],
+                cache=self.cache, dedup=self.dedup, scheduler=self._scheduler,
+            )
+            cases, verdicts = flatten_eval_result(result)
+            case_frames.append(cases)
+            verdict_frames.append(verdicts)
+        if self.metrics["custom"]:
+            executor = LocalCustomFunctionExecutor(max_workers=self.workers)
+            cases, verdicts = flatten_eval_result(executor.evaluate(batch, self.metrics["custom"]))
+            case_frames.append(cases)
+            verdict_frames.append(verdicts)
+        if self.metrics["local"]:
+            case_frames.append(_local_cases(score_local_metrics(batch, self.metrics["local"]), len(batch)))
+
+        cases = _typed_frame(dict(pd.concat(case_frames, ignore_index=True)))
+        cases = cases.sort_values("eval_case_index", kind="stable", ignore_index=True)
+        verdicts = _typed_frame(dict(pd.concat(verdict_frames, ignore_index=True)))
+        cases["eval_case_index"] += first_row
+        verdicts["eval_case_index"] += first_row
+        return cases, verdicts
+
+
+def shard_dir(out_dir: str, index: int, count: int) -> str:
+    return os.path.join(out_dir, f"shard-{index:05d}-of-{count:05d}")
+
+
+def _write_part(frame: pd.DataFrame, path: str, result_columns: bool = True):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from result_store import _arrow_schema
+
+    schema = _arrow_schema(frame) if result_columns else None
+    table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+    # Written under a temporary name and renamed, so a part either exists
+    # complete or not at all.
+    pq.write_table(table, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def _part_paths(directory: str, batch: int) -> tuple:
+    return (
+        os.path.join(directory, f"part-{batch:06d}.cases.parquet"),
+        os.path.join(directory, f"part-{batch:06d}.verdicts.parquet"),
+        os.path.join(directory, f"part-{batch:06d}.rows.parquet"),
+    )
+
+
+def _run_config(dataset: str, files: list, metric_names: list, count: int, batch_size: int, budget=None) -> dict:
+    return {
+        # Identified by name and its files' names and row counts, not its
+        # path, so shards run where the data is mounted elsewhere still merge.
+        "dataset": os.path.basename(os.path.normpath(dataset)),
+        "files": [{"path": os.path.basename(entry["path"]), "rows": entry["rows"]} for entry in files],
+        "total_rows": sum(entry["rows"] for entry in files),
+        "metrics": list(metric_names),
+        "num_shards": count,
+        "batch_size": batch_size,
+        # Truncation changes what is judged, so the budget is part of the run.
+        "budget": budget.dict() if budget is not None else None,
+    }
+
+
+def _write_json(data: dict, path: str):
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def run_shard(
+    dataset: str,
+    metric_names: list,
+    out_dir: str,
+    shard: tuple = (0, 1),
+    workers: int = 1,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    eval_client=None,
+    cache=None,
+    dedup: bool = False,
+    budget=None,
+) -> dict:
+    """Evaluates shard ``shard`` = (i, N) of ``dataset`` into ``out_dir``.
+
+    ``budget`` is an optional token_budget.TokenBudget for judge requests.
+    Batches already written by an earlier run of the same shard are skipped.
+    Returns the shard manifest.
+    """
+    index, count = shard
+    metrics = resolve_metrics(metric_names)
+    files = dataset_files(dataset)
+    config = _run_config(dataset, files, metric_names, count, batch_size, budget)
+    start, stop = shard_range(config["total_rows"], index, count)
+
+    directory = shard_dir(out_dir, index, count)
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, SHARD_MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        if previous["config"] != config:
+            raise ValueError(
+                f"'{directory}' was written with a different dataset or metrics; "
+                "use a new output directory."
+            )
+
+    num_batches = len(range(start, stop, batch_size))
+    from run_diff import row_identity
+
+    done = {k for k in range(num_batches) if os.path.exists(_part_paths(directory, k)[0])}
+    manifest = {
+        "config": config,
+        "shard": index,
+        "first_row": start,
+        "stop_row": stop,
+        "rows": stop - start,
+        "num_batches": num_batches,
+        "status": "running",
+    }
+    _write_json(manifest, manifest_path)
+
+    runner = BatchRunner(metrics, workers=workers, eval_client=eval_client, cache=cache, dedup=dedup, budget=budget)
+    instrumentation = get_instrumentation()
+    instrumentation.count("batch_runner_skipped_batches", len(done))
+    for batch_index, first_row, batch in _skip_row_batches(files, start, stop, batch_size, done):
+        with instrumentation.stage("batch_runner_batch", rows=len(batch)):
+            cases, verdicts = runner.evaluate_batch(batch, first_row)
+            cases_path, verdicts_path, rows_path = _part_paths(directory, batch_index)
+            rows = row_identity(batch)
+            rows["eval_case_index"] += first_row
+            # Cases last: their presence marks the batch as done.
+            _write_part(rows, rows_path, result_columns=False)
+            _write_part(verdicts, verdicts_path)
+            _write_part(cases, cases_path)
+
+    manifest["status"] = "complete"
+    _write_json(manifest, manifest_path)
+    return manifest
+
+
+def estimate_shard(
+    dataset: str,
+    metric_names: list,
+    shard: tuple = (0, 1),
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    budget=None,
+    pricing=None,
+) -> pd.DataFrame:
+    """token_budget.estimate_judge_cost for the judge metrics over one shard, without judging anything."""
+    from token_budget import estimate_judge_cost
+
+    judge_metrics = resolve_metrics(metric_names)["judge"]
+    files = dataset_files(dataset)
+    start, stop = shard_range(sum(entry["rows"] for entry in files), *shard)
+    estimates = [
+        estimate_judge_cost(batch, judge_metrics, budget, pricing)
+        for _, batch in iter_row_batches(files, start, stop, batch_size)
+    ]
+    if not estimates or not len(estimates[0]):
+        return pd.DataFrame()
+    combined = pd.concat(estimates).groupby("metrics", sort=False)
+    estimate = combined.sum()
+    estimate["max_prompt_tokens"] = combined["max_prompt_tokens"].max()
+    return estimate.reset_index()
+
+
+def _read_shard_manifests(out_dir: str) -> list:
+    manifests = []
+    for directory in sorted(glob.glob(os.path.join(out_dir, "shard-*-of-*"))):
+        if not _SHARD_DIR_RE.match(os.path.basename(directory)):
+            continue
+        manifest_path = os.path.join(directory, SHARD_MANIFEST)
+        if not os.path.exists(manifest_path):
+            continue
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        manifest["directory"] = directory
+        manifests.append(manifest)
+    if not manifests:
+        raise ValueError(f"No shard outputs in '{out_dir}'.")
+    return manifests
+
+
+def merge_shards(out_dir: str) -> tuple:
+    """Merges every shard in ``out_dir`` into ``out_dir``/merged.
+
+    Raises ValueError unless all N shards are present, complete and were run
+    with the same configuration. Returns (cases, verdicts, summary), the
+    first two as Arrow tables.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    from result_analytics import metric_summary
+    from result_store import CASES_FILE, VERDICTS_FILE
+    from run_diff import ROWS_FILE
+
+    manifests = _read_shard_manifests(out_dir)
+    config = manifests[0]["config"]
+    mismatched = [m["directory"] for m in manifests if m["config"] != config]
+    if mismatched:
+        raise ValueError(f"Shards {mismatched} were run with a different dataset, metrics or shard count.")
+    count = config["num_shards"]
+    present = {m["shard"]: m for m in manifests}
+    missing = sorted(set(range(count)) - set(present))
+    if missing:
+        raise ValueError(f"Missing shard(s) {missing} of {count}.")
+    incomplete = sorted(i for i, m in present.items() if m["status"] != "complete")
+    if incomplete:
+        raise ValueError(f"Shard(s) {incomplete} of {count} did not finish.")
+
+    tables = {CASES_FILE: [], VERDICTS_FILE: [], ROWS_FILE: []}
+    for i in range(count):
+        directory = present[i]["directory"]
+        for batch in range(present[i]["num_batches"]):
+            cases_path, verdicts_path, rows_path = _part_paths(directory, batch)
+            if not os.path.exists(cases_path):
+                raise ValueError(f"Shard {i} is missing batch {batch} ({cases_path}).")
+            tables[CASES_FILE].append(pq.read_table(cases_path))
+            tables[VERDICTS_FILE].append(pq.read_table(verdicts_path))
+            if os.path.exists(rows_path):
+                tables[ROWS_FILE].append(pq.read_table(rows_path))
+
+    # Shards and their parts are already in row order, so no sort is needed.
+    merged_dir = os.path.join(out_dir, MERGED_DIR)
+    os.makedirs(merged_dir, exist_ok=True)
+    merged = {}
+    if len(tables[ROWS_FILE]) != len(tables[CASES_FILE]):
+        # Shards run before row keys were written can't be compared.
+        del tables[ROWS_FILE]
+    for name, parts in tables.items():
+        # Arrow IPC files can't change a dictionary between batches.
+        table = pa.concat_tables(parts).unify_dictionaries().combine_chunks()
+        feather.write_feather(table, os.path.join(merged_dir, name), compression="uncompressed")
+        merged[name] = table
+
+    cases = merged[CASES_FILE]
+    stats = metric_summary(cases.select(["metric_name", "score", "error_message"]).to_pandas())
+    summary = {
+        "dataset": config["dataset"],
+        "rows": config["total_rows"],
+        "num_shards": count,
+        "metrics": json.loads(stats.to_json(orient="records")),
+    }
+    _write_json(summary, os.path.join(out_dir, SUMMARY_FILE))
+    return cases, merged[VERDICTS_FILE], summary
+
+
+def _add_budget_arguments(parser):
+    parser.add_argument("--max-prompt-tokens", type=int, default=None, help="token limit per judge prompt")
+    parser.add_argument("--oversize", choices=["flag", "truncate", "error"], default="flag",
+                        help="what to do with rows over --max-prompt-tokens")
+
+
+def _budget_from_args(args):
+    if args.max_prompt_tokens is None:
+        return None
+    from token_budget import TokenBudget
+
+    return TokenBudget(max_prompt_tokens=args.max_prompt_tokens, oversize=args.oversize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluates a dataset shard headlessly, or merges shard outputs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="evaluate one shard of a dataset")
+    run.add_argument("dataset", help="JSONL / JSONL.gz / Parquet file, or a directory of them")
+    run.add_argument("--metrics", required=True, help="comma-separated metric names")
+    run.add_argument("--out", required=True, help="output directory shared by all shards")
+    run.add_argument("--shard", default="0/1", help="i/N: evaluate the i-th of N slices (default 0/1)")
+    run.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    run.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    run.add_argument("--dedup", action="store_true", help="judge each distinct row once")
+    run.add_argument("--cache", default=None, help="judge cache path (judge_cache.JudgeCache)")
+    _add_budget_arguments(run)
+
+    estimate = commands.add_parser("estimate", help="estimate judge tokens, cost and time for one shard")
+    estimate.add_argument("dataset")
+    estimate.add_argument("--metrics", required=True)
+    estimate.add_argument("--shard", default="0/1")
+    estimate.add_argument("--workers", type=int, default=16, help="concurrent judge requests assumed")
+    estimate.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    _add_budget_arguments(estimate)
+
+    merge = commands.add_parser("merge", help="merge shard outputs and compute global summaries")
+    merge.add_argument("out", help="output directory the shards were written to")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    budget = _budget_from_args(args) if args.command != "merge" else None
+    if args.command == "estimate":
+        from token_budget import JudgePricing
+
+        estimate = estimate_shard(
+            args.dataset,
+            [name.strip() for name in args.metrics.split(",") if name.strip()],
+            shard=parse_shard(args.shard),
+            batch_size=args.batch_size,
+            budget=budget,
+            pricing=JudgePricing(concurrency=args.workers),
+        )
+        print(estimate.to_string(index=False))
+        return
+    if args.command == "run":
+        cache = None
+        if args.cache:
+            from judge_cache import JudgeCache
+
+            cache = JudgeCache(args.cache)
+        manifest = run_shard(
+            args.dataset,
+            [name.strip() for name in args.metrics.split(",") if name.strip()],
+            args.out,
+            shard=parse_shard(args.shard),
+            workers=args.workers,
+            batch_size=args.batch_size,
+            cache=cache,
+            dedup=args.dedup,
+            budget=budget,
+        )
+        print(
+            f"shard {manifest['shard']}/{manifest['config']['num_shards']}: rows "
+            f"[{manifest['first_row']}, {manifest['stop_row']}) in {time.perf_counter() - started:.1f}s",
+            file=sys.stderr,
+        )
+        return
+
+    _, _, summary = merge_shards(args.out)
+    print(pd.DataFrame(summary["metrics"]).to_string(index=False))
+    print(
+        f"merged {summary['num_shards']} shard(s), {summary['rows']} rows, "
+        f"into {os.path.join(args.out, MERGED_DIR)} in {time.perf_counter() - started:.1f}s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Guards the cold-start budget of the entry-point modules.
+#
+#   python benchmark_import_time.py
+#
+# Each module is imported in a fresh interpreter under `python -X importtime`;
+# the best of several runs must stay within its budget and the listed heavy
+# dependencies must not have been imported. Exits non-zero on a regression.
+
+import os
+import subprocess
+import sys
+
+RUNS = 5
+
+# module -> (budget in ms, modules that must stay unloaded after import)
+IMPORT_BUDGETS = {
+    "adaptive_rubric_example": (250, ["vertexai", "pandas"]),
+    "static_rubric_customization": (250, ["vertexai", "pandas"]),
+    "custom_function_metric": (1000, ["vertexai"]),
+}
+
+
+def measure(module: str, forbidden: list) -> tuple:
+    """Returns (cumulative import ms, forbidden modules that were loaded)."""
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {forbidden!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        check=True,
+    )
+    cumulative_us = None
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            cumulative_us = int(parts[1])
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return cumulative_us / 1000, loaded
+
+
+def run() -> bool:
+    ok = True
+    for module, (budget_ms, forbidden) in IMPORT_BUDGETS.items():
+        samples = [measure(module, forbidden) for _ in range(RUNS)]
+        best_ms = min(ms for ms, _ in samples)
+        loaded = samples[0][1]
+        within = best_ms <= budget_ms and not loaded
+        ok &= within
+        status = "ok" if within else "FAIL"
+        extra = f", eagerly imported {loaded}" if loaded else ""
+        print(f"{status:4} {module}: {best_ms:.1f} ms (budget {budget_ms} ms){extra}")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
@@ -0,0 +1,75 @@
+# Throughput benchmark for the batch SSN / credit-card scanner.
+#
+#   python benchmark_pii_scanner.py            # 1M rows
+#   python benchmark_pii_scanner.py 200000     # custom row count
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from custom_function_metric import contains_ssn_or_credit_card, scan_ssn_or_credit_card
+
+SAMPLE_RESPONSES = [
+    "Rajib's SSN is 334-87-9425 and credit card is 2853-1654-2129-1282",
+    "Card on file: 4111 1111 1111 1111",
+    "Card on file: 4111 1111 1111 1112",
+    "The Taj Mahal is in India.",
+    "Order 1234567890123 shipped, SSN 666-12-3456 is invalid",
+    "SSN 123-45-6789 on record",
+    "",
+    None,
+    "Call 555 123 4567 or 4012-8888-8888-1881 tomorrow",
+    "Paris is the capital of France.",
+]
+
+def build_responses(n_rows: int, seed: int = 7) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(SAMPLE_RESPONSES), size=n_rows)
+    # Tag most rows with a request id so the scanner can't lean on
+    # duplicate texts; real logs fall somewhere in between.
+    tags = rng.integers(0, 10_000_000, size=n_rows)
+    return pd.Series(
+        [
+            f"{SAMPLE_RESPONSES[p]} [req {t}]" if SAMPLE_RESPONSES[p] and i % 10 else SAMPLE_RESPONSES[p]
+            for i, (p, t) in enumerate(zip(picks, tags))
+        ],
+        dtype=object,
+    )
+
+def check_parity(responses: pd.Series, sample_size: int = 20000) -> None:
+    sample = responses.iloc[:sample_size]
+    expected = pd.DataFrame(
+        [contains_ssn_or_credit_card({"response": r}) for r in sample],
+        index=sample.index,
+    )
+    actual = scan_ssn_or_credit_card(sample)
+    pd.testing.assert_frame_equal(actual, expected)
+
+def run(n_rows: int = 1_000_000) -> dict:
+    responses = build_responses(n_rows)
+    check_parity(responses)
+
+    start = time.perf_counter()
+    scan_ssn_or_credit_card(responses)
+    batch_s = time.perf_counter() - start
+
+    # Row-at-a-time baseline on a slice, extrapolated to n_rows.
+    baseline_rows = min(n_rows, 100_000)
+    start = time.perf_counter()
+    for r in responses.iloc[:baseline_rows]:
+        contains_ssn_or_credit_card({"response": r})
+    row_s = (time.perf_counter() - start) * n_rows / baseline_rows
+
+    return {
+        "rows": n_rows,
+        "batch_seconds": round(batch_s, 3),
+        "batch_rows_per_sec": round(n_rows / batch_s),
+        "per_row_seconds_est": round(row_s, 3),
+        "speedup": round(row_s / batch_s, 2),
+    }
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(run(rows))
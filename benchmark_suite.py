@@ -0,0 +1,338 @@
+# Offline benchmark suite. Everything runs against the in-process fake evals
+# backend (fake_evals_client.py), which returns adaptive-rubric-style results
+# with rubric verdicts, so no project or network access is needed.
+#
+#   python benchmark_suite.py                          # every benchmark, 1k/100k/1M rows (~15 min)
+#   python benchmark_suite.py --sizes 1000,100000      # smaller tiers
+#   python benchmark_suite.py --only pii_scan,flatten  # a subset
+#   python benchmark_suite.py --compare benchmark_results/<earlier run>.json
+#
+# Each run is written to benchmark_results/<UTC time>-<git sha>.json together
+# with the interpreter and library versions. With --compare, any benchmark
+# that got slower than the earlier run by more than --threshold is reported
+# and the exit status is 1.
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+RESULTS_DIR = "benchmark_results"
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+# Results are built and judged this many rows at a time, the way a large run
+# is streamed, so the 1M tier fits in memory.
+CHUNK_ROWS = 50_000
+REGRESSION_THRESHOLD = 1.25
+SEED = 7
+
+
+def _measure(function, repeat: int) -> dict:
+    """Runs ``function`` ``repeat`` times after one warm-up call and reports
+    min/median wall time."""
+    function()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {"seconds_min": min(times), "seconds_median": statistics.median(times)}
+
+
+def _row(benchmark: str, rows: int, timing: dict, **extra) -> dict:
+    row = {"benchmark": benchmark, "rows": rows, **timing}
+    row["rows_per_second"] = rows / timing["seconds_min"] if rows and timing["seconds_min"] else None
+    row.update(extra)
+    return row
+
+
+def build_dataset(n_rows: int, kind: str = "standard", seed: int = SEED) -> pd.DataFrame:
+    """``n_rows`` rows cycling through the example records of ``kind``.
+
+    Prompts are tagged with a random request id so rows aren't duplicates of
+    each other, which would flatter dedup and caching.
+    """
+    from adaptive_rubric_example import DATASET_RECORDS
+
+    records = DATASET_RECORDS[kind]
+    base = pd.DataFrame(records)
+    frame = base.iloc[np.arange(n_rows) % len(base)].reset_index(drop=True)
+    tags = np.random.default_rng(seed).integers(0, 10**9, size=n_rows).astype(str)
+    frame["prompt"] = frame["prompt"].astype(str) + " [req " + pd.Series(tags) + "]"
+    return frame
+
+
+def fake_client(**kwargs):
+    from fake_evals_client import FakeClient
+
+    options = {"rubrics_per_case": 4, "row_error_rate": 0.01, "seed": SEED}
+    options.update(kwargs)
+    return FakeClient(**options)
+
+
+def bench_pii_scan(sizes: list, repeat: int) -> list:
+    from benchmark_pii_scanner import build_responses
+    from custom_function_metric import contains_ssn_or_credit_card, scan_ssn_or_credit_card
+
+    rows = []
+    for n_rows in sizes:
+        responses = build_responses(n_rows)
+        rows.append(_row("pii_scan_batch", n_rows, _measure(lambda: scan_ssn_or_credit_card(responses), repeat)))
+
+        # The row-at-a-time function is timed on at most 100k rows.
+        sample = responses.iloc[:min(n_rows, 100_000)]
+        timing = _measure(lambda: [contains_ssn_or_credit_card({"response": r}) for r in sample], repeat)
+        rows.append(_row("pii_scan_per_row", len(sample), timing))
+    return rows
+
+
+def bench_reference_metrics(sizes: list, repeat: int) -> list:
+    from reference_metrics import score_reference_metrics, token_f1
+
+    rows = []
+    for n_rows in sizes:
+        dataset = build_dataset(n_rows, "reference")
+        # Distinct responses, so the batch scorer can't skip repeated pairs.
+        dataset["response"] = dataset["response"].astype(str) + " " + dataset["prompt"].str.extract(r"\[req (\d+)\]")[0]
+        rows.append(_row("reference_metrics_batch", n_rows, _measure(lambda: score_reference_metrics(dataset), repeat)))
+
+        # The per-row custom function is timed on at most 2k rows.
+        sample = dataset.iloc[:min(n_rows, 2_000)].to_dict("records")
+        rows.append(_row("reference_metrics_per_row", len(sample), _measure(lambda: [token_f1(r) for r in sample], repeat)))
+    return rows
+
+
+def bench_dataset_routing(sizes: list, repeat: int) -> list:
+    from vertexai import types
+
+    import adaptive_rubric_example
+    from adaptive_rubric_example import AVAILABLE_METRICS, AdaptiveRubricEvals
+
+    evals = AdaptiveRubricEvals()
+    rows = []
+    for metric_name in AVAILABLE_METRICS:
+
+        def cold():
+            adaptive_rubric_example._build_dataset.cache_clear()
+            getattr(types.RubricMetric, metric_name)
+            return evals.get_dataset_for_metric(metric_name)
+
+        def warm():
+            getattr(types.RubricMetric, metric_name)
+            return evals.get_dataset_for_metric(metric_name)
+
+        n_rows = len(cold())
+        rows.append(_row("dataset_routing_cold", n_rows, _measure(cold, repeat), metric=metric_name))
+        rows.append(_row("dataset_routing_warm", n_rows, _measure(warm, repeat), metric=metric_name))
+    return rows
+
+
+def _fake_result(n_rows: int, metric_name: str = "GENERAL_QUALITY"):
+    return fake_client().evals.evaluate(dataset=build_dataset(n_rows), metrics=[metric_name])
+
+
+def _tile_cases(frame: pd.DataFrame, copies: int, n_rows: int) -> pd.DataFrame:
+    step = frame["eval_case_index"].max() + 1
+    tiled = pd.concat([frame] * copies, ignore_index=True)
+    tiled["eval_case_index"] += np.repeat(np.arange(copies) * step, len(frame))
+    return tiled[tiled["eval_case_index"] < n_rows].reset_index(drop=True)
+
+
+def bench_flatten(sizes: list, repeat: int) -> list:
+    """Result flattening and the UI's render preparation (index, filter, page, summaries)."""
+    from result_store import flatten_eval_result
+    from results_view import ANY_RUBRIC, ResultIndex, page_slice
+
+    rows = []
+    for n_rows in sizes:
+        result = _fake_result(min(n_rows, CHUNK_ROWS))
+        chunks = -(-n_rows // CHUNK_ROWS)
+        flatten_timing = _measure(lambda: flatten_eval_result(result), repeat)
+        # Timed on one chunk and scaled, so the 1M tier doesn't have to hold
+        # a million nested result objects at once.
+        flatten_timing = {key: value * chunks for key, value in flatten_timing.items()}
+        rows.append(_row("flatten_results", n_rows, flatten_timing, extrapolated_from_rows=min(n_rows, CHUNK_ROWS)))
+
+        # The full-size tables are the one chunk's tables repeated with
+        # shifted case indices.
+        chunk_cases, chunk_verdicts = flatten_eval_result(result)
+        del result
+        cases = _tile_cases(chunk_cases, chunks, n_rows)
+        verdicts = _tile_cases(chunk_verdicts, chunks, n_rows)
+
+        timing = _measure(lambda: ResultIndex(cases, verdicts), repeat)
+        rows.append(_row("render_index_build", n_rows, timing))
+
+        index = ResultIndex(cases, verdicts)
+
+        def filter_and_page():
+            index._last_filter = None
+            case_ids = index.filter_case_ids(index.metric_names[:1], (0.25, 0.75), ANY_RUBRIC)
+            for case_index in page_slice(case_ids, 2, 20):
+                index.case_rows(case_index)
+                index.verdict_rows(case_index)
+
+        rows.append(_row("render_filter_page", n_rows, _measure(filter_and_page, repeat)))
+
+        def summaries():
+            index._summary_tables = None
+            index.summary_tables()
+
+        rows.append(_row("render_summary_tables", n_rows, _measure(summaries, repeat)))
+    return rows
+
+
+def bench_end_to_end(sizes: list, repeat: int, latency_s: float = 0.0) -> list:
+    """AdaptiveRubricEvals.evaluate plus flattening, streamed CHUNK_ROWS rows at a time."""
+    from adaptive_rubric_example import AdaptiveRubricEvals
+    from instrumentation import Instrumentation, get_instrumentation, set_instrumentation
+    from judge_scheduler import JudgeScheduler
+    from result_store import flatten_eval_result
+
+    rows = []
+    for scheduled in (False, True):
+        for n_rows in sizes:
+            datasets = [
+                build_dataset(min(CHUNK_ROWS, n_rows - start), seed=start) for start in range(0, n_rows, CHUNK_ROWS)
+            ]
+            scheduler = JudgeScheduler(batch_size=100, seed=SEED) if scheduled else None
+            evals = AdaptiveRubricEvals(eval_client=fake_client(latency_s=latency_s), scheduler=scheduler)
+
+            def run():
+                for dataset in datasets:
+                    result, _ = evals.evaluate("GENERAL_QUALITY", dataset)
+                    flatten_eval_result(result)
+
+            previous = get_instrumentation()
+            set_instrumentation(Instrumentation())
+            try:
+                timing = _measure(run, repeat)
+                # Per run; _measure makes one warm-up call on top of ``repeat``.
+                stages = {
+                    name: round(stage["seconds_total"] / (repeat + 1), 6)
+                    for name, stage in get_instrumentation().snapshot()["stages"].items()
+                }
+            finally:
+                set_instrumentation(previous)
+            name = "end_to_end_scheduled" if scheduled else "end_to_end"
+            rows.append(_row(name, n_rows, timing, stage_seconds=stages, fake_latency_s=latency_s))
+    return rows
+
+
+BENCHMARKS = {
+    "pii_scan": bench_pii_scan,
+    "reference_metrics": bench_reference_metrics,
+    "dataset_routing": bench_dataset_routing,
+    "flatten": bench_flatten,
+    "end_to_end": bench_end_to_end,
+}
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "git_revision": _git_revision(),
+    }
+
+
+def run_suite(sizes: list, names: list, repeat: int) -> dict:
+    results = []
+    for name in names:
+        print(f"running {name} ...", file=sys.stderr)
+        results.extend(BENCHMARKS[name](sizes, repeat))
+    return {
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "sizes": list(sizes),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def save_run(run: dict, directory: str = RESULTS_DIR) -> str:
+    os.makedirs(directory, exist_ok=True)
+    stamp = run["created_at"].replace(":", "").replace("-", "").replace("+0000", "Z")
+    path = os.path.join(directory, f"{stamp}-{run['environment']['git_revision']}.json")
+    with open(path, "w") as f:
+        json.dump(run, f, indent=2)
+    return path
+
+
+def _result_key(row: dict) -> tuple:
+    return row["benchmark"], row["rows"], row.get("metric")
+
+
+def compare_runs(baseline: dict, current: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """Returns (key, baseline_s, current_s, ratio) for benchmarks slower than ``threshold`` x."""
+    before = {_result_key(row): row["seconds_min"] for row in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        key = _result_key(row)
+        if key in before and before[key] > 0:
+            ratio = row["seconds_min"] / before[key]
+            if ratio > threshold:
+                regressions.append((key, before[key], row["seconds_min"], ratio))
+    return regressions
+
+
+def _print_table(run: dict):
+    frame = pd.DataFrame(run["results"])
+    columns = [c for c in ("benchmark", "metric", "rows", "seconds_min", "seconds_median", "rows_per_second") if c in frame]
+    print(frame[columns].to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES))
+    parser.add_argument("--only", default=",".join(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(BENCHMARKS))
+    if unknown:
+        parser.error(f"unknown benchmark(s) {unknown}, expected some of {sorted(BENCHMARKS)}")
+
+    run = run_suite([int(s) for s in args.sizes.split(",")], names, args.repeat)
+    _print_table(run)
+    print(f"saved {save_run(run, args.output_dir)}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_runs(baseline, run, args.threshold)
+        for (benchmark, rows, metric), before, after, ratio in regressions:
+            label = f"{benchmark}[{rows}]" + (f" {metric}" if metric else "")
+            print(f"REGRESSION {label}: {before:.4g}s -> {after:.4g}s ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.threshold:.2f}x")
@@ -0,0 +1,206 @@
+# Checkpointed, resumable evaluation runs.
+#
+# Completed batches are appended to runs/<run_id>/results.jsonl as soon as
+# they are judged. Re-running with the same run ID skips rows already in the
+# log, so a crashed sweep resumes where it stopped instead of starting over.
+#
+#   python checkpointed_run.py <run_id> [METRIC] [dataset.jsonl[.gz]]
+
+import hashlib
+import json
+import os
+import sys
+
+import pandas as pd
+from vertexai import types
+
+from eval_results import build_evaluation_result
+
+DEFAULT_RUNS_DIR = "runs"
+
+
+def row_keys(dataset: pd.DataFrame) -> list:
+    """Stable content hash per row, used to recognise rows already judged."""
+    return [
+        hashlib.sha256(json.dumps(row, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        for row in dataset.to_dict("records")
+    ]
+
+
+class RunCheckpoint:
+    """Append-only results log for one run ID."""
+
+    def __init__(self, run_id: str, metric_name: str, runs_dir: str = DEFAULT_RUNS_DIR):
+        self.run_id = run_id
+        self.metric_name = metric_name
+        self.directory = os.path.join(runs_dir, run_id)
+        self.log_path = os.path.join(self.directory, "results.jsonl")
+        os.makedirs(self.directory, exist_ok=True)
+        self._check_manifest()
+
+    def _check_manifest(self):
+        manifest_path = os.path.join(self.directory, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest["metric_name"] != self.metric_name:
+                raise ValueError(
+                    f"Run '{self.run_id}' was started with metric '{manifest['metric_name']}', "
+                    f"not '{self.metric_name}'."
+                )
+            return
+        with open(manifest_path, "w") as f:
+            json.dump({"run_id": self.run_id, "metric_name": self.metric_name}, f)
+
+    def _truncate_torn_tail(self):
+        """Drops a final line left unterminated by a crash mid-write, so the
+        next append starts on a fresh line instead of extending the fragment."""
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "r+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Walk back to the last complete line.
+            end = size
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self) -> dict:
+        """Returns {row_key: {metric_name: EvalCaseMetricResult}} for completed rows."""
+        completed = {}
+        if not os.path.exists(self.log_path):
+            return completed
+        self._truncate_torn_tail()
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A corrupt line; that row is redone.
+                    continue
+                completed[entry["row_key"]] = {
+                    name: types.EvalCaseMetricResult(**result)
+                    for name, result in entry["metric_results"].items()
+                }
+        return completed
+
+    def append(self, entries: dict):
+        """Durably appends {row_key: {metric_name: EvalCaseMetricResult}}."""
+        if not entries:
+            return
+        lines = [
+            json.dumps({
+                "row_key": key,
+                "metric_results": {
+                    name: r.model_dump(mode="json", exclude_none=True)
+                    for name, r in metric_results.items()
+                },
+            })
+            + "\n"
+            for key, metric_results in entries.items()
+        ]
+        self._truncate_torn_tail()
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _iter_batches(dataset, batch_size: int):
+    if hasattr(dataset, "iter_batches"):
+        for _, batch in dataset.iter_batches():
+            yield batch
+        return
+    for start in range(0, len(dataset), batch_size):
+        yield dataset.iloc[start:start + batch_size]
+
+
+def evaluate_checkpointed(
+    evals,
+    metric_name: str,
+    run_id: str,
+    dataset=None,
+    batch_size: int = 1000,
+    runs_dir: str = DEFAULT_RUNS_DIR,
+):
+    """Evaluates ``dataset`` in batches, checkpointing each one under ``run_id``.
+
+    ``evals`` is an AdaptiveRubricEvals or StaticRubricEvals instance and
+    ``dataset`` a DataFrame or a streaming_dataset.JsonlDatasetSource
+    (defaults to the metric's built-in dataset). Rows already completed in
+    an earlier attempt of the run are not judged again. Rows that errored
+    aren't checkpointed, so a rerun retries them. Returns an EvaluationResult
+    covering every row in dataset order.
+    """
+    if dataset is None:
+        if hasattr(evals, "get_dataset_for_metric"):
+            dataset = evals.get_dataset_for_metric(metric_name)
+        else:
+            dataset = evals.standard_dataset
+
+    checkpoint = RunCheckpoint(run_id, metric_name, runs_dir)
+    completed = checkpoint.load()
+    errored = {}
+
+    for batch in _iter_batches(dataset, batch_size):
+        keys = row_keys(batch)
+        todo = [i for i, key in enumerate(keys) if key not in completed and key not in errored]
+        if not todo:
+            continue
+        pending = batch.iloc[todo].reset_index(drop=True)
+        eval_result, _ = evals.evaluate(metric_name, dataset=pending)
+
+        fresh = {}
+        for case in eval_result.eval_case_results or []:
+            metric_results = {}
+            for candidate in case.response_candidate_results or []:
+                metric_results.update(candidate.metric_results or {})
+            key = keys[todo[case.eval_case_index]]
+            if metric_results and all(r.error_message is None for r in metric_results.values()):
+                fresh[key] = metric_results
+            else:
+                errored[key] = metric_results
+        checkpoint.append(fresh)
+        completed.update(fresh)
+
+    case_metric_results = [
+        completed.get(key) or errored.get(key) or {}
+        for batch in _iter_batches(dataset, batch_size)
+        for key in row_keys(batch)
+    ]
+    metric_names = list(dict.fromkeys(name for case in case_metric_results for name in case))
+    return build_evaluation_result(
+        case_metric_results,
+        metric_names,
+        dataset=dataset if isinstance(dataset, pd.DataFrame) else None,
+    )
+
+
+if __name__ == "__main__":
+    from adaptive_rubric_example import AdaptiveRubricEvals
+    from streaming_dataset import JsonlDatasetSource
+
+    if len(sys.argv) < 2:
+        print("Usage: python checkpointed_run.py <run_id> [METRIC] [dataset.jsonl[.gz]]")
+        sys.exit(1)
+
+    run_id = sys.argv[1]
+    metric_to_run = sys.argv[2].upper() if len(sys.argv) > 2 else "GENERAL_QUALITY"
+    source = JsonlDatasetSource(path=sys.argv[3]) if len(sys.argv) > 3 else None
+
+    print(f"Running evaluation with metric: {metric_to_run} (run {run_id})")
+    result = evaluate_checkpointed(AdaptiveRubricEvals(), metric_to_run, run_id, dataset=source)
+    print(result.summary_metrics)
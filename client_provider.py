@@ -0,0 +1,71 @@
+# Lazily constructed, swappable evals client.
+#
+# vertexai is slow to import and Client() needs a project, so nothing here
+# runs until a client is first requested. The backend can be replaced, e.g.
+# with the in-process fake from fake_evals_client.py:
+#
+#   set_client_factory(lambda project, location: FakeClient())
+#
+# or, without code changes, with EVALS_CLIENT_BACKEND=fake (see _fake_client
+# for the EVALS_FAKE_* settings).
+
+import os
+import threading
+
+BACKEND_ENV_VAR = "EVALS_CLIENT_BACKEND"
+
+_lock = threading.Lock()
+_clients = {}
+_client_factory = None
+
+
+def _vertex_client(project: str, location: str):
+    from vertexai import Client
+    return Client(project=project, location=location)
+
+
+def _fake_client(project: str, location: str):
+    from fake_evals_client import FakeClient
+    return FakeClient(
+        latency_s=float(os.environ.get("EVALS_FAKE_LATENCY_S", "0")),
+        rubrics_per_case=int(os.environ.get("EVALS_FAKE_RUBRICS_PER_CASE", "0")),
+        row_error_rate=float(os.environ.get("EVALS_FAKE_ROW_ERROR_RATE", "0")),
+    )
+
+
+BACKENDS = {
+    "vertex": _vertex_client,
+    "fake": _fake_client,
+}
+
+
+def set_client_factory(factory):
+    """Uses ``factory(project, location)`` to build clients from now on.
+
+    Pass None to go back to the backend named by EVALS_CLIENT_BACKEND.
+    Already built clients are dropped.
+    """
+    global _client_factory
+    with _lock:
+        _client_factory = factory
+        _clients.clear()
+
+
+def get_client(project: str, location: str):
+    """Returns the shared client for (project, location), building it on first use."""
+    key = (project, location)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        if key not in _clients:
+            factory = _client_factory
+            if factory is None:
+                backend = os.environ.get(BACKEND_ENV_VAR, "vertex")
+                if backend not in BACKENDS:
+                    raise ValueError(
+                        f"Unknown {BACKEND_ENV_VAR} '{backend}', expected one of {sorted(BACKENDS)}"
+                    )
+                factory = BACKENDS[backend]
+            _clients[key] = factory(project, location)
+        return _clients[key]
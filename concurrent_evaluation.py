@@ -0,0 +1,78 @@
+# Evaluates many rubric metrics concurrently instead of one per invocation.
+#
+#   python concurrent_evaluation.py                      # all metrics
+#   python concurrent_evaluation.py GROUNDING SAFETY     # a subset
+
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+def group_metrics_by_dataset(evals, metric_names: list) -> list:
+    """Groups metrics that share a dataset, returning [(dataset, [metric_name, ...])]."""
+    groups = {}
+    for metric_name in metric_names:
+        dataset = evals.get_dataset_for_metric(metric_name)
+        groups.setdefault(id(dataset), (dataset, []))[1].append(metric_name)
+    return list(groups.values())
+
+
+async def evaluate_many_async(
+    evals,
+    metric_names: list,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> dict:
+    """Runs evals.evaluate for every metric with at most max_concurrency in flight.
+
+    Each dataset is looked up once per group of metrics sharing it. Returns
+    {metric_name: (eval_result, dataset)}; a metric that fails maps to the
+    exception it raised, so one bad metric doesn't cancel the rest.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+
+        async def run_one(metric_name, dataset):
+            async with semaphore:
+                try:
+                    return metric_name, await loop.run_in_executor(
+                        pool, lambda: evals.evaluate(metric_name, dataset=dataset)
+                    )
+                except Exception as e:
+                    return metric_name, e
+
+        tasks = [
+            run_one(metric_name, dataset)
+            for dataset, names in group_metrics_by_dataset(evals, metric_names)
+            for metric_name in names
+        ]
+        results = dict(await asyncio.gather(*tasks))
+
+    # Keep the caller's metric order.
+    return {metric_name: results[metric_name] for metric_name in metric_names}
+
+
+def evaluate_many(evals, metric_names: list, max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> dict:
+    """Synchronous wrapper around evaluate_many_async."""
+    return asyncio.run(evaluate_many_async(evals, metric_names, max_concurrency))
+
+
+if __name__ == "__main__":
+    from adaptive_rubric_example import AVAILABLE_METRICS, AdaptiveRubricEvals
+
+    metrics_to_run = [m.upper() for m in sys.argv[1:]] or AVAILABLE_METRICS
+
+    print(f"Running evaluation with metrics: {', '.join(metrics_to_run)}")
+    start = time.perf_counter()
+    results = evaluate_many(AdaptiveRubricEvals(), metrics_to_run)
+    for metric_name, outcome in results.items():
+        if isinstance(outcome, Exception):
+            print(f"Error running {metric_name}: {outcome}")
+        else:
+            result, _ = outcome
+            print(metric_name, result.summary_metrics)
+    print(f"Finished {len(results)} metrics in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,118 @@
+# Helpers for building and combining evaluation results locally, in the same
+# shape that client.evals.evaluate returns.
+
+import statistics
+
+import pandas as pd
+from vertexai import types
+
+
+def result_key(metric, result: types.EvaluationResult = None) -> str:
+    """The metric_results key ``metric``'s scores come back under.
+
+    The evals service files prebuilt metrics under their resolved spec name
+    (types.RubricMetric.GENERAL_QUALITY as "general_quality_v1"), not the
+    name they were requested by. Upper-case strings are taken as RubricMetric
+    names. When ``result`` is given and its cases hold a single key, that key
+    wins, which also covers metrics resolved from their GCS definition.
+    """
+    for case in (result.eval_case_results or []) if result is not None else []:
+        for candidate in case.response_candidate_results or []:
+            if len(candidate.metric_results or {}) == 1:
+                return next(iter(candidate.metric_results))
+        break
+    if isinstance(metric, str):
+        if not metric.isupper():
+            return metric
+        metric = getattr(types.RubricMetric, metric)
+    get_spec_name = getattr(metric, "_get_api_metric_spec_name", None)
+    if get_spec_name is not None and get_spec_name():
+        return get_spec_name()
+    return getattr(metric, "name", None) or str(metric)
+
+
+def aggregate_metric_results(metric_name: str, results: list) -> types.AggregatedMetricResult:
+    """Summarizes per-case results the way the evals service does for custom metrics."""
+    scores = []
+    num_error = 0
+    for result in results:
+        if result.error_message is None and result.score is not None:
+            try:
+                scores.append(float(result.score))
+            except (ValueError, TypeError):
+                num_error += 1
+        else:
+            num_error += 1
+
+    return types.AggregatedMetricResult(
+        metric_name=metric_name,
+        num_cases_total=len(results),
+        num_cases_valid=len(scores),
+        num_cases_error=num_error,
+        mean_score=statistics.mean(scores) if scores else None,
+        stdev_score=statistics.stdev(scores) if len(scores) > 1 else None,
+    )
+
+
+def build_evaluation_result(
+    case_metric_results: list,
+    metric_names: list,
+    dataset: pd.DataFrame = None,
+) -> types.EvaluationResult:
+    """Builds an EvaluationResult from one {metric_name: EvalCaseMetricResult} dict per case.
+
+    A case may lack a metric (a row the judge returned nothing for), but a
+    name in ``metric_names`` that no case has raises KeyError; it's
+    misspelled or not the key the results are stored under.
+    """
+    eval_case_results = [
+        types.EvalCaseResult(
+            eval_case_index=i,
+            response_candidate_results=[
+                types.ResponseCandidateResult(response_index=0, metric_results=metric_results)
+            ],
+        )
+        for i, metric_results in enumerate(case_metric_results)
+    ]
+    summary_metrics = []
+    for name in metric_names:
+        results = [case[name] for case in case_metric_results if name in case]
+        if case_metric_results and not results:
+            raise KeyError(f"No case has a result for metric '{name}'.")
+        summary_metrics.append(aggregate_metric_results(name, results))
+    evaluation_dataset = None
+    if dataset is not None:
+        evaluation_dataset = [types.EvaluationDataset(eval_dataset_df=dataset)]
+
+    return types.EvaluationResult(
+        eval_case_results=eval_case_results,
+        summary_metrics=summary_metrics,
+        evaluation_dataset=evaluation_dataset,
+    )
+
+
+def merge_evaluation_results(results: list) -> types.EvaluationResult:
+    """Concatenates the results of consecutive dataset batches.
+
+    Cases are renumbered so eval_case_index refers to the row position in the
+    combined dataset, and summary metrics are recomputed over all cases.
+    """
+    eval_case_results = []
+    metric_results_by_name = {}
+    for result in results:
+        offset = len(eval_case_results)
+        for case in result.eval_case_results or []:
+            eval_case_results.append(
+                case.model_copy(update={"eval_case_index": offset + case.eval_case_index})
+            )
+            for candidate in case.response_candidate_results or []:
+                for name, metric_result in (candidate.metric_results or {}).items():
+                    metric_results_by_name.setdefault(name, []).append(metric_result)
+
+    return types.EvaluationResult(
+        eval_case_results=eval_case_results,
+        summary_metrics=[
+            aggregate_metric_results(name, metric_results)
+            for name, metric_results in metric_results_by_name.items()
+        ],
+    )
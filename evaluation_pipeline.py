@@ -0,0 +1,37 @@
+# The judge path shared by AdaptiveRubricEvals.evaluate and
+# StaticRubricEvals.evaluate: optional row dedup, then optional cache, then
+# client.evals.evaluate (directly or through a JudgeScheduler) for whatever
+# is left.
+
+import pandas as pd
+
+from instrumentation import estimate_payload_bytes, get_instrumentation
+from judge_cache import evaluate_with_cache
+from row_dedup import evaluate_deduplicated
+
+
+def run_judge(eval_client, dataset: pd.DataFrame, metric, cache=None, dedup: bool = False, scheduler=None):
+    """Evaluates the dataset with one metric.
+
+    Returns (eval_result, dedup_stats); dedup_stats is None when dedup is off.
+    """
+
+    def dispatch(rows: pd.DataFrame):
+        # Request serialization happens inside the client, so it's timed as
+        # part of the judge stage; the payload estimate runs after the clock
+        # stops.
+        with get_instrumentation().stage(
+            "judge", rows=len(rows), payload_bytes=lambda: estimate_payload_bytes(rows)
+        ):
+            if scheduler is not None:
+                return scheduler.run(eval_client, rows, metric)
+            return eval_client.evals.evaluate(dataset=rows, metrics=[metric])
+
+    def judge(rows: pd.DataFrame):
+        if cache is not None:
+            return evaluate_with_cache(dispatch, rows, metric, cache)
+        return dispatch(rows)
+
+    if dedup:
+        return evaluate_deduplicated(judge, dataset)
+    return judge(dataset), None
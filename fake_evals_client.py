@@ -0,0 +1,186 @@
+# In-process stand-in for vertexai.Client used to exercise the evaluation
+# paths offline. Only client.evals.evaluate is implemented.
+
+import json
+import random
+import threading
+import time
+import zlib
+
+import pandas as pd
+from vertexai import types
+
+from eval_results import build_evaluation_result, result_key
+
+
+def _metric_name(metric) -> str:
+    # Results are keyed like the service keys them: prebuilt metrics under
+    # their resolved spec name ("general_quality_v1").
+    return result_key(metric)
+
+
+# Rubric texts the fake judge "generates" for adaptive rubric metrics.
+FAKE_RUBRICS = [
+    "The response directly answers the question asked in the prompt.",
+    "The response is factually accurate and free of hallucinated details.",
+    "The response follows every formatting constraint in the instructions.",
+    "The response is concise and avoids unnecessary repetition.",
+    "The response is grounded in the provided context.",
+    "The response uses a tone appropriate for the audience.",
+    "The response does not include unsafe or harmful content.",
+    "The response covers all the key points requested.",
+]
+
+# Distinct pass/fail patterns per metric; rows pick one by hash, so verdict
+# objects are shared instead of rebuilt for every row.
+_VERDICT_PATTERNS = 16
+
+
+class FakeServiceError(Exception):
+    """Mimics an API error carrying an HTTP status code."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeEvals:
+    """Returns deterministic pseudo-scores after an artificial delay.
+
+    ``capacity`` caps concurrent calls; calls beyond it fail with a 429.
+    ``error_rate`` injects transient 503s, and any row whose response
+    contains ``poison_marker`` makes the whole call fail with a 400.
+
+    With ``rubrics_per_case`` set, each row also gets that many rubric
+    verdicts (and its score becomes the fraction that passed), like the
+    adaptive rubric metrics return. ``row_error_rate`` is the fraction of
+    rows that come back with an error_message instead of a score, and
+    ``latency_per_row_s`` adds batch-size dependent latency on top of
+    ``latency_s``.
+    """
+
+    def __init__(
+        self,
+        latency_s: float = 0.0,
+        capacity: int = None,
+        error_rate: float = 0.0,
+        poison_marker: str = None,
+        seed: int = None,
+        rubrics_per_case: int = 0,
+        row_error_rate: float = 0.0,
+        latency_per_row_s: float = 0.0,
+    ):
+        self.latency_s = latency_s
+        self.rubrics_per_case = rubrics_per_case
+        self.row_error_rate = row_error_rate
+        self.latency_per_row_s = latency_per_row_s
+        self._verdict_patterns = {}
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.poison_marker = poison_marker
+        self.calls = 0
+        self.throttled = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def _row_hash(self, metric_name: str, row: dict) -> int:
+        key = f"{metric_name}|{row.get('prompt', '')}|{row.get('response', '')}"
+        return zlib.crc32(key.encode("utf-8"))
+
+    def _score(self, metric_name: str, row: dict) -> float:
+        return (self._row_hash(metric_name, row) % 5 + 1) / 5
+
+    def _verdicts(self, metric_name: str, pattern: int) -> list:
+        patterns = self._verdict_patterns.get(metric_name)
+        if patterns is None:
+            patterns = [
+                [
+                    types.RubricVerdict(
+                        evaluated_rubric=types.Rubric(
+                            rubric_id=f"{metric_name.lower()}_{i}",
+                            content=types.RubricContent(
+                                property=types.RubricContentProperty(
+                                    description=FAKE_RUBRICS[i % len(FAKE_RUBRICS)]
+                                )
+                            ),
+                        ),
+                        # Later rubrics fail more often, as harder ones do.
+                        verdict=(p >> (i % 4)) & 1 == 0 or i == 0,
+                        reasoning=f"Fake reasoning for rubric {i} of {metric_name}.",
+                    )
+                    for i in range(self.rubrics_per_case)
+                ]
+                for p in range(_VERDICT_PATTERNS)
+            ]
+            self._verdict_patterns[metric_name] = patterns
+        return patterns[pattern]
+
+    def _metric_result(self, name: str, row: dict, composite_members: list = None):
+        row_hash = self._row_hash(name, row)
+        if self.row_error_rate and (row_hash >> 8) % 10_000 < self.row_error_rate * 10_000:
+            return types.EvalCaseMetricResult(
+                metric_name=name, error_message="Fake judge error: response could not be parsed."
+            )
+        if composite_members:
+            # Answers a multi_metric composite prompt in the JSON it asks for.
+            answer = {
+                member: {"score": round(self._score(member, row) * 5), "explanation": f"Fake verdict for {member}."}
+                for member in composite_members
+            }
+            return types.EvalCaseMetricResult(metric_name=name, raw_output=[json.dumps(answer)])
+        if not self.rubrics_per_case:
+            return types.EvalCaseMetricResult(
+                metric_name=name,
+                score=self._score(name, row),
+                explanation=f"Fake verdict for {name}.",
+            )
+        verdicts = self._verdicts(name, row_hash % _VERDICT_PATTERNS)
+        passed = sum(v.verdict for v in verdicts)
+        return types.EvalCaseMetricResult(
+            metric_name=name,
+            score=passed / len(verdicts),
+            explanation=f"{passed} of {len(verdicts)} rubrics passed.",
+            rubric_verdicts=verdicts,
+        )
+
+    def evaluate(self, *, dataset: pd.DataFrame, metrics: list, **kwargs) -> types.EvaluationResult:
+        with self._lock:
+            self.calls += 1
+            if self.capacity is not None and self._in_flight >= self.capacity:
+                self.throttled += 1
+                raise FakeServiceError(429, "RESOURCE_EXHAUSTED: quota exceeded")
+            if self.error_rate and self._rng.random() < self.error_rate:
+                raise FakeServiceError(503, "UNAVAILABLE: try again")
+            self._in_flight += 1
+        try:
+            latency = self.latency_s + self.latency_per_row_s * len(dataset)
+            if latency:
+                time.sleep(latency)
+            records = dataset.to_dict("records")
+            if self.poison_marker and any(
+                self.poison_marker in str(row.get("response", "")) for row in records
+            ):
+                raise FakeServiceError(400, "INVALID_ARGUMENT: malformed row")
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        names = [_metric_name(m) for m in metrics]
+        members = {}
+        for metric in metrics:
+            if getattr(metric, "return_raw_output", False):
+                from multi_metric import composite_member_names
+
+                members[_metric_name(metric)] = composite_member_names(metric.prompt_template)
+        case_metric_results = [
+            {name: self._metric_result(name, row, members.get(name)) for name in names} for row in records
+        ]
+        return build_evaluation_result(case_metric_results, names, dataset=dataset)
+
+
+class FakeClient:
+    """Drop-in for vertexai.Client exposing only ``evals``."""
+
+    def __init__(self, latency_s: float = 0.0, **kwargs):
+        self.evals = FakeEvals(latency_s=latency_s, **kwargs)
@@ -0,0 +1,264 @@
+# Lightweight timing and counter instrumentation for the evaluation pipeline.
+#
+# Pipeline code wraps each stage in ``stage()``:
+#
+#   with get_instrumentation().stage("judge", rows=len(rows), payload_bytes=n):
+#       ...
+#
+# Each stage keeps a fixed-bucket latency histogram plus totals for rows and
+# payload bytes; ``count()`` keeps plain counters (cache hits, dedup savings,
+# retries). Recording a stage costs a couple of microseconds, so it stays on
+# by default. Payload sizes passed as a callable (the judge stage's
+# estimate_payload_bytes) are only measured with measure_payload=True,
+# as that serializes every row on every call. Snapshots export as JSON or in
+# the Prometheus text format, and hooks registered with add_hook() see every
+# stage as it finishes, e.g. to forward them to a tracing backend.
+
+import bisect
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; upper bounds of the histogram buckets (a +Inf bucket is implied).
+DEFAULT_BUCKETS_S = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0,
+)
+
+
+class Histogram:
+    """Cumulative-on-export latency histogram with fixed bucket bounds."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_S):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf if past the last bound)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class _StageStats:
+    __slots__ = ("latency", "rows", "payload_bytes", "errors")
+
+    def __init__(self, buckets):
+        self.latency = Histogram(buckets)
+        self.rows = 0
+        self.payload_bytes = 0
+        self.errors = 0
+
+
+class Instrumentation:
+    """Collects per-stage latency histograms, row/byte totals and counters."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_S, measure_payload: bool = False):
+        self.buckets = tuple(buckets)
+        self.measure_payload = measure_payload
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._hooks = []
+
+    def add_hook(self, hook):
+        """Calls ``hook(stage, seconds, rows, payload_bytes, error)`` after every stage."""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self._hooks.remove(hook)
+
+    @contextmanager
+    def stage(self, name: str, rows: int = None, payload_bytes: int = None):
+        """Times the enclosed block as one run of stage ``name``.
+
+        The yielded dict can be updated with "rows" / "payload_bytes" when
+        they're only known once the stage has run. ``payload_bytes`` may be a
+        callable, called only if ``measure_payload`` is set and once the clock
+        has stopped, so an expensive estimate costs nothing by default and
+        never counts towards the stage's latency.
+        """
+        span = {"rows": rows, "payload_bytes": payload_bytes}
+        error = None
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            payload_bytes = span["payload_bytes"]
+            if callable(payload_bytes):
+                payload_bytes = payload_bytes() if self.measure_payload else None
+            self.record(name, seconds, span["rows"], payload_bytes, error)
+
+    def record(self, name: str, seconds: float, rows: int = None, payload_bytes: int = None, error=None):
+        """Records one run of a stage timed elsewhere."""
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = _StageStats(self.buckets)
+            stats.latency.observe(seconds)
+            if rows:
+                stats.rows += rows
+            if payload_bytes:
+                stats.payload_bytes += payload_bytes
+            if error is not None:
+                stats.errors += 1
+        for hook in self._hooks:
+            hook(name, seconds, rows, payload_bytes, error)
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> dict:
+        """A JSON-serializable copy of everything recorded so far."""
+        with self._lock:
+            stages = {}
+            for name, stats in sorted(self._stages.items()):
+                latency = stats.latency
+                stages[name] = {
+                    "count": latency.count,
+                    "errors": stats.errors,
+                    "seconds_total": latency.sum,
+                    "seconds_mean": latency.sum / latency.count if latency.count else None,
+                    "seconds_p50": latency.quantile(0.5),
+                    "seconds_p99": latency.quantile(0.99),
+                    "rows_total": stats.rows,
+                    "rows_per_second": stats.rows / latency.sum if latency.sum and stats.rows else None,
+                    "payload_bytes_total": stats.payload_bytes,
+                    "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], latency.counts)),
+                }
+            return {"stages": stages, "counters": dict(sorted(self._counters.items()))}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self, prefix: str = "evals") -> str:
+        """Renders the snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Latency of evaluation pipeline stages.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for name, stage in snapshot["stages"].items():
+            cumulative = 0
+            for bound, count in stage["buckets"].items():
+                cumulative += count
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {stage["seconds_total"]!r}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+
+        for metric, field, help_text in (
+            ("stage_rows_total", "rows_total", "Rows processed by each stage."),
+            ("stage_payload_bytes_total", "payload_bytes_total", "Request payload bytes sent by each stage."),
+            ("stage_errors_total", "errors", "Stage runs that raised."),
+        ):
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for name, stage in snapshot["stages"].items():
+                lines.append(f'{prefix}_{metric}{{stage="{name}"}} {stage[field]}')
+
+        for name, value in snapshot["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _json_default(value):
+    # numpy arrays and scalars, e.g. lists read back from Parquet.
+    return value.tolist() if hasattr(value, "tolist") else str(value)
+
+
+def _object_bytes(values) -> int:
+    total = 0
+    # Rows often share one object (interned tool declarations), so each
+    # distinct object is serialized once.
+    sizes = {}
+    for value in values.tolist():
+        if value is None or (isinstance(value, float) and value != value):
+            continue
+        if isinstance(value, str):
+            total += len(value.encode("utf-8"))
+            continue
+        size = sizes.get(id(value))
+        if size is None:
+            size = sizes[id(value)] = len(json.dumps(value, default=_json_default).encode("utf-8"))
+        total += size
+    return total
+
+
+def estimate_payload_bytes(dataset) -> int:
+    """Approximate request size of a DataFrame: UTF-8 bytes of string cells,
+    JSON bytes of other objects (conversations, tool declarations) and the
+    raw size of everything else."""
+    total = 0
+    for column in dataset.columns:
+        values = dataset[column]
+        if str(values.dtype).startswith("str"):
+            import pyarrow as pa
+            import pyarrow.compute as pc
+
+            lengths = pc.binary_length(pa.array(values, type=pa.large_string(), from_pandas=True))
+            total += int(pc.sum(lengths).as_py() or 0)
+        elif values.dtype == object:
+            total += _object_bytes(values)
+        else:
+            total += int(values.memory_usage(index=False))
+    return total
+
+
+def timed(name: str, rows=None):
+    """Decorator timing every call as stage ``name``.
+
+    ``rows``, if given, maps the function's return value to the number of
+    rows it processed.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with get_instrumentation().stage(name) as span:
+                result = function(*args, **kwargs)
+                if rows is not None:
+                    span["rows"] = rows(result)
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+_instrumentation = Instrumentation()
+
+
+def get_instrumentation() -> Instrumentation:
+    return _instrumentation
+
+
+def set_instrumentation(instrumentation: Instrumentation):
+    """Replaces the process-wide instrumentation (e.g. a fresh one per run)."""
+    global _instrumentation
+    _instrumentation = instrumentation
@@ -0,0 +1,195 @@
+# Persistent, content-addressed cache of judge verdicts.
+#
+# Each row's metric results are stored under a hash of (metric definition,
+# row content, judge model), so re-running a suite only sends rows whose
+# inputs or metric changed. Entries live in a SQLite file, which gives safe
+# concurrent access from several worker processes, and are evicted least
+# recently used first once the cache grows past max_bytes.
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import pandas as pd
+from vertexai import types
+
+from eval_results import build_evaluation_result
+from instrumentation import get_instrumentation
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "vertex_ai_evaluations", "judge_cache.sqlite")
+DEFAULT_MAX_BYTES = 1 << 30
+
+# SQLite limits the number of bound parameters per statement.
+_QUERY_CHUNK = 500
+
+
+def _canonical_json(value) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def metric_fingerprint(metric) -> str:
+    """Stable description of everything about a metric that affects its verdicts.
+
+    For LLM metrics this includes the MetricPromptBuilder instruction,
+    criteria and rating_scores; prebuilt rubric metrics contribute their name
+    and version, and custom functions their qualified name.
+    """
+    custom_function = getattr(metric, "custom_function", None)
+    if hasattr(metric, "model_dump"):
+        definition = metric.model_dump(mode="json", exclude_none=True, exclude={"custom_function"})
+    else:
+        definition = {
+            "name": getattr(metric, "name", None),
+            "version": getattr(metric, "version", None),
+            "metric_kwargs": getattr(metric, "metric_kwargs", None),
+        }
+    if callable(custom_function):
+        definition["custom_function"] = f"{custom_function.__module__}.{custom_function.__qualname__}"
+    return _canonical_json(definition)
+
+
+def row_cache_keys(dataset: pd.DataFrame, metric, judge_model: str = None) -> list:
+    """Returns one hex key per row of the dataset."""
+    judge_model = judge_model or getattr(metric, "judge_model", None) or "default"
+    prefix = f"{metric_fingerprint(metric)}\x00{judge_model}\x00"
+    return [
+        hashlib.sha256((prefix + _canonical_json(row)).encode("utf-8")).hexdigest()
+        for row in dataset.to_dict("records")
+    ]
+
+
+class JudgeCache:
+    """SQLite-backed map from row key to that row's {metric_name: result} dict."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._conn_pid = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so each process opens its own.
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+            self._conn, self._conn_pid = conn, os.getpid()
+        return self._conn
+
+    def get_many(self, keys: list) -> dict:
+        """Returns {key: {metric_name: EvalCaseMetricResult}} for the keys present."""
+        conn = self._connection()
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        now = time.time()
+        for start in range(0, len(unique_keys), _QUERY_CHUNK):
+            chunk = unique_keys[start:start + _QUERY_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT key, value FROM entries WHERE key IN ({marks})", chunk).fetchall()
+            for key, value in rows:
+                found[key] = {
+                    name: types.EvalCaseMetricResult(**result)
+                    for name, result in json.loads(value).items()
+                }
+            if rows:
+                conn.execute(
+                    f"UPDATE entries SET last_access = ? WHERE key IN ({marks})", [now, *chunk]
+                )
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, entries: dict):
+        """Stores {key: {metric_name: EvalCaseMetricResult}} and enforces max_bytes."""
+        if not entries:
+            return
+        now = time.time()
+        rows = []
+        for key, metric_results in entries.items():
+            value = _canonical_json(
+                {name: r.model_dump(mode="json", exclude_none=True) for name, r in metric_results.items()}
+            )
+            rows.append((key, value, len(value), now))
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", rows)
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until we're back under the cap.
+        excess = total - self.max_bytes
+        freed = 0
+        stale = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def clear(self):
+        self._connection().execute("DELETE FROM entries")
+
+
+def evaluate_with_cache(evaluate_rows, dataset: pd.DataFrame, metric, cache: JudgeCache, judge_model: str = None):
+    """Evaluates only the rows missing from the cache and merges in cached verdicts.
+
+    ``evaluate_rows`` takes a DataFrame of rows and returns their
+    EvaluationResult. Returns an EvaluationResult covering every row of the
+    dataset, in order.
+    """
+    instrumentation = get_instrumentation()
+    with instrumentation.stage("cache_lookup", rows=len(dataset)):
+        keys = row_cache_keys(dataset, metric, judge_model)
+        cached = cache.get_many(keys)
+
+        # Duplicate rows share a key, so each distinct miss is judged once.
+        miss_positions = {}
+        for position, key in enumerate(keys):
+            if key not in cached:
+                miss_positions.setdefault(key, position)
+    instrumentation.count("cache_hit_rows", len(keys) - len(miss_positions))
+    instrumentation.count("cache_miss_rows", len(miss_positions))
+
+    if miss_positions:
+        miss_dataset = dataset.iloc[list(miss_positions.values())].reset_index(drop=True)
+        miss_result = evaluate_rows(miss_dataset)
+        miss_keys = list(miss_positions)
+        fresh = {}
+        for case in miss_result.eval_case_results or []:
+            metric_results = {}
+            for candidate in case.response_candidate_results or []:
+                metric_results.update(candidate.metric_results or {})
+            # Errors aren't cached so the row is retried next time.
+            if metric_results and all(r.error_message is None for r in metric_results.values()):
+                fresh[miss_keys[case.eval_case_index]] = metric_results
+            cached[miss_keys[case.eval_case_index]] = metric_results
+        with instrumentation.stage("cache_store", rows=len(fresh)):
+            cache.put_many(fresh)
+
+    case_metric_results = [cached.get(key, {}) for key in keys]
+    metric_names = list(dict.fromkeys(name for case in case_metric_results for name in case))
+    return build_evaluation_result(case_metric_results, metric_names, dataset=dataset)
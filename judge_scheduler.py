@@ -0,0 +1,265 @@
+# Request scheduler for judge calls: per-batch retries with full-jitter
+# exponential backoff, AIMD concurrency control, and isolation of rows that
+# keep failing so they don't sink the rest of the run.
+
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from vertexai import types
+
+from eval_results import build_evaluation_result, result_key
+from instrumentation import get_instrumentation
+
+THROTTLE_CODES = {429, 503}
+# gRPC status names, used when an error carries no HTTP status code.
+THROTTLE_STATUSES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE"}
+PERMANENT_STATUSES = {"INVALID_ARGUMENT", "FAILED_PRECONDITION", "OUT_OF_RANGE", "NOT_FOUND", "PERMISSION_DENIED"}
+_STATUS_NAME = re.compile(r"\b(%s)\b" % "|".join(sorted(THROTTLE_STATUSES | PERMANENT_STATUSES)))
+
+
+def _status_code(error: Exception):
+    for attr in ("code", "status_code"):
+        code = getattr(error, attr, None)
+        code = code() if callable(code) else code
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def _status_names(error: Exception) -> set:
+    status = getattr(error, "status", None)
+    if isinstance(status, str):
+        return {status}
+    return set(_STATUS_NAME.findall(str(error)))
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """True for client errors (4xx other than 429, INVALID_ARGUMENT) that
+    retrying won't fix."""
+    code = _status_code(error)
+    if code is not None:
+        return 400 <= code < 500 and code != 429
+    return bool(_status_names(error) & PERMANENT_STATUSES)
+
+
+def is_throttle_error(error: Exception) -> bool:
+    """True for quota / overload errors (HTTP 429 or 503, or RESOURCE_EXHAUSTED
+    / UNAVAILABLE when there's no status code)."""
+    code = _status_code(error)
+    if code is not None:
+        return code in THROTTLE_CODES
+    return bool(_status_names(error) & THROTTLE_STATUSES)
+
+
+class AIMDController:
+    """Concurrency limit that grows additively and shrinks multiplicatively.
+
+    Every success adds ``increase / limit`` (about +``increase`` per full
+    window of requests); a throttle multiplies the limit by ``decrease``,
+    at most once per ``cooldown_s`` so a burst of 429s from one overload
+    counts once.
+    """
+
+    def __init__(
+        self,
+        initial: float = 4,
+        minimum: float = 1,
+        maximum: float = 64,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        cooldown_s: float = 1.0,
+    ):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown_s = cooldown_s
+        self.in_flight = 0
+        self.throttles = 0
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, success: bool, throttled: bool):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.throttles += 1
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown_s:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._last_decrease = now
+            elif success:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            self._cond.notify_all()
+
+
+class JudgeScheduler:
+    """Runs client.evals.evaluate over a dataset in batches of ``batch_size`` rows.
+
+    Failed calls are retried with full-jitter exponential backoff (a random
+    sleep in [0, min(max_backoff_s, base_backoff_s * 2**attempt)]):
+    throttled calls up to ``max_throttle_retries`` times, other failures
+    up to ``max_retries`` times. A multi-row batch rejected as a bad request
+    (4xx, INVALID_ARGUMENT) is split in half until the failing rows are
+    isolated; rows that still fail get an error_message result instead of
+    a score.
+
+    With a token_budget.TokenBudget, rows are packed into token-balanced
+    requests instead, and oversize rows are truncated or answered with an
+    error without being sent, per the budget's policy.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 10,
+        max_retries: int = 5,
+        max_throttle_retries: int = 30,
+        base_backoff_s: float = 0.5,
+        max_backoff_s: float = 30.0,
+        max_workers: int = 64,
+        controller: AIMDController = None,
+        seed: int = None,
+        budget=None,
+    ):
+        self.batch_size = batch_size
+        self.budget = budget
+        self.max_retries = max_retries
+        self.max_throttle_retries = max_throttle_retries
+        self.base_backoff_s = base_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.max_workers = max_workers
+        self.controller = controller or AIMDController(maximum=max_workers)
+        self.calls = 0
+        self.retries = 0
+        self.failed_rows = 0
+        self._rng = random.Random(seed)
+        self._stats_lock = threading.Lock()
+
+    def _backoff(self, attempt: int) -> float:
+        return self._rng.uniform(0, min(self.max_backoff_s, self.base_backoff_s * 2 ** attempt))
+
+    def _call(self, eval_client, rows: pd.DataFrame, metric):
+        """One judge call under the concurrency limit."""
+        self.controller.acquire()
+        with self._stats_lock:
+            self.calls += 1
+        try:
+            result = eval_client.evals.evaluate(dataset=rows.reset_index(drop=True), metrics=[metric])
+        except Exception as e:
+            self.controller.release(success=False, throttled=is_throttle_error(e))
+            raise
+        self.controller.release(success=True, throttled=False)
+        return result
+
+    def _run_batch(self, eval_client, rows: pd.DataFrame, metric) -> list:
+        """Returns one {metric_name: EvalCaseMetricResult} dict per row."""
+        error = None
+        failures = 0
+        throttles = 0
+        while failures <= self.max_retries and throttles <= self.max_throttle_retries:
+            if failures or throttles:
+                with self._stats_lock:
+                    self.retries += 1
+                get_instrumentation().count("judge_retries")
+                time.sleep(self._backoff(max(failures, throttles) - 1))
+            try:
+                result = self._call(eval_client, rows, metric)
+            except Exception as e:
+                error = e
+                if is_throttle_error(e):
+                    # Not the rows' fault; the controller has already slowed down.
+                    throttles += 1
+                    get_instrumentation().count("judge_throttles")
+                    continue
+                if is_permanent_error(e):
+                    if len(rows) == 1:
+                        break
+                    # A bad row: judge each half on its own.
+                    middle = len(rows) // 2
+                    return (
+                        self._run_batch(eval_client, rows.iloc[:middle], metric)
+                        + self._run_batch(eval_client, rows.iloc[middle:], metric)
+                    )
+                # Transient (5xx, timeout): retry the batch as it is.
+                failures += 1
+                continue
+
+            case_results = [{} for _ in range(len(rows))]
+            for case in result.eval_case_results or []:
+                for candidate in case.response_candidate_results or []:
+                    case_results[case.eval_case_index].update(candidate.metric_results or {})
+            return case_results
+
+        with self._stats_lock:
+            self.failed_rows += len(rows)
+        get_instrumentation().count("judge_failed_rows", len(rows))
+        # Filed under the key judged rows come back under, so they're
+        # counted as errors of the same metric.
+        name = result_key(metric)
+        return [
+            {name: types.EvalCaseMetricResult(metric_name=name, error_message=f"JudgeCallError: {error}")}
+            for _ in range(len(rows))
+        ]
+
+    def run(self, eval_client, dataset: pd.DataFrame, metric) -> types.EvaluationResult:
+        """Evaluates every row and returns one EvaluationResult in row order."""
+        case_metric_results = [{} for _ in range(len(dataset))]
+        rows = dataset.reset_index(drop=True)
+        if self.budget is not None:
+            from token_budget import plan_requests
+
+            plan = plan_requests(rows, metric, self.budget)
+            rows, batches = plan.dataset, plan.batches
+            name = result_key(metric)
+            for row in plan.flagged_rows.tolist():
+                case_metric_results[row] = {
+                    name: types.EvalCaseMetricResult(metric_name=name, error_message=plan.flagged_message(row))
+                }
+        else:
+            batches = [
+                np.arange(start, min(start + self.batch_size, len(rows)))
+                for start in range(0, len(rows), self.batch_size)
+            ]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self._run_batch, eval_client, rows.iloc[batch], metric) for batch in batches]
+            for batch, future in zip(batches, futures):
+                for row, case in zip(batch.tolist(), future.result()):
+                    case_metric_results[row] = case
+
+        metric_names = list(dict.fromkeys(name for case in case_metric_results for name in case))
+        return build_evaluation_result(case_metric_results, metric_names, dataset=dataset)
+
+
+if __name__ == "__main__":
+    # Demo against the fake backend: it throttles above 12 concurrent calls,
+    # fails 2% of calls transiently and rejects rows marked "__bad__".
+    from fake_evals_client import FakeClient
+
+    fake = FakeClient(latency_s=0.05, capacity=12, error_rate=0.02, poison_marker="__bad__", seed=0)
+    rows = pd.DataFrame({
+        "prompt": [f"question {i}" for i in range(2000)],
+        "response": ["__bad__" if i % 500 == 7 else f"answer {i}" for i in range(2000)],
+    })
+    scheduler = JudgeScheduler(batch_size=10, base_backoff_s=0.05, seed=0)
+    start = time.perf_counter()
+    result = scheduler.run(fake, rows, types.RubricMetric.GENERAL_QUALITY)
+    elapsed = time.perf_counter() - start
+    print(result.summary_metrics)
+    print(
+        f"{len(rows) / elapsed:.0f} rows/s, {scheduler.calls} calls, {scheduler.retries} retries, "
+        f"{scheduler.failed_rows} failed rows, {scheduler.controller.throttles} throttles, "
+        f"final concurrency limit {scheduler.controller.limit:.1f}"
+    )
@@ -0,0 +1,108 @@
+# Runs custom_function metrics (e.g. pii_number_metric) locally across a
+# process pool instead of one row at a time through client.evals.evaluate.
+#
+# The custom functions must be importable module-level functions so they can
+# be sent to the worker processes.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from pydantic.v1 import BaseModel
+from vertexai import types
+
+from eval_results import build_evaluation_result
+from instrumentation import timed
+
+
+def _function_name(custom_function) -> str:
+    return getattr(custom_function, "__name__", "unknown_custom_function")
+
+
+def _run_custom_function(metric_name: str, custom_function, instance: dict) -> types.EvalCaseMetricResult:
+    """Scores one row, interpreting the return value like the evals service does."""
+    try:
+        output = custom_function(instance)
+    except Exception as e:
+        return types.EvalCaseMetricResult(
+            metric_name=metric_name,
+            error_message=f"CustomFunctionError({_function_name(custom_function)}): {e}",
+        )
+
+    if isinstance(output, types.EvalCaseMetricResult):
+        return output
+    if isinstance(output, dict) and "score" in output:
+        return types.EvalCaseMetricResult(
+            metric_name=metric_name,
+            score=output["score"],
+            explanation=output.get("explanation"),
+        )
+    if isinstance(output, (float, int)):
+        return types.EvalCaseMetricResult(metric_name=metric_name, score=output)
+    return types.EvalCaseMetricResult(
+        metric_name=metric_name,
+        error_message=(
+            f"CustomFunctionError({custom_function}): Returned unexpected type {type(output)}"
+        ),
+    )
+
+
+def _evaluate_chunk(functions: list, records: list) -> list:
+    """Worker entry point: scores every record of a chunk with every metric."""
+    return [
+        {name: _run_custom_function(name, fn, record) for name, fn in functions}
+        for record in records
+    ]
+
+
+class LocalCustomFunctionExecutor(BaseModel):
+    """Evaluates custom_function metrics on local cores.
+
+    The dataset is split into ``chunk_size`` row chunks which are scored in a
+    pool of ``max_workers`` processes; results come back in the original row
+    order as a types.EvaluationResult with per-case and summary metrics.
+    """
+
+    max_workers: int = os.cpu_count() or 1
+    chunk_size: int = 1000
+
+    @timed("custom_function", rows=lambda result: len(result.eval_case_results))
+    def evaluate(self, dataset: pd.DataFrame, metrics: list) -> types.EvaluationResult:
+        """Evaluates the dataset with the given custom_function metrics."""
+        functions = []
+        for metric in metrics:
+            if not callable(metric.custom_function):
+                raise ValueError(
+                    f"Metric '{metric.name}' has no custom_function and can't run locally."
+                )
+            functions.append((metric.name, metric.custom_function))
+
+        records = dataset.to_dict("records")
+        chunks = [
+            records[start:start + self.chunk_size]
+            for start in range(0, len(records), self.chunk_size)
+        ]
+
+        if self.max_workers <= 1 or len(chunks) <= 1:
+            chunk_results = [_evaluate_chunk(functions, chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                # map() yields in submission order, so rows stay aligned.
+                chunk_results = list(
+                    pool.map(_evaluate_chunk, [functions] * len(chunks), chunks)
+                )
+
+        case_metric_results = [case for chunk in chunk_results for case in chunk]
+        return build_evaluation_result(
+            case_metric_results, [name for name, _ in functions], dataset=dataset
+        )
+
+
+if __name__ == "__main__":
+    import sys
+
+    from custom_function_metric import eval_dataset, pii_number_metric
+
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    executor = LocalCustomFunctionExecutor(max_workers=workers)
+    print(executor.evaluate(eval_dataset, [pii_number_metric]))
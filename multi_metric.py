@@ -0,0 +1,301 @@
+# Judges several prompt-builder metrics with one request per row.
+#
+# Metrics defined with a MetricPromptBuilder (instruction, criteria,
+# rating_scores) that use the same judge settings are folded into a single
+# composite LLMMetric. Its criteria and rating scores are namespaced by the
+# member metric ("context_relevance.accuracy", "context_relevance: 3"), and
+# the judge is asked to answer with one JSON object holding a score and an
+# explanation per member. split_composite_result turns that answer back into
+# ordinary per-metric EvalCaseMetricResults. The row's prompt, response and
+# context are sent once instead of once per metric.
+#
+# Prebuilt metrics (types.RubricMetric.*) carry their rubrics server side and
+# can't be merged; evaluate_batched still judges them, one pass each.
+
+import json
+import re
+
+import pandas as pd
+
+from eval_results import build_evaluation_result, result_key
+
+NAMESPACE_SEPARATOR = "."
+# The composite prompt lists its members on a line starting with this, so
+# the split step (and the fake backend) can recover them from the prompt.
+OUTPUT_KEYS_PREFIX = "Output keys: "
+
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+# Every MetricPromptBuilder template ends with this section, which feeds the
+# row's prompt and response to the judge.
+USER_INPUTS_HEADING = "# User Inputs and AI-generated Response"
+
+
+def _parse_prompt_sections(template: str) -> dict:
+    """Reads the parts of a template rendered by MetricPromptBuilder.
+
+    Returns {"# Instruction": text, "## Criteria": text, ...}, one entry per
+    heading, with the text under it.
+    """
+    sections = {}
+    heading = None
+    for line in template.splitlines():
+        if line.startswith("#"):
+            heading = line.strip()
+            sections[heading] = []
+        elif heading is not None:
+            sections[heading].append(line)
+    return {heading: "\n".join(lines).strip() for heading, lines in sections.items()}
+
+
+def _parse_prompt_dict(text: str) -> dict:
+    # MetricPromptBuilder renders dicts as one "key: value" line per entry.
+    entries = {}
+    for line in text.splitlines():
+        key, separator, value = line.partition(": ")
+        if separator:
+            entries[key.strip()] = value.strip()
+    return entries
+
+
+def _prompt_parts(metric):
+    """(instruction, criteria, rating_scores) of a prompt-builder metric, else None.
+
+    LLMMetric renders a MetricPromptBuilder to text on construction, so the
+    parts are read back from the rendered template.
+    """
+    from vertexai import types
+
+    template = getattr(metric, "prompt_template", None)
+    if isinstance(template, types.MetricPromptBuilder):
+        return template.instruction, dict(template.criteria or {}), dict(template.rating_scores or {})
+    if not isinstance(template, str) or USER_INPUTS_HEADING not in template:
+        return None
+    sections = _parse_prompt_sections(template)
+    criteria = _parse_prompt_dict(sections.get("## Criteria", ""))
+    rating_scores = _parse_prompt_dict(sections.get("## Rating Scores", ""))
+    if "# Instruction" not in sections or not criteria or not rating_scores:
+        return None
+    return sections["# Instruction"], criteria, rating_scores
+
+
+def _judge_settings(metric) -> str:
+    # Only metrics judged the same way can share a request.
+    return json.dumps(
+        [
+            getattr(metric, "judge_model", None),
+            getattr(metric, "judge_model_system_instruction", None),
+            str(getattr(metric, "judge_model_generation_config", None)),
+            getattr(metric, "judge_model_sampling_count", None),
+        ],
+        default=str,
+    )
+
+
+def is_composable(metric) -> bool:
+    """True for LLM metrics defined by a MetricPromptBuilder with criteria and rating scores."""
+    return (
+        _prompt_parts(metric) is not None
+        and getattr(metric, "custom_function", None) is None
+        and not getattr(metric, "result_parsing_function", None)
+    )
+
+
+def plan_metric_batches(metrics: list) -> list:
+    """Splits metrics into batches judged with one request per row.
+
+    Returns a list of member lists. Composable metrics with the same judge
+    settings share a batch. Every other metric gets a batch of its own.
+    """
+    batches = []
+    composable = {}
+    for metric in metrics:
+        if is_composable(metric):
+            key = _judge_settings(metric)
+            if key not in composable:
+                composable[key] = []
+                batches.append(composable[key])
+            composable[key].append(metric)
+        else:
+            batches.append([metric])
+    return batches
+
+
+def composite_name(metrics: list) -> str:
+    return "+".join(metric.name for metric in metrics)
+
+
+def build_composite_metric(metrics: list):
+    """Builds one LLMMetric that judges every metric in ``metrics`` at once."""
+    from vertexai import types
+
+    names = [metric.name for metric in metrics]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Metric names must be unique to be combined, got {names}.")
+
+    criteria = {}
+    rating_scores = {}
+    sections = []
+    for metric in metrics:
+        instruction, metric_criteria, metric_rating_scores = _prompt_parts(metric)
+        for criterion, definition in metric_criteria.items():
+            criteria[f"{metric.name}{NAMESPACE_SEPARATOR}{criterion}"] = definition
+        for score, definition in metric_rating_scores.items():
+            rating_scores[f"{metric.name}: {score}"] = definition
+        sections.append(f"- {metric.name}: {' '.join(instruction.split())}")
+
+    # Kept free of braces, which the service would read as template variables.
+    instruction = (
+        "You are evaluating the response against several independent metrics at once.\n"
+        + "\n".join(sections)
+        + "\nScore each metric only against the criteria and rating scores prefixed with its name."
+        + f"\n{OUTPUT_KEYS_PREFIX}{', '.join(names)}"
+        + "\nAnswer with a single JSON object and nothing else. It must have one entry per output key,"
+        + ' each an object with a "score" (one of that metric\'s rating scores) and a short "explanation".'
+    )
+    builder = types.MetricPromptBuilder(
+        instruction=instruction,
+        criteria=criteria,
+        rating_scores=rating_scores,
+        evaluation_steps={
+            "Step 1": "For each metric, assess the response against that metric's criteria only.",
+            "Step 2": "For each metric, pick one of that metric's rating scores and explain it briefly.",
+            "Step 3": "Return the JSON object with one entry per metric.",
+        },
+    )
+    first = metrics[0]
+    return types.LLMMetric(
+        name=composite_name(metrics),
+        prompt_template=builder,
+        return_raw_output=True,
+        judge_model=getattr(first, "judge_model", None),
+        judge_model_system_instruction=getattr(first, "judge_model_system_instruction", None),
+        judge_model_generation_config=getattr(first, "judge_model_generation_config", None),
+        judge_model_sampling_count=getattr(first, "judge_model_sampling_count", None),
+    )
+
+
+def composite_member_names(prompt_template: str) -> list:
+    """The member metric names listed in a composite prompt."""
+    for line in str(prompt_template).splitlines():
+        if line.startswith(OUTPUT_KEYS_PREFIX):
+            return [name.strip() for name in line[len(OUTPUT_KEYS_PREFIX):].split(",") if name.strip()]
+    return []
+
+
+def _parse_judge_output(text: str) -> dict:
+    match = _JSON_OBJECT_RE.search(text or "")
+    if not match:
+        raise ValueError("no JSON object in the judge output")
+    parsed = json.loads(match.group(0))
+    if not isinstance(parsed, dict):
+        raise ValueError("judge output is not a JSON object")
+    return parsed
+
+
+def split_composite_metric_result(composite_result, member_names: list) -> dict:
+    """Splits one composite EvalCaseMetricResult into {member_name: EvalCaseMetricResult}."""
+    from vertexai import types
+
+    def failed(message):
+        return {name: types.EvalCaseMetricResult(metric_name=name, error_message=message) for name in member_names}
+
+    if composite_result.error_message:
+        return failed(composite_result.error_message)
+
+    raw = "\n".join(composite_result.raw_output or []) or composite_result.explanation
+    try:
+        parsed = _parse_judge_output(raw)
+    except ValueError as e:
+        return failed(f"CompositeParseError: {e}")
+
+    results = {}
+    for name in member_names:
+        entry = parsed.get(name)
+        try:
+            score = float(entry["score"])
+        except (TypeError, KeyError, ValueError):
+            results[name] = types.EvalCaseMetricResult(
+                metric_name=name, error_message=f"CompositeParseError: no score for '{name}' in the judge output"
+            )
+            continue
+        results[name] = types.EvalCaseMetricResult(
+            metric_name=name, score=score, explanation=entry.get("explanation")
+        )
+    return results
+
+
+def split_composite_result(result, composite, member_names: list, num_rows: int) -> list:
+    """Per-row {member_name: EvalCaseMetricResult} dicts from a composite EvaluationResult."""
+    cases = [{} for _ in range(num_rows)]
+    for case in result.eval_case_results or []:
+        for candidate in case.response_candidate_results or []:
+            composite_result = (candidate.metric_results or {}).get(composite.name)
+            if composite_result is not None:
+                cases[case.eval_case_index].update(split_composite_metric_result(composite_result, member_names))
+    return cases
+
+
+def _case_metric_results(result, num_rows: int) -> list:
+    cases = [{} for _ in range(num_rows)]
+    for case in result.eval_case_results or []:
+        for candidate in case.response_candidate_results or []:
+            cases[case.eval_case_index].update(candidate.metric_results or {})
+    return cases
+
+
+def evaluate_batched(eval_client, dataset: pd.DataFrame, metrics: list, **judge_options):
+    """Evaluates ``dataset`` with all ``metrics``, composing what can be composed.
+
+    ``judge_options`` (cache, dedup, scheduler) are passed to run_judge for
+    every batch. Returns an EvaluationResult with one result per metric per
+    row, as if each metric had been judged on its own. Metrics judged on
+    their own are keyed as the service returns them (see
+    eval_results.result_key).
+    """
+    from evaluation_pipeline import run_judge
+
+    case_metric_results = [{} for _ in range(len(dataset))]
+    keys = {}
+    for batch in plan_metric_batches(metrics):
+        if len(batch) > 1:
+            composite = build_composite_metric(batch)
+            result, _ = run_judge(eval_client, dataset, composite, **judge_options)
+            batch_cases = split_composite_result(result, composite, [metric.name for metric in batch], len(dataset))
+            keys.update((id(metric), metric.name) for metric in batch)
+        else:
+            result, _ = run_judge(eval_client, dataset, batch[0], **judge_options)
+            batch_cases = _case_metric_results(result, len(dataset))
+            keys[id(batch[0])] = result_key(batch[0], result)
+        for case_results, batch_results in zip(case_metric_results, batch_cases):
+            case_results.update(batch_results)
+
+    metric_names = list(dict.fromkeys(keys[id(metric)] for metric in metrics))
+    return build_evaluation_result(case_metric_results, metric_names, dataset=dataset)
+
+
+def estimate_request_savings(dataset: pd.DataFrame, metrics: list) -> dict:
+    """Judge requests and input characters with and without batching.
+
+    Input size is the row payload plus the metric's prompt template per
+    request; the row payload dominates for long contexts.
+    """
+    from instrumentation import estimate_payload_bytes
+
+    row_chars = estimate_payload_bytes(dataset)
+    rows = len(dataset)
+
+    def template_chars(metric):
+        return len(str(getattr(metric, "prompt_template", None) or ""))
+
+    separate_chars = sum(row_chars + rows * template_chars(metric) for metric in metrics)
+    batches = plan_metric_batches(metrics)
+    batched_chars = sum(
+        row_chars + rows * (len(build_composite_metric(batch).prompt_template) if len(batch) > 1 else template_chars(batch[0]))
+        for batch in batches
+    )
+    return {
+        "requests_separate": rows * len(metrics),
+        "requests_batched": rows * len(batches),
+        "input_chars_separate": separate_chars,
+        "input_chars_batched": batched_chars,
+    }
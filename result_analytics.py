@@ -0,0 +1,218 @@
+# Local summary statistics over flattened evaluation results (see
+# result_store.flatten_eval_result), so results can be summarized and sliced
+# without re-querying or re-judging:
+#
+#   metric_summary      per-metric count/mean/std/percentiles
+#   score_histograms    per-metric score histograms
+#   rubric_pass_rates   per-rubric pass rates across cases
+#   pairwise_win_rates  candidate vs baseline win/tie rates
+#   slice_summary       any of the score stats broken down by dataset columns
+#
+# Everything is a single groupby or bincount over the result rows.
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PERCENTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# pairwise_choice values as the SDK spells them, with or without the enum
+# class prefix; AutoSxS-style "A"/"B" is accepted too.
+CANDIDATE_CHOICES = {"CANDIDATE", "A"}
+BASELINE_CHOICES = {"BASELINE", "B"}
+
+
+def _valid_scores(cases: pd.DataFrame) -> pd.DataFrame:
+    valid = cases["score"].notna().to_numpy()
+    if "error_message" in cases:
+        valid = valid & cases["error_message"].isna().to_numpy()
+    return cases.loc[valid]
+
+
+def _score_stats(cases: pd.DataFrame, keys: list, percentiles) -> pd.DataFrame:
+    grouped = cases.groupby(keys, observed=True, sort=True, dropna=False)
+    valid = _valid_scores(cases).groupby(keys, observed=True, sort=True, dropna=False)["score"]
+
+    stats = pd.DataFrame({"num_cases_total": grouped.size()})
+    stats["num_cases_valid"] = valid.size()
+    stats["num_cases_valid"] = stats["num_cases_valid"].fillna(0).astype("int64")
+    stats["num_cases_error"] = stats["num_cases_total"] - stats["num_cases_valid"]
+    stats["mean_score"] = valid.mean()
+    stats["stdev_score"] = valid.std()
+    if percentiles:
+        quantiles = valid.quantile(list(percentiles)).unstack()
+        quantiles.columns = [f"p{round(q * 100):g}" for q in quantiles.columns]
+        # Joined by position: NaN slice keys don't match on a label join.
+        positions = stats.index.get_indexer(quantiles.index)
+        for column in quantiles.columns:
+            values = np.full(len(stats), np.nan)
+            values[positions] = quantiles[column].to_numpy()
+            stats[column] = values
+    return stats.reset_index()
+
+
+def metric_summary(cases: pd.DataFrame, percentiles=DEFAULT_PERCENTILES) -> pd.DataFrame:
+    """Per-metric counts, mean, sample stdev and score percentiles.
+
+    Counts and mean/stdev match the service's summary_metrics: rows with an
+    error or no score are counted as errors and left out of the statistics.
+    """
+    return _score_stats(cases, ["metric_name"], percentiles)
+
+
+def score_histograms(cases: pd.DataFrame, bins: int = 10) -> pd.DataFrame:
+    """Score histograms per metric, as rows of (metric_name, bin_left, bin_right, count).
+
+    Each metric gets ``bins`` equal-width bins over its own score range; the
+    last bin is closed on the right.
+    """
+    valid = _valid_scores(cases)
+    metric = pd.Categorical(valid["metric_name"].astype(str))
+    codes = metric.codes
+    scores = valid["score"].to_numpy(dtype="float64")
+    num_metrics = len(metric.categories)
+
+    low = np.full(num_metrics, np.inf)
+    high = np.full(num_metrics, -np.inf)
+    np.minimum.at(low, codes, scores)
+    np.maximum.at(high, codes, scores)
+    width = np.where(high > low, (high - low) / bins, 1.0)
+
+    bin_index = np.clip(((scores - low[codes]) / width[codes]).astype(np.int64), 0, bins - 1)
+    counts = np.bincount(codes * bins + bin_index, minlength=num_metrics * bins)
+
+    bin_number = np.tile(np.arange(bins), num_metrics)
+    metric_low = np.repeat(low, bins)
+    metric_width = np.repeat(width, bins)
+    return pd.DataFrame({
+        "metric_name": np.repeat(np.asarray(metric.categories, dtype=object), bins),
+        "bin_left": metric_low + bin_number * metric_width,
+        "bin_right": metric_low + (bin_number + 1) * metric_width,
+        "count": counts,
+    })
+
+
+def _rubric_labels(verdicts: pd.DataFrame) -> pd.Series:
+    # Rubrics are identified by description, falling back to the id. Kept
+    # categorical so grouping works on integer codes.
+    labels = pd.Categorical(verdicts["rubric_description"])
+    missing = labels.isna()
+    if not missing.any():
+        return pd.Series(labels)
+    fallback = pd.Series(verdicts["rubric_id"].to_numpy()[missing], dtype=object).fillna("N/A").astype(str)
+    fallback_codes, fallback_labels = pd.factorize(fallback)
+    categories = pd.Index(labels.categories.astype(str)).append(
+        pd.Index(fallback_labels).difference(labels.categories.astype(str))
+    )
+    codes = labels.codes.copy()
+    codes[missing] = categories.get_indexer(fallback_labels)[fallback_codes]
+    return pd.Series(pd.Categorical.from_codes(codes, categories))
+
+
+def rubric_pass_rates(verdicts: pd.DataFrame, dataset: pd.DataFrame = None, by: list = None) -> pd.DataFrame:
+    """Pass rate per (metric, rubric), optionally split by dataset columns ``by``.
+
+    ``num_cases_failing`` counts distinct cases with at least one failing
+    verdict on the rubric.
+    """
+    frame = pd.DataFrame({
+        "eval_case_index": verdicts["eval_case_index"].to_numpy(),
+        "metric_name": pd.Categorical(verdicts["metric_name"]),
+        "rubric": _rubric_labels(verdicts).array,
+        "passed": verdicts["verdict"].to_numpy(dtype=bool),
+    })
+    keys = ["metric_name", "rubric"]
+    if isinstance(by, str):
+        by = [by]
+    if by:
+        frame = _join_slices(frame, dataset, by)
+        keys = keys + list(by)
+
+    grouped = frame.groupby(keys, observed=True, sort=True, dropna=False)
+    stats = pd.DataFrame({
+        "num_verdicts": grouped.size(),
+        "num_passed": grouped["passed"].sum(),
+    })
+    stats["pass_rate"] = stats["num_passed"] / stats["num_verdicts"]
+    failing = frame.loc[~frame["passed"]]
+    stats["num_cases_failing"] = (
+        failing.groupby(keys, observed=True, sort=True, dropna=False)["eval_case_index"].nunique()
+    )
+    stats["num_cases_failing"] = stats["num_cases_failing"].fillna(0).astype("int64")
+    return stats.reset_index()
+
+
+def _normalized_choices(choices: pd.Series) -> np.ndarray:
+    text = choices.astype(object).fillna("").astype(str).str.upper()
+    return text.str.rsplit(".", n=1).str[-1].str.strip().to_numpy()
+
+
+def pairwise_win_rates(cases: pd.DataFrame, baseline_response: int = 0) -> pd.DataFrame:
+    """Candidate vs baseline win/tie rates per metric.
+
+    Uses the judge's ``pairwise_choice`` where a row has one. Otherwise, when
+    a case has several response candidates, each candidate is compared by
+    score with the ``baseline_response`` candidate of the same case and metric.
+    """
+    outcomes = []
+
+    choice_rows = cases.loc[cases["pairwise_choice"].notna()] if "pairwise_choice" in cases else cases.iloc[:0]
+    if len(choice_rows):
+        choice = _normalized_choices(choice_rows["pairwise_choice"])
+        outcomes.append(pd.DataFrame({
+            "metric_name": choice_rows["metric_name"].astype(str).to_numpy(),
+            "response_index": choice_rows["response_index"].to_numpy(),
+            "outcome": np.where(
+                np.isin(choice, list(CANDIDATE_CHOICES)), 0, np.where(np.isin(choice, list(BASELINE_CHOICES)), 1, 2)
+            ),
+        }))
+
+    scored = _valid_scores(cases.loc[cases["pairwise_choice"].isna()] if "pairwise_choice" in cases else cases)
+    baseline = scored.loc[scored["response_index"] == baseline_response, ["eval_case_index", "metric_name", "score"]]
+    candidates = scored.loc[scored["response_index"] != baseline_response]
+    if len(baseline) and len(candidates):
+        paired = candidates.merge(baseline, on=["eval_case_index", "metric_name"], suffixes=("", "_baseline"))
+        diff = paired["score"].to_numpy() - paired["score_baseline"].to_numpy()
+        outcomes.append(pd.DataFrame({
+            "metric_name": paired["metric_name"].astype(str).to_numpy(),
+            "response_index": paired["response_index"].to_numpy(),
+            "outcome": np.where(diff > 0, 0, np.where(diff < 0, 1, 2)),
+        }))
+
+    columns = ["metric_name", "response_index", "n", "candidate_win_rate", "baseline_win_rate", "tie_rate"]
+    if not outcomes:
+        return pd.DataFrame(columns=columns)
+
+    frame = pd.concat(outcomes, ignore_index=True)
+    counts = pd.crosstab([frame["metric_name"], frame["response_index"]], frame["outcome"])
+    counts = counts.reindex(columns=[0, 1, 2], fill_value=0)
+    n = counts.sum(axis=1)
+    rates = pd.DataFrame({
+        "n": n,
+        "candidate_win_rate": counts[0] / n,
+        "baseline_win_rate": counts[1] / n,
+        "tie_rate": counts[2] / n,
+    })
+    return rates.reset_index()[columns]
+
+
+def _join_slices(frame: pd.DataFrame, dataset: pd.DataFrame, by: list) -> pd.DataFrame:
+    # eval_case_index is the row position in the evaluated dataset.
+    if dataset is None:
+        raise ValueError("A dataset is required to slice by dataset columns.")
+    missing = [column for column in by if column not in dataset.columns]
+    if missing:
+        raise ValueError(f"Dataset has no column(s) {missing}.")
+    positions = frame["eval_case_index"].to_numpy()
+    frame = frame.copy()
+    for column in by:
+        frame[column] = dataset[column].to_numpy()[positions]
+    return frame
+
+
+def slice_summary(
+    cases: pd.DataFrame, dataset: pd.DataFrame, by: list, percentiles=DEFAULT_PERCENTILES
+) -> pd.DataFrame:
+    """metric_summary broken down by the dataset columns ``by``."""
+    if isinstance(by, str):
+        by = [by]
+    return _score_stats(_join_slices(cases, dataset, by), ["metric_name"] + list(by), percentiles)
@@ -0,0 +1,165 @@
+# Flattens nested EvaluationResults into two columnar tables and stores them
+# as Arrow IPC files that can be memory-mapped back in:
+#
+#   cases:    eval_case_index, response_index, metric_name, score,
+#             pairwise_choice, explanation, error_message
+#   verdicts: eval_case_index, response_index, metric_name, rubric_id,
+#             verdict, reasoning, rubric_description
+#
+# metric_name and rubric_description are dictionary-encoded, since the same
+# few values repeat on every row.
+
+import os
+
+import pandas as pd
+
+from instrumentation import timed
+
+CASES_FILE = "cases.arrow"
+VERDICTS_FILE = "verdicts.arrow"
+
+CASE_COLUMNS = [
+    "eval_case_index",
+    "response_index",
+    "metric_name",
+    "score",
+    "pairwise_choice",
+    "explanation",
+    "error_message",
+]
+VERDICT_COLUMNS = [
+    "eval_case_index",
+    "response_index",
+    "metric_name",
+    "rubric_id",
+    "verdict",
+    "reasoning",
+    "rubric_description",
+]
+DICTIONARY_COLUMNS = ["metric_name", "rubric_description"]
+
+
+@timed("parse_results", rows=lambda tables: len(tables[0]))
+def flatten_eval_result(result) -> tuple:
+    """Returns (cases, verdicts) DataFrames for an EvaluationResult."""
+    cases = {c: [] for c in CASE_COLUMNS}
+    verdicts = {c: [] for c in VERDICT_COLUMNS}
+
+    for case in result.eval_case_results or []:
+        for candidate in case.response_candidate_results or []:
+            response_index = candidate.response_index or 0
+            for metric_name, metric_res in (candidate.metric_results or {}).items():
+                cases["eval_case_index"].append(case.eval_case_index)
+                cases["response_index"].append(response_index)
+                cases["metric_name"].append(metric_name)
+                cases["score"].append(getattr(metric_res, "score", None))
+                pairwise_choice = getattr(metric_res, "pairwise_choice", None)
+                cases["pairwise_choice"].append(None if pairwise_choice is None else str(pairwise_choice))
+                cases["explanation"].append(getattr(metric_res, "explanation", None))
+                cases["error_message"].append(getattr(metric_res, "error_message", None))
+
+                for v in getattr(metric_res, "rubric_verdicts", None) or []:
+                    rubric_id = None
+                    rubric_desc = None
+                    if v.evaluated_rubric:
+                        rubric_id = v.evaluated_rubric.rubric_id
+                        if v.evaluated_rubric.content and v.evaluated_rubric.content.property:
+                            rubric_desc = v.evaluated_rubric.content.property.description
+                    verdicts["eval_case_index"].append(case.eval_case_index)
+                    verdicts["response_index"].append(response_index)
+                    verdicts["metric_name"].append(metric_name)
+                    verdicts["rubric_id"].append(rubric_id)
+                    verdicts["verdict"].append(bool(v.verdict))
+                    verdicts["reasoning"].append(v.reasoning)
+                    verdicts["rubric_description"].append(rubric_desc)
+
+    return _typed_frame(cases), _typed_frame(verdicts)
+
+
+def _typed_frame(columns: dict) -> pd.DataFrame:
+    frame = pd.DataFrame(columns)
+    for column in ("eval_case_index", "response_index"):
+        frame[column] = frame[column].astype("int64")
+    if "score" in frame:
+        frame["score"] = pd.to_numeric(frame["score"], errors="coerce").astype("float64")
+    if "verdict" in frame:
+        frame["verdict"] = frame["verdict"].astype(bool)
+    for column in DICTIONARY_COLUMNS:
+        if column in frame:
+            frame[column] = frame[column].astype("category")
+    return frame
+
+
+def verdict_display_table(verdicts: pd.DataFrame) -> pd.DataFrame:
+    """Formats verdict rows the way the Streamlit UIs show them."""
+    return pd.DataFrame({
+        "Verdict": verdicts["verdict"].map({True: "Pass", False: "Fail"}).to_numpy(),
+        "Rubric Description": verdicts["rubric_description"].astype(object).fillna("N/A").to_numpy(),
+        "Reasoning": verdicts["reasoning"].to_numpy(),
+        "ID": verdicts["rubric_id"].astype(object).fillna("N/A").to_numpy(),
+    })
+
+
+def _arrow_schema(frame: pd.DataFrame):
+    import pyarrow as pa
+
+    types_by_column = {
+        "eval_case_index": pa.int64(),
+        "response_index": pa.int64(),
+        "metric_name": pa.dictionary(pa.int32(), pa.string()),
+        "score": pa.float64(),
+        "pairwise_choice": pa.string(),
+        "explanation": pa.string(),
+        "error_message": pa.string(),
+        "rubric_id": pa.string(),
+        "verdict": pa.bool_(),
+        "reasoning": pa.string(),
+        "rubric_description": pa.dictionary(pa.int32(), pa.string()),
+    }
+    return pa.schema([(column, types_by_column[column]) for column in frame.columns])
+
+
+def save_result_store(result, directory: str) -> tuple:
+    """Flattens ``result`` and writes uncompressed Arrow IPC files to ``directory``.
+
+    Uncompressed IPC is what lets load_result_store memory-map the tables
+    instead of parsing them. Returns the (cases, verdicts) DataFrames.
+    """
+    cases, verdicts = flatten_eval_result(result)
+    write_result_tables(cases, verdicts, directory)
+    return cases, verdicts
+
+
+def write_result_tables(cases: pd.DataFrame, verdicts: pd.DataFrame, directory: str):
+    """Writes already flattened (cases, verdicts) the way save_result_store does."""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    os.makedirs(directory, exist_ok=True)
+    for frame, name in ((cases, CASES_FILE), (verdicts, VERDICTS_FILE)):
+        table = pa.Table.from_pandas(frame, schema=_arrow_schema(frame), preserve_index=False)
+        feather.write_feather(table, os.path.join(directory, name), compression="uncompressed")
+
+
+def save_result_store_parquet(result, directory: str) -> tuple:
+    """Same tables as save_result_store, as compressed Parquet for archiving."""
+    cases, verdicts = flatten_eval_result(result)
+    os.makedirs(directory, exist_ok=True)
+    cases.to_parquet(os.path.join(directory, "cases.parquet"), index=False)
+    verdicts.to_parquet(os.path.join(directory, "verdicts.parquet"), index=False)
+    return cases, verdicts
+
+
+def load_result_store(directory: str) -> tuple:
+    """Memory-maps the (cases, verdicts) Arrow tables written by save_result_store.
+
+    No data is copied until columns are touched; call .to_pandas() on a
+    table (or a filtered slice of it) to get a DataFrame.
+    """
+    import pyarrow as pa
+
+    tables = []
+    for name in (CASES_FILE, VERDICTS_FILE):
+        source = pa.memory_map(os.path.join(directory, name), "r")
+        tables.append(pa.ipc.open_file(source).read_all())
+    return tuple(tables)
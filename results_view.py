@@ -0,0 +1,257 @@
+# Paginated, filterable results view shared by the Streamlit dashboards.
+#
+# The dashboards used to create an expander, a handful of markdown widgets
+# and a fresh st.table for every case on every rerun. Here the flattened
+# result tables (see result_store.py) are indexed once into a ResultIndex,
+# which the dashboards cache across reruns, and each rerun only filters that
+# index with vectorized masks and renders the cases on the visible page.
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import get_instrumentation
+from result_store import verdict_display_table
+
+DEFAULT_PAGE_SIZE = 20
+PAGE_SIZES = [10, 20, 50, 100]
+ANY_RUBRIC = "(any)"
+ALL_METRICS = "(all metrics)"
+
+
+class ResultIndex:
+    """Precomputed lookups over the flattened (cases, verdicts) tables."""
+
+    def __init__(self, cases: pd.DataFrame, verdicts: pd.DataFrame):
+        self.cases = cases.sort_values(["eval_case_index", "response_index"], kind="stable").reset_index(drop=True)
+        self.verdicts = verdicts.sort_values(
+            ["eval_case_index", "response_index"], kind="stable"
+        ).reset_index(drop=True)
+
+        # Row ranges per case, so a page only touches its own rows.
+        self._case_positions = self.cases["eval_case_index"].to_numpy()
+        self._verdict_positions = self.verdicts["eval_case_index"].to_numpy()
+        self.case_ids = np.unique(self._case_positions)
+
+        self.metric_names = sorted(self.cases["metric_name"].astype(str).unique())
+        self._metric_codes = _codes(self.cases["metric_name"], self.metric_names)
+        self._scores = self.cases["score"].to_numpy(dtype="float64")
+        scores = self.cases["score"].dropna()
+        self.score_bounds = (float(scores.min()), float(scores.max())) if len(scores) else (0.0, 1.0)
+
+        # Failing rubrics are labelled by description, falling back to the id.
+        failing = self.verdicts.loc[~self.verdicts["verdict"]]
+        labels = failing["rubric_description"].astype(object).fillna(failing["rubric_id"]).fillna("N/A").astype(str)
+        self.failing_rubrics = sorted(labels.unique())
+        self._failing_cases = failing["eval_case_index"].to_numpy()
+        self._failing_metric_codes = _codes(failing["metric_name"], self.metric_names)
+        self._failing_rubric_codes = _codes(labels, self.failing_rubrics)
+
+        # Paging through one filter result must not redo the filtering.
+        self._last_filter = None
+        self._summary_tables = None
+
+    def summary_tables(self) -> dict:
+        """Local analytics over the whole result, computed once per index."""
+        if self._summary_tables is None:
+            from result_analytics import metric_summary, pairwise_win_rates, rubric_pass_rates, score_histograms
+
+            with get_instrumentation().stage("summary_statistics", rows=len(self.cases)):
+                self._summary_tables = {
+                    "metrics": metric_summary(self.cases),
+                    "histograms": score_histograms(self.cases),
+                    "rubrics": rubric_pass_rates(self.verdicts),
+                    "pairwise": pairwise_win_rates(self.cases),
+                }
+        return self._summary_tables
+
+    def filter_case_ids(self, metrics=None, score_range=None, failing_rubric=None) -> np.ndarray:
+        """Returns the sorted case indices matching every given filter.
+
+        A case matches when at least one of its rows for the selected metrics
+        has a score inside ``score_range`` and, if ``failing_rubric`` is given,
+        a failed verdict on that rubric (``ANY_RUBRIC`` matches any failure).
+        """
+        filter_key = (tuple(metrics or ()), None if score_range is None else tuple(score_range), failing_rubric)
+        if self._last_filter is not None and self._last_filter[0] == filter_key:
+            return self._last_filter[1]
+
+        mask = np.ones(len(self.cases), dtype=bool)
+        if metrics:
+            metric_codes = _codes(pd.Series(list(metrics)), self.metric_names)
+            mask &= np.isin(self._metric_codes, metric_codes)
+        if score_range is not None and tuple(score_range) != self.score_bounds:
+            low, high = score_range
+            mask &= (self._scores >= low) & (self._scores <= high)
+        case_ids = _sorted_unique(self._case_positions[mask])
+
+        if failing_rubric:
+            failing_mask = np.ones(len(self._failing_cases), dtype=bool)
+            if metrics:
+                failing_mask &= np.isin(self._failing_metric_codes, metric_codes)
+            if failing_rubric != ANY_RUBRIC:
+                rubric_code = _codes(pd.Series([failing_rubric]), self.failing_rubrics)[0]
+                failing_mask &= self._failing_rubric_codes == rubric_code
+            failing_case = np.zeros(self.case_ids[-1] + 1 if len(self.case_ids) else 0, dtype=bool)
+            failing_case[self._failing_cases[failing_mask]] = True
+            case_ids = case_ids[failing_case[case_ids]]
+
+        self._last_filter = (filter_key, case_ids)
+        return case_ids
+
+    def case_rows(self, case_index: int) -> pd.DataFrame:
+        start, stop = np.searchsorted(self._case_positions, [case_index, case_index + 1])
+        return self.cases.iloc[start:stop]
+
+    def verdict_rows(self, case_index: int) -> pd.DataFrame:
+        start, stop = np.searchsorted(self._verdict_positions, [case_index, case_index + 1])
+        return self.verdicts.iloc[start:stop]
+
+
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    """np.unique for an already sorted array, without the extra sort."""
+    if not len(values):
+        return values
+    return values[np.concatenate(([True], values[1:] != values[:-1]))]
+
+
+def _codes(values: pd.Series, categories: list) -> np.ndarray:
+    """Maps values to their position in ``categories`` (-1 when absent)."""
+    return pd.Categorical(values.astype(str), categories=categories).codes
+
+
+def page_slice(case_ids: np.ndarray, page: int, page_size: int) -> np.ndarray:
+    """Returns the case ids on 1-based ``page``; out-of-range pages are clamped."""
+    num_pages = max(1, -(-len(case_ids) // page_size))
+    page = min(max(page, 1), num_pages)
+    return case_ids[(page - 1) * page_size:page * page_size]
+
+
+def render_results_page(index: ResultIndex, key: str = "results"):
+    """Draws the filter controls and the visible page of cases."""
+    import streamlit as st
+
+    filter_cols = st.columns(3)
+    with filter_cols[0]:
+        metrics = st.multiselect("Metric", index.metric_names, key=f"{key}_metrics")
+    with filter_cols[1]:
+        low, high = index.score_bounds
+        if low < high:
+            score_range = st.slider("Score range", low, high, (low, high), key=f"{key}_scores")
+        else:
+            score_range = None
+    with filter_cols[2]:
+        failing_rubric = st.selectbox(
+            "Failing rubric", [None, ANY_RUBRIC] + index.failing_rubrics,
+            format_func=lambda option: "(no filter)" if option is None else option,
+            key=f"{key}_rubric",
+        )
+
+    with get_instrumentation().stage("filter_results", rows=len(index.cases)):
+        case_ids = index.filter_case_ids(metrics, score_range, failing_rubric)
+
+    page_cols = st.columns(2)
+    with page_cols[0]:
+        page_size = st.selectbox(
+            "Cases per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE), key=f"{key}_page_size"
+        )
+    num_pages = max(1, -(-len(case_ids) // page_size))
+    with page_cols[1]:
+        page = st.number_input("Page", min_value=1, max_value=num_pages, value=1, step=1, key=f"{key}_page")
+    st.caption(f"{len(case_ids)} of {len(index.case_ids)} cases match · page {min(page, num_pages)} of {num_pages}")
+
+    with get_instrumentation().stage("render_page") as span:
+        visible = page_slice(case_ids, int(page), page_size)
+        span["rows"] = len(visible)
+        for case_index in visible:
+            case_rows = index.case_rows(case_index)
+            case_verdicts = index.verdict_rows(case_index)
+            with st.expander(f"Case #{case_index + 1}", expanded=True):
+                for response_index, candidate_rows in case_rows.groupby("response_index", sort=True):
+                    st.subheader("Candidate Response")
+                    candidate_verdicts = case_verdicts[case_verdicts["response_index"] == response_index]
+
+                    for row in candidate_rows.itertuples(index=False):
+                        st.markdown(f"**Metric:** `{row.metric_name}`")
+
+                        if not pd.isna(row.score):
+                            st.markdown(f"**Score:** {row.score}")
+
+                        if row.pairwise_choice:
+                            st.markdown(f"**Pairwise Choice:** {row.pairwise_choice}")
+
+                        if row.explanation:
+                            st.info(f"**Explanation:** {row.explanation}")
+
+                        metric_verdicts = candidate_verdicts[candidate_verdicts["metric_name"] == row.metric_name]
+                        if len(metric_verdicts):
+                            st.write("---")
+                            st.markdown("#### Rubric Verdicts")
+                            st.table(verdict_display_table(metric_verdicts))
+
+
+def render_summary_tables(index: ResultIndex):
+    """Draws the local score statistics, histograms, rubric pass rates and win rates."""
+    import streamlit as st
+
+    tables = index.summary_tables()
+    st.dataframe(tables["metrics"], hide_index=True)
+
+    for metric_name, histogram in tables["histograms"].groupby("metric_name", sort=True):
+        st.caption(f"Score distribution: `{metric_name}`")
+        labels = [f"{left:.2f}–{right:.2f}" for left, right in zip(histogram["bin_left"], histogram["bin_right"])]
+        st.bar_chart(pd.DataFrame({"count": histogram["count"].to_numpy()}, index=labels))
+
+    if len(tables["rubrics"]):
+        st.markdown("#### Rubric Pass Rates")
+        st.dataframe(tables["rubrics"], hide_index=True)
+
+    if len(tables["pairwise"]):
+        st.markdown("#### Pairwise Win Rates")
+        st.dataframe(tables["pairwise"], hide_index=True)
+
+
+def render_timings():
+    """Sidebar panel with the pipeline's stage timings and counters."""
+    import streamlit as st
+
+    instrumentation = get_instrumentation()
+    with st.sidebar.expander("Pipeline Timings", expanded=False):
+        snapshot = instrumentation.snapshot()
+        if snapshot["stages"]:
+            st.dataframe(
+                pd.DataFrame(snapshot["stages"]).T.drop(columns="buckets"),
+                width="stretch",
+            )
+        if snapshot["counters"]:
+            st.json(snapshot["counters"])
+        st.download_button("Prometheus metrics", instrumentation.to_prometheus(), file_name="metrics.prom")
+        st.download_button("JSON", instrumentation.to_json(indent=2), file_name="metrics.json")
+
+
+def render_run_comparison(comparison, k: int = 20, key: str = "comparison"):
+    """Draws the per-metric shifts, top score regressions and flipped verdicts of a run_diff.RunComparison."""
+    import streamlit as st
+
+    metrics = comparison.metrics
+    st.dataframe(metrics, hide_index=True)
+    significant = metrics.loc[metrics["significant"].fillna(False).to_numpy()]
+    for row in significant.itertuples(index=False):
+        direction = "dropped" if row.mean_delta < 0 or row.verdicts_regressed > row.verdicts_fixed else "improved"
+        st.caption(f"`{row.metric_name}` {direction} significantly (α = {comparison.alpha}).")
+
+    metric_name = st.selectbox("Metric", [ALL_METRICS] + list(metrics["metric_name"]), key=f"{key}_metric")
+    metric_name = None if metric_name == ALL_METRICS else metric_name
+    st.markdown("#### Top Regressions")
+    st.dataframe(comparison.top_regressions(k, metric_name), hide_index=True)
+
+    flips = comparison.flips
+    if metric_name is not None:
+        flips = flips.loc[(flips["metric_name"] == metric_name).to_numpy()]
+    if len(flips):
+        st.markdown("#### Flipped Rubric Verdicts")
+        by_rubric = (
+            flips.groupby(["metric_name", "rubric_id", "direction"], observed=True).size().unstack(fill_value=0)
+        )
+        st.dataframe(by_rubric.reindex(columns=["regressed", "fixed"], fill_value=0))
+        regressed = flips.loc[(flips["direction"] == "regressed").to_numpy()]
+        st.dataframe(regressed.head(k), hide_index=True)
@@ -0,0 +1,89 @@
+# Collapses duplicate rows before they reach the judge and fans the verdicts
+# back out to every original row.
+
+import json
+
+import pandas as pd
+from pydantic.v1 import BaseModel
+
+from eval_results import build_evaluation_result
+from instrumentation import get_instrumentation
+
+# Free-text columns compared after whitespace/case normalization; every other
+# column (reference, tool declarations, ...) must match exactly.
+NORMALIZED_COLUMNS = ["prompt", "response", "context"]
+
+
+class DedupStats(BaseModel):
+    total_rows: int
+    unique_rows: int
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Share of rows that didn't need their own judge call."""
+        if not self.total_rows:
+            return 0.0
+        return 1 - self.unique_rows / self.total_rows
+
+
+def _exact_key(value) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def row_hashes(dataset: pd.DataFrame) -> pd.Series:
+    """Returns a uint64 hash per row, equal for rows that are duplicates."""
+    keys = {}
+    for column in dataset.columns:
+        values = dataset[column]
+        if column in NORMALIZED_COLUMNS:
+            keys[column] = (
+                values.fillna("").astype(str)
+                .str.replace(r"\s+", " ", regex=True)
+                .str.strip()
+                .str.casefold()
+            )
+        elif values.dtype == object:
+            keys[column] = values.map(_exact_key)
+        else:
+            keys[column] = values
+    return pd.util.hash_pandas_object(pd.DataFrame(keys, index=dataset.index), index=False)
+
+
+def deduplicate_rows(dataset: pd.DataFrame):
+    """Returns (unique_rows, codes, stats).
+
+    ``unique_rows`` holds the first occurrence of each distinct row and
+    ``codes[i]`` is the position in ``unique_rows`` of original row ``i``.
+    """
+    codes, uniques = pd.factorize(row_hashes(dataset))
+    first_positions = pd.Series(range(len(codes))).groupby(codes).first().to_numpy()
+    unique_rows = dataset.iloc[first_positions].reset_index(drop=True)
+    return unique_rows, codes, DedupStats(total_rows=len(dataset), unique_rows=len(uniques))
+
+
+def evaluate_deduplicated(judge, dataset: pd.DataFrame):
+    """Judges each distinct row once and fans results back out to every row.
+
+    ``judge`` takes a DataFrame and returns its EvaluationResult. Returns
+    (eval_result, stats); the result has one case per original row with
+    eval_case_index remapped to that row, and summaries over all rows.
+    """
+    instrumentation = get_instrumentation()
+    with instrumentation.stage("dedup", rows=len(dataset)):
+        unique_rows, codes, stats = deduplicate_rows(dataset)
+    instrumentation.count("dedup_input_rows", stats.total_rows)
+    instrumentation.count("dedup_unique_rows", stats.unique_rows)
+    if stats.unique_rows == stats.total_rows:
+        return judge(dataset), stats
+
+    unique_result = judge(unique_rows)
+    unique_metric_results = [{} for _ in range(stats.unique_rows)]
+    for case in unique_result.eval_case_results or []:
+        for candidate in case.response_candidate_results or []:
+            unique_metric_results[case.eval_case_index].update(candidate.metric_results or {})
+
+    case_metric_results = [unique_metric_results[code] for code in codes]
+    metric_names = list(dict.fromkeys(name for case in unique_metric_results for name in case))
+    return build_evaluation_result(case_metric_results, metric_names, dataset=dataset), stats
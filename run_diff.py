@@ -0,0 +1,493 @@
+# Run-to-run comparison of stored evaluation results.
+#
+#   save_run(result, dataset, "runs/model-v1")       # result store + row keys
+#   save_run(result, dataset, "runs/model-v2")
+#   comparison = compare_runs("runs/model-v1", "runs/model-v2")
+#   comparison.metrics                 # per-metric shift, CI and p-value
+#   comparison.top_regressions(20)     # rows whose score dropped most
+#   comparison.flips                   # rubric verdicts that changed
+#
+#   python run_diff.py runs/model-v1 runs/model-v2 [--top 20]
+#
+# A run is a result_store directory plus rows.arrow, which gives every case
+# two 64-bit hashes of its dataset row: row_key over the columns that
+# identify the row (prompt, context, ...; not the response being judged)
+# and input_key over every column. Rows of the two runs are paired by
+# row_key (unchanged rows first, repeated keys in order of occurrence) and
+# their results joined on (pair, response_index, metric_name), so row order
+# and row counts may differ between runs; rows present in only one run are
+# counted, not compared. Everything is a hash, a merge or a groupby over the
+# flattened tables, so million-row runs compare in seconds.
+#
+# Aggregate shifts use a paired z-test on the per-row score deltas and
+# McNemar's test on the verdict flips, both in their large-sample normal
+# form. evaluate_changed re-judges only the rows whose input_key is not in
+# a previous run and copies the stored results of the others.
+
+import argparse
+import math
+import os
+from statistics import NormalDist
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from pydantic.v1 import BaseModel
+
+from instrumentation import get_instrumentation, timed
+
+ROWS_FILE = "rows.arrow"
+ROW_COLUMNS = ["eval_case_index", "row_key", "input_key"]
+# Columns that identify a row across runs, when present; the response (what
+# a new model version changes) is deliberately not among them.
+DEFAULT_KEY_COLUMNS = [
+    "prompt",
+    "context",
+    "reference",
+    "developer_instruction",
+    "tool_declarations",
+    "reference_trajectory",
+    "question",
+]
+_NULL = "\x00null"
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _column_hashes(values: pd.Series) -> np.ndarray:
+    if pd.api.types.is_string_dtype(values.dtype) and values.dtype != object:
+        texts = values.to_numpy(dtype=object, na_value=_NULL)
+    else:
+        from agent_traces import canonical_json
+
+        texts = np.array([
+            _NULL if value is None or (isinstance(value, float) and math.isnan(value))
+            else value if isinstance(value, str)
+            else canonical_json(value)
+            for value in values.tolist()
+        ], dtype=object)
+    return pd.util.hash_array(texts, categorize=True)
+
+
+def hash_rows(dataset: pd.DataFrame, columns: list) -> np.ndarray:
+    """One uint64 per row over ``columns`` (order-independent, missing columns count as null)."""
+    hashes = np.full(len(dataset), _FNV_OFFSET, dtype=np.uint64)
+    for column in sorted(columns):
+        name = pd.util.hash_array(np.array([column], dtype=object))[0]
+        if column in dataset:
+            values = _column_hashes(dataset[column])
+        else:
+            values = pd.util.hash_array(np.full(len(dataset), _NULL, dtype=object), categorize=True)
+        hashes = (hashes ^ values ^ name) * _FNV_PRIME
+    return hashes
+
+
+def row_identity(dataset: pd.DataFrame, key_columns: list = None) -> pd.DataFrame:
+    """ROW_COLUMNS for each row of ``dataset``, eval_case_index being its position."""
+    if key_columns is None:
+        key_columns = [column for column in DEFAULT_KEY_COLUMNS if column in dataset]
+        if not key_columns:
+            key_columns = [column for column in dataset.columns if column != "response"]
+    return pd.DataFrame({
+        "eval_case_index": np.arange(len(dataset), dtype=np.int64),
+        "row_key": hash_rows(dataset, key_columns),
+        "input_key": hash_rows(dataset, list(dataset.columns)),
+    })
+
+
+def write_row_keys(rows: pd.DataFrame, directory: str):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    os.makedirs(directory, exist_ok=True)
+    table = pa.Table.from_pandas(rows[ROW_COLUMNS], preserve_index=False)
+    feather.write_feather(table, os.path.join(directory, ROWS_FILE), compression="uncompressed")
+
+
+def save_run(result, dataset: pd.DataFrame, directory: str, key_columns: list = None) -> tuple:
+    """save_result_store plus the row keys compare_runs joins on. Returns (cases, verdicts)."""
+    from result_store import save_result_store
+
+    cases, verdicts = save_result_store(result, directory)
+    write_row_keys(row_identity(dataset.reset_index(drop=True), key_columns), directory)
+    return cases, verdicts
+
+
+def load_run(directory: str) -> tuple:
+    """(cases, verdicts, rows) Arrow tables of a run written by save_run."""
+    import pyarrow as pa
+
+    from result_store import load_result_store
+
+    path = os.path.join(directory, ROWS_FILE)
+    if not os.path.exists(path):
+        raise ValueError(f"'{directory}' has no {ROWS_FILE}; save it with run_diff.save_run.")
+    cases, verdicts = load_result_store(directory)
+    rows = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return cases, verdicts, rows
+
+
+def _mix(keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Combines two uint64 arrays into one 64-bit key per row."""
+    return (keys ^ (values.astype(np.uint64) * _GOLDEN)) * _FNV_PRIME
+
+
+def _unique_keys(keys: np.ndarray) -> np.ndarray:
+    """Makes repeated keys distinct by mixing in their occurrence number."""
+    if pd.Index(keys).is_unique:
+        return keys
+    occurrence = pd.Series(keys).groupby(keys, sort=False).cumcount().to_numpy()
+    return _mix(keys, occurrence)
+
+
+def _match(base_keys: np.ndarray, new_keys: np.ndarray) -> tuple:
+    """Positions (base, new) of equal keys; a repeated key only matches its first row."""
+    new_first = np.flatnonzero(~pd.Index(new_keys).duplicated())
+    found = pd.Index(new_keys[new_first]).get_indexer(base_keys)
+    found[pd.Index(base_keys).duplicated()] = -1
+    base_positions = np.flatnonzero(found >= 0)
+    return base_positions, new_first[found[base_positions]]
+
+
+def pair_rows(base_rows: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    """Pairs the rows of two runs: base_case_index, new_case_index, row_key, input_changed.
+
+    Rows pair up by row_key, the n-th occurrence of a key in one run with the
+    n-th in the other; rows whose whole input is unchanged pair first, so
+    repeated prompts don't get crossed.
+    """
+    base_rows = base_rows.sort_values("eval_case_index", kind="stable", ignore_index=True)
+    new_rows = new_rows.sort_values("eval_case_index", kind="stable", ignore_index=True)
+    base_left = np.arange(len(base_rows))
+    new_left = np.arange(len(new_rows))
+    pairs = []
+    for input_changed in (False, True):
+        base_keys = base_rows["row_key"].to_numpy()[base_left]
+        new_keys = new_rows["row_key"].to_numpy()[new_left]
+        if not input_changed:
+            base_keys = _mix(base_keys, base_rows["input_key"].to_numpy()[base_left])
+            new_keys = _mix(new_keys, new_rows["input_key"].to_numpy()[new_left])
+        base_positions, new_positions = _match(_unique_keys(base_keys), _unique_keys(new_keys))
+        pairs.append(pd.DataFrame({
+            "base_case_index": base_rows["eval_case_index"].to_numpy()[base_left[base_positions]],
+            "new_case_index": new_rows["eval_case_index"].to_numpy()[new_left[new_positions]],
+            "row_key": base_rows["row_key"].to_numpy()[base_left[base_positions]],
+            "input_changed": input_changed,
+        }))
+        base_left = np.delete(base_left, base_positions)
+        new_left = np.delete(new_left, new_positions)
+    return pd.concat(pairs, ignore_index=True)
+
+
+def _pair_numbers(case_index: np.ndarray, paired_cases: np.ndarray) -> np.ndarray:
+    """Maps case indices to their pair number (-1 for unpaired rows)."""
+    lookup = np.full(int(max(case_index.max(initial=-1), paired_cases.max(initial=-1))) + 1, -1, dtype=np.int64)
+    lookup[paired_cases] = np.arange(len(paired_cases), dtype=np.int64)
+    return lookup[case_index]
+
+
+def _encode(base_table, new_table, column: str) -> tuple:
+    """(names, base codes, new codes) for a string column of two tables; null is -1."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    encoded = []
+    for table in (base_table, new_table):
+        values = table.column(column)
+        if not pa.types.is_dictionary(values.type):
+            values = pc.dictionary_encode(values)
+        encoded.append([
+            (chunk.dictionary.to_pylist(), pc.fill_null(chunk.indices, -1).to_numpy(zero_copy_only=False))
+            for chunk in values.chunks
+        ])
+    names = sorted({value for chunks in encoded for dictionary, _ in chunks for value in dictionary if value is not None})
+    index = pd.Index(names, dtype=object)
+    codes = []
+    for chunks in encoded:
+        parts = [np.zeros(0, dtype=np.int64)]
+        for dictionary, indices in chunks:
+            # The extra last entry maps null (index -1) to -1.
+            mapping = np.append(index.get_indexer(pd.Index(dictionary, dtype=object)), -1)
+            parts.append(mapping[indices])
+        codes.append(np.concatenate(parts).astype(np.int64))
+    return names, codes[0], codes[1]
+
+
+def _column(table, name: str) -> np.ndarray:
+    return table.column(name).to_numpy()
+
+
+def _result_keys(table, paired_cases: np.ndarray, codes: list) -> tuple:
+    """(positions, pairs, keys) of the paired rows of a result table.
+
+    The key combines the pair number, response_index and the given code
+    arrays, so the results of a pair line up with one hash lookup.
+    """
+    pair = _pair_numbers(_column(table, "eval_case_index"), paired_cases)
+    keep = pair >= 0
+    for code in codes:
+        keep &= code >= 0
+    positions = np.flatnonzero(keep)
+    keys = _mix(pair[positions].astype(np.uint64), _column(table, "response_index")[positions])
+    for code in codes:
+        keys = _mix(keys, code[positions])
+    return positions, pair[positions], keys
+
+
+def _unmatched_counts(codes: np.ndarray, matched: np.ndarray, size: int) -> np.ndarray:
+    unmatched = np.ones(len(codes), dtype=bool)
+    unmatched[matched] = False
+    return np.bincount(codes[unmatched & (codes >= 0)], minlength=size)
+
+
+def _two_sided_p(z: float) -> float:
+    if math.isnan(z):
+        return float("nan")
+    return 2 * (1 - NormalDist().cdf(abs(z)))
+
+
+class RunComparison(BaseModel):
+    """Row-level and aggregate differences between a base and a new run."""
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    # One row per (case, response, metric) present in both runs.
+    scores: pd.DataFrame
+    # One row per rubric verdict that changed between the runs.
+    flips: pd.DataFrame
+    # Per-metric aggregate shifts and significance.
+    metrics: pd.DataFrame
+    alpha: float
+    base_cases: Any
+    new_cases: Any
+
+    def top_regressions(self, k: int = 20, metric_name: str = None) -> pd.DataFrame:
+        """The ``k`` rows whose score dropped most, with both runs' explanations."""
+        scores = self.scores
+        mask = scores["delta"].to_numpy() < 0
+        if metric_name is not None:
+            mask &= (scores["metric_name"] == metric_name).to_numpy()
+        worst = scores.loc[mask].sort_values("delta", kind="stable").head(k).reset_index(drop=True)
+        for prefix, table in (("base", self.base_cases), ("new", self.new_cases)):
+            explanations = table.column("explanation").take(worst[f"{prefix}_position"].to_numpy())
+            worst[f"{prefix}_explanation"] = explanations.to_pandas().to_numpy()
+        return worst.drop(columns=["base_position", "new_position"])
+
+
+@timed("compare_runs", rows=lambda comparison: len(comparison.scores))
+def compare_runs(base_dir: str, new_dir: str, alpha: float = 0.05) -> RunComparison:
+    """Compares the run in ``new_dir`` against the run in ``base_dir``."""
+    base_cases, base_verdicts, base_rows = load_run(base_dir)
+    new_cases, new_verdicts, new_rows = load_run(new_dir)
+
+    pairs = pair_rows(base_rows.to_pandas(), new_rows.to_pandas())
+    paired_cases = (pairs["base_case_index"].to_numpy(), pairs["new_case_index"].to_numpy())
+
+    metric_names, base_metrics, new_metrics = _encode(base_cases, new_cases, "metric_name")
+    base_positions, base_pairs, base_keys = _result_keys(base_cases, paired_cases[0], [base_metrics])
+    new_positions, _, new_keys = _result_keys(new_cases, paired_cases[1], [new_metrics])
+    base_matched, new_matched = _match(base_keys, new_keys)
+    pair = base_pairs[base_matched]
+    base_positions, new_positions = base_positions[base_matched], new_positions[new_matched]
+    only_base = _unmatched_counts(base_metrics, base_positions, len(metric_names))
+    only_new = _unmatched_counts(new_metrics, new_positions, len(metric_names))
+
+    base_scores = base_cases.column("score").to_numpy(zero_copy_only=False)[base_positions]
+    new_scores = new_cases.column("score").to_numpy(zero_copy_only=False)[new_positions]
+    valid = np.ones(len(base_positions), dtype=bool)
+    for table, positions in ((base_cases, base_positions), (new_cases, new_positions)):
+        valid &= np.asarray(table.column("score").is_valid())[positions]
+        valid &= np.asarray(table.column("error_message").is_null())[positions]
+    scores = pd.DataFrame({
+        "metric_name": pd.Categorical.from_codes(base_metrics[base_positions], categories=metric_names),
+        "row_key": pairs["row_key"].to_numpy()[pair],
+        "response_index": _column(base_cases, "response_index")[base_positions],
+        "base_case_index": _column(base_cases, "eval_case_index")[base_positions],
+        "new_case_index": _column(new_cases, "eval_case_index")[new_positions],
+        "base_score": base_scores,
+        "new_score": new_scores,
+        "delta": np.where(valid, new_scores - base_scores, np.nan),
+        "input_changed": pairs["input_changed"].to_numpy()[pair],
+        "base_position": base_positions,
+        "new_position": new_positions,
+    })
+
+    flips = _verdict_flips(base_verdicts, new_verdicts, paired_cases, pairs, metric_names)
+    metrics = _metric_shifts(scores, flips, metric_names, only_base, only_new, alpha)
+    return RunComparison(
+        scores=scores, flips=flips, metrics=metrics, alpha=alpha, base_cases=base_cases, new_cases=new_cases
+    )
+
+
+def _verdict_flips(base_verdicts, new_verdicts, paired_cases: tuple, pairs: pd.DataFrame, metric_names: list) -> pd.DataFrame:
+    rubric_ids, base_rubrics, new_rubrics = _encode(base_verdicts, new_verdicts, "rubric_id")
+    # Re-code metric names against the comparison's (verdicts of metrics
+    # without cases get -1 and are skipped).
+    names, base_metrics, new_metrics = _encode(base_verdicts, new_verdicts, "metric_name")
+    recode = np.append(pd.Index(metric_names, dtype=object).get_indexer(pd.Index(names, dtype=object)), -1)
+    matched = []
+    for table, codes, paired in zip(
+        (base_verdicts, new_verdicts), ((base_metrics, base_rubrics), (new_metrics, new_rubrics)), paired_cases
+    ):
+        metric_codes = recode[codes[0]]
+        # Verdicts of unpaired rows or without a rubric id can't be paired.
+        positions, pair, keys = _result_keys(table, paired, [metric_codes, codes[1]])
+        matched.append((positions, pair, keys, metric_codes))
+    (base_positions, pair, base_keys, metric_codes), (new_positions, _, new_keys, _) = matched
+    base_matched, new_matched = _match(base_keys, new_keys)
+    base_positions, new_positions, pair = base_positions[base_matched], new_positions[new_matched], pair[base_matched]
+
+    base_verdict = base_verdicts.column("verdict").to_numpy(zero_copy_only=False)[base_positions]
+    new_verdict = new_verdicts.column("verdict").to_numpy(zero_copy_only=False)[new_positions]
+    flipped = np.flatnonzero(
+        np.asarray(base_verdicts.column("verdict").is_valid())[base_positions]
+        & np.asarray(new_verdicts.column("verdict").is_valid())[new_positions]
+        & (base_verdict != new_verdict)
+    )
+    base_positions, new_positions, pair = base_positions[flipped], new_positions[flipped], pair[flipped]
+    base_verdict = base_verdict[flipped].astype(bool)
+
+    rubric_descriptions = new_verdicts.column("rubric_description").take(new_positions)
+    return pd.DataFrame({
+        "metric_name": pd.Categorical.from_codes(metric_codes[base_positions], categories=metric_names),
+        "rubric_id": np.array(rubric_ids, dtype=object)[base_rubrics[base_positions]],
+        "rubric_description": rubric_descriptions.to_pandas().astype(object).to_numpy(),
+        "row_key": pairs["row_key"].to_numpy()[pair],
+        "base_case_index": _column(base_verdicts, "eval_case_index")[base_positions],
+        "new_case_index": _column(new_verdicts, "eval_case_index")[new_positions],
+        "base_verdict": base_verdict,
+        "new_verdict": ~base_verdict,
+        "direction": np.where(base_verdict, "regressed", "fixed"),
+    })
+
+
+def _metric_shifts(scores, flips, metric_names, only_base, only_new, alpha) -> pd.DataFrame:
+    valid = scores.loc[scores["delta"].notna()]
+    grouped = valid.groupby("metric_name", observed=False, sort=True)
+    stats = pd.DataFrame({
+        "num_paired": grouped.size(),
+        "base_mean": grouped["base_score"].mean(),
+        "new_mean": grouped["new_score"].mean(),
+        "mean_delta": grouped["delta"].mean(),
+        "stdev_delta": grouped["delta"].std(),
+        "num_regressed": grouped["delta"].agg(lambda delta: int((delta < 0).sum())),
+        "num_improved": grouped["delta"].agg(lambda delta: int((delta > 0).sum())),
+    }).reindex(metric_names)
+    stats["num_input_changed"] = (
+        scores.groupby("metric_name", observed=False)["input_changed"].sum().reindex(metric_names)
+    )
+    stats["num_base_only"] = only_base
+    stats["num_new_only"] = only_new
+
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    standard_error = stats["stdev_delta"] / np.sqrt(stats["num_paired"])
+    stats["ci_low"] = stats["mean_delta"] - z * standard_error
+    stats["ci_high"] = stats["mean_delta"] + z * standard_error
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_scores = np.where(
+            standard_error > 0, stats["mean_delta"] / standard_error, np.where(stats["mean_delta"] == 0, 0.0, np.inf)
+        )
+    stats["p_value"] = [
+        _two_sided_p(value) if count > 1 else float("nan")
+        for value, count in zip(z_scores, stats["num_paired"].fillna(0))
+    ]
+
+    # McNemar on verdicts: regressed (pass -> fail) vs fixed (fail -> pass).
+    flip_counts = pd.crosstab(flips["metric_name"], flips["direction"]).reindex(
+        index=metric_names, columns=["regressed", "fixed"], fill_value=0
+    )
+    stats["verdicts_regressed"] = flip_counts["regressed"].to_numpy()
+    stats["verdicts_fixed"] = flip_counts["fixed"].to_numpy()
+    discordant = stats["verdicts_regressed"] + stats["verdicts_fixed"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mcnemar_z = (stats["verdicts_regressed"] - stats["verdicts_fixed"]).abs() / np.sqrt(discordant)
+    stats["verdict_p_value"] = [
+        _two_sided_p(value) if count else float("nan") for value, count in zip(mcnemar_z, discordant)
+    ]
+    stats["significant"] = (stats["p_value"] < alpha) | (stats["verdict_p_value"] < alpha)
+    stats.index.name = "metric_name"
+    return stats.reset_index()
+
+
+def evaluate_changed(
+    evals, metric_names: list, dataset: pd.DataFrame, base_dir: str, out_dir: str = None, key_columns: list = None
+) -> tuple:
+    """Evaluates ``dataset`` reusing the results stored in ``base_dir`` for unchanged rows.
+
+    A row is unchanged when every column (input_key) matches a row of the
+    base run and that run has a valid result for the metric; everything else
+    goes through ``evals.evaluate``. Stored results are matched under the
+    key the judge files them by (eval_results.result_key), so
+    "GENERAL_QUALITY" finds the "general_quality_v1" rows. Returns (cases,
+    verdicts, stats), and saves the new run to ``out_dir`` when given.
+    """
+    from eval_results import result_key
+    from result_store import VERDICT_COLUMNS, _typed_frame, flatten_eval_result, write_result_tables
+
+    dataset = dataset.reset_index(drop=True)
+    rows = row_identity(dataset, key_columns)
+    base_case_table, base_verdict_table, base_row_table = load_run(base_dir)
+    base_cases = base_case_table.to_pandas()
+    base_verdicts = base_verdict_table.to_pandas()
+    base_rows = base_row_table.to_pandas().drop_duplicates("input_key")
+
+    found = pd.Index(base_rows["input_key"].to_numpy()).get_indexer(rows["input_key"].to_numpy())
+    base_index = np.where(found >= 0, base_rows["eval_case_index"].to_numpy()[found], -1)
+
+    case_frames, verdict_frames = [], [pd.DataFrame(columns=VERDICT_COLUMNS)]
+    stats = {"rows": len(dataset), "reused": {}, "judged": {}}
+    instrumentation = get_instrumentation()
+    for metric_name in metric_names:
+        key = result_key(metric_name)
+        metric_cases = base_cases.loc[(base_cases["metric_name"] == key).to_numpy()]
+        usable = metric_cases.loc[metric_cases["score"].notna().to_numpy() & metric_cases["error_message"].isna().to_numpy()]
+        reuse = np.isin(base_index, usable["eval_case_index"].to_numpy()) & (base_index >= 0)
+        mapping = pd.DataFrame({"base_index": base_index[reuse], "new_index": np.flatnonzero(reuse)})
+
+        metric_verdicts = base_verdicts.loc[(base_verdicts["metric_name"] == key).to_numpy()]
+        for frame, frames in ((usable, case_frames), (metric_verdicts, verdict_frames)):
+            copied = mapping.merge(frame, left_on="base_index", right_on="eval_case_index")
+            copied["eval_case_index"] = copied["new_index"]
+            frames.append(copied.drop(columns=["base_index", "new_index"]))
+
+        changed = np.flatnonzero(~reuse)
+        if len(changed):
+            result, _ = evals.evaluate(metric_name, dataset.iloc[changed].reset_index(drop=True))
+            cases, verdicts = flatten_eval_result(result)
+            cases["eval_case_index"] = changed[cases["eval_case_index"].to_numpy()]
+            verdicts["eval_case_index"] = changed[verdicts["eval_case_index"].to_numpy()]
+            case_frames.append(cases)
+            verdict_frames.append(verdicts)
+        stats["reused"][metric_name] = int(reuse.sum())
+        stats["judged"][metric_name] = len(changed)
+        instrumentation.count("run_diff_reused_rows", int(reuse.sum()))
+
+    cases = _typed_frame(dict(pd.concat(case_frames, ignore_index=True)))
+    cases = cases.sort_values("eval_case_index", kind="stable", ignore_index=True)
+    verdicts = _typed_frame(dict(pd.concat(verdict_frames, ignore_index=True)))
+    verdicts = verdicts.sort_values("eval_case_index", kind="stable", ignore_index=True)
+    if out_dir is not None:
+        write_result_tables(cases, verdicts, out_dir)
+        write_row_keys(rows, out_dir)
+    return cases, verdicts, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compares two stored evaluation runs.")
+    parser.add_argument("base", help="baseline run directory")
+    parser.add_argument("new", help="new run directory")
+    parser.add_argument("--top", type=int, default=20, help="regressions to list")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    comparison = compare_runs(args.base, args.new, alpha=args.alpha)
+    pd.set_option("display.width", 200)
+    print(comparison.metrics.to_string(index=False))
+    print()
+    print(comparison.top_regressions(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# Estimates a metric's mean score from a stratified random sample that grows
+# until the confidence interval is tight enough, instead of judging every row.
+#
+#   plan = SamplingPlan(stratify_by="category", target_half_width=0.02, max_rows=5000)
+#   estimate, result = evaluate_sampled(AdaptiveRubricEvals(), "GENERAL_QUALITY", dataset, plan)
+#   estimate.mean, estimate.ci_low, estimate.ci_high, estimate.stop_reason
+#
+# Each stratum is shuffled once with the plan's seed and consumed in order, so
+# every round adds fresh rows (sampling without replacement) and a run is
+# reproducible from (dataset, plan). Rounds are allocated to strata in
+# proportion to their size. The estimate is the stratified mean, with a
+# finite-population-corrected normal interval. A stratum whose sampled rows
+# all fail leaves the mean undefined, so sampling stops there
+# ("cannot_estimate") instead of judging the rest of the budget.
+
+import math
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from pydantic.v1 import BaseModel
+
+from eval_results import merge_evaluation_results, result_key
+from instrumentation import get_instrumentation
+
+MISSING_STRATUM = "__missing__"
+
+
+class SamplingPlan(BaseModel):
+    # Dataset column to stratify by; None samples the dataset as one stratum.
+    stratify_by: str = None
+    initial_batch: int = 200
+    # Each round judges ``growth`` times as many rows as the previous one.
+    growth: float = 2.0
+    max_batch: int = 20_000
+    # Stop once the CI half-width is at most this...
+    target_half_width: float = 0.02
+    confidence: float = 0.95
+    # ...or once this many rows have been judged (None: no budget).
+    max_rows: int = None
+    # Strata need this many valid scores before the CI counts as reliable.
+    min_per_stratum: int = 5
+    seed: int = 0
+
+
+class SampledEstimate(BaseModel):
+    metric_name: str
+    mean: float = None
+    half_width: float = None
+    ci_low: float = None
+    ci_high: float = None
+    confidence: float
+    rows_total: int
+    rows_judged: int
+    rows_valid: int
+    # "target_reached", "budget_exhausted", "population_exhausted" or
+    # "cannot_estimate" (some stratum has no valid score to estimate from).
+    stop_reason: str
+    # Provenance: the plan, the dataset rows judged (in judging order, which
+    # is also the case order of the returned EvaluationResult), per-stratum
+    # statistics and the estimate after every round.
+    plan: dict
+    sampled_row_indices: list
+    strata: list
+    history: list
+
+
+def _stratum_labels(dataset: pd.DataFrame, stratify_by: str) -> pd.Series:
+    if stratify_by is None:
+        return pd.Series(["all"] * len(dataset), index=dataset.index, dtype=object)
+    if stratify_by not in dataset.columns:
+        raise ValueError(f"Dataset has no column '{stratify_by}' to stratify by.")
+    return dataset[stratify_by].astype(object).where(dataset[stratify_by].notna(), MISSING_STRATUM).astype(str)
+
+
+def _allocate(batch: int, remaining: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Splits ``batch`` rows across strata in proportion to ``weights``,
+    never taking more than a stratum has left (largest-remainder rounding)."""
+    allocation = np.zeros(len(remaining), dtype=np.int64)
+    target = min(batch, int(remaining.sum()))
+    while allocation.sum() < target:
+        left = target - int(allocation.sum())
+        capacity = remaining - allocation
+        share = np.where(capacity > 0, weights, 0.0)
+        share = share / share.sum() * left
+        whole = np.minimum(np.floor(share).astype(np.int64), capacity)
+        allocation += whole
+        if whole.sum() == 0:
+            # Every share is fractional: one row each to the largest.
+            fraction = np.where(capacity > 0, share, -1.0)
+            allocation[np.argsort(-fraction, kind="stable")[:left]] += 1
+    return allocation
+
+
+def stratified_estimate(scores: pd.DataFrame, population: pd.Series, confidence: float) -> dict:
+    """Stratified mean and CI half-width from per-row scores.
+
+    ``scores`` has "stratum" and "score" (NaN for failed rows); ``population``
+    maps stratum -> number of rows in the full dataset.
+    """
+    valid = scores.dropna(subset=["score"])
+    stats = valid.groupby("stratum")["score"].agg(["count", "mean", "var"])
+    stats = stats.reindex(population.index)
+    weights = population / population.sum()
+
+    sampled = stats["count"].fillna(0)
+    if (sampled == 0).any():
+        # An unsampled stratum leaves the estimate undefined.
+        return {"mean": None, "half_width": None, "strata": stats, "weights": weights}
+
+    mean = float((weights * stats["mean"]).sum())
+    fpc = 1 - sampled / population
+    variance = float((weights ** 2 * stats["var"].fillna(0) / sampled * fpc).sum())
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return {"mean": mean, "half_width": z * math.sqrt(variance), "strata": stats, "weights": weights}
+
+
+def evaluate_sampled(evals, metric_name: str, dataset: pd.DataFrame = None, plan: SamplingPlan = None):
+    """Judges growing stratified samples of ``dataset`` until ``plan`` says stop.
+
+    ``evals`` is an AdaptiveRubricEvals / StaticRubricEvals. Returns
+    (SampledEstimate, EvaluationResult over the sampled rows).
+    """
+    plan = plan or SamplingPlan()
+    if dataset is None:
+        dataset = evals.get_dataset_for_metric(metric_name)
+    dataset = dataset.reset_index(drop=True)
+
+    labels = _stratum_labels(dataset, plan.stratify_by)
+    population = labels.value_counts().sort_index()
+    strata = list(population.index)
+    rng = np.random.default_rng(plan.seed)
+    # One shuffled queue of row positions per stratum.
+    queues = [rng.permutation(np.flatnonzero(labels.to_numpy() == stratum)) for stratum in strata]
+    taken = np.zeros(len(strata), dtype=np.int64)
+    weights = population.to_numpy(dtype=float)
+
+    instrumentation = get_instrumentation()
+    budget = plan.max_rows if plan.max_rows is not None else len(dataset)
+    batch = plan.initial_batch
+    sampled_rows = []
+    results = []
+    score_frames = []
+    history = []
+    estimate = {"mean": None, "half_width": None}
+    stop_reason = "population_exhausted"
+    key = None
+
+    while True:
+        remaining = np.array([len(q) for q in queues]) - taken
+        room = min(batch, budget - len(sampled_rows))
+        if remaining.sum() == 0:
+            stop_reason = "population_exhausted"
+            break
+        if room <= 0:
+            stop_reason = "budget_exhausted"
+            break
+
+        allocation = _allocate(room, remaining, weights)
+        rows = np.concatenate([queues[i][taken[i]:taken[i] + allocation[i]] for i in range(len(strata))])
+        taken += allocation
+
+        with instrumentation.stage("sampling_round", rows=len(rows)):
+            result, _ = evals.evaluate(metric_name, dataset.iloc[rows].reset_index(drop=True))
+        results.append(result)
+        sampled_rows.extend(rows.tolist())
+        if key is None:
+            # Results come back under the resolved name ("general_quality_v1").
+            key = result_key(metric_name, result)
+
+        round_scores = np.full(len(rows), np.nan)
+        for case in result.eval_case_results or []:
+            for candidate in case.response_candidate_results or []:
+                metric_result = (candidate.metric_results or {}).get(key)
+                if metric_result is not None and metric_result.error_message is None and metric_result.score is not None:
+                    round_scores[case.eval_case_index] = float(metric_result.score)
+        score_frames.append(pd.DataFrame({"stratum": labels.to_numpy()[rows], "score": round_scores}))
+
+        scores = pd.concat(score_frames, ignore_index=True)
+        estimate = stratified_estimate(scores, population, plan.confidence)
+        history.append({
+            "round": len(history) + 1,
+            "rows_judged": len(sampled_rows),
+            "mean": estimate["mean"],
+            "half_width": estimate["half_width"],
+        })
+
+        sampled = pd.Series(scores["stratum"].to_numpy()).value_counts().reindex(population.index, fill_value=0)
+        required = np.minimum(plan.min_per_stratum, population)
+        valid_counts = estimate["strata"]["count"].fillna(0)
+        if ((sampled >= required) & (valid_counts == 0)).any():
+            stop_reason = "cannot_estimate"
+            break
+        enough_per_stratum = bool((valid_counts >= required).all())
+        if (
+            estimate["half_width"] is not None
+            and enough_per_stratum
+            and estimate["half_width"] <= plan.target_half_width
+        ):
+            stop_reason = "target_reached"
+            break
+        batch = min(plan.max_batch, max(1, int(math.ceil(batch * plan.growth))))
+
+    scores = pd.concat(score_frames, ignore_index=True) if score_frames else pd.DataFrame(columns=["stratum", "score"])
+    strata_stats = []
+    for stratum in strata:
+        stratum_scores = scores.loc[scores["stratum"] == stratum, "score"]
+        strata_stats.append({
+            "stratum": stratum,
+            "population": int(population[stratum]),
+            "sampled": int(len(stratum_scores)),
+            "valid": int(stratum_scores.notna().sum()),
+            "mean": float(stratum_scores.mean()) if stratum_scores.notna().any() else None,
+            "std": float(stratum_scores.std()) if stratum_scores.notna().sum() > 1 else None,
+        })
+
+    mean, half_width = estimate["mean"], estimate["half_width"]
+    sampled_estimate = SampledEstimate(
+        metric_name=metric_name,
+        mean=mean,
+        half_width=half_width,
+        ci_low=None if mean is None else mean - half_width,
+        ci_high=None if mean is None else mean + half_width,
+        confidence=plan.confidence,
+        rows_total=len(dataset),
+        rows_judged=len(sampled_rows),
+        rows_valid=int(scores["score"].notna().sum()),
+        stop_reason=stop_reason,
+        plan=plan.dict(),
+        sampled_row_indices=sampled_rows,
+        strata=strata_stats,
+        history=history,
+    )
+    return sampled_estimate, merge_evaluation_results(results)
@@ -1,35 +1,49 @@
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
+
 from pydantic.v1 import BaseModel
-from vertexai import Client
-from vertexai import types
-from vertexai._genai.types import MetricPromptBuilder, LLMMetric
-import pandas as pd
 import sys
 
+from client_provider import get_client
+from instrumentation import get_instrumentation
+
+# pandas and vertexai are slow to import, so they're only loaded when an
+# evaluation or the UI actually needs them.
+if TYPE_CHECKING:
+    import pandas as pd
+
 PROJECT_ID='gen-lang-client-0172427287'
 LOCATION='us-central1'
 
-client = Client(project=PROJECT_ID, location=LOCATION)
+def __getattr__(name):
+    # The module-level client is built on first access, not at import.
+    if name == "client":
+        return get_client(PROJECT_ID, LOCATION)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
+# Standard Dataset
+STANDARD_RECORDS = [
+    {
+        "prompt": "Where does Rajib Live.",
+        "response": "Rajib has 27 years of experience.",
+        "baseline_model_response": "Rajib lives in San Jose.",
+        "context" : "Rajib is an architect with expertise in data and engineering space. He has 27 years of experience and lives in San Jose"
+    }
+]
 
-class StaticRubricEvals(BaseModel):
+@lru_cache(maxsize=None)
+def _build_standard_dataset() -> "pd.DataFrame":
+    import pandas as pd
+    return pd.DataFrame(STANDARD_RECORDS)
 
-    class Config:
-        arbitrary_types_allowed = True
-
-    # Standard Dataset
-    standard_dataset = pd.DataFrame([
-        {
-            "prompt": "Where does Rajib Live.",
-            "response": "Rajib has 27 years of experience.",
-            "baseline_model_response": "Rajib lives in San Jose.",
-            "context" : "Rajib is an architect with expertise in data and engineering space. He has 27 years of experience and lives in San Jose"
-        }
-    ])
+@lru_cache(maxsize=None)
+def _build_relevance_metric():
+    from vertexai import types
 
     # Define a custom metric to evaluate relevance
-    relevance_metric = types.LLMMetric(
+    return types.LLMMetric(
         name='context_relevance',
-        prompt_template=MetricPromptBuilder(
+        prompt_template=types.MetricPromptBuilder(
             instruction="Evaluate the response against the context and calculate the relevance score.",
             criteria={
                 "accuracy": "must be grounded to the facts in the context.",
@@ -43,25 +57,97 @@ class StaticRubricEvals(BaseModel):
         )
     )
 
-    def evaluate(self, metric_name: str = "context_relevance"):
-        """Evaluates the dataset using the specified metric."""
+
+class StaticRubricEvals(BaseModel):
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    # Client used for judge calls; defaults to client_provider.get_client().
+    eval_client: Any = None
+    # Optional judge_cache.JudgeCache; only rows missing from it are judged.
+    cache: Any = None
+    # Judge each distinct (whitespace/case-normalized) row only once.
+    dedup: bool = False
+    # row_dedup.DedupStats of the last evaluate() call when dedup is on.
+    last_dedup_stats: Any = None
+    # Optional judge_scheduler.JudgeScheduler adding retries, backoff and
+    # adaptive concurrency to judge calls.
+    scheduler: Any = None
+
+    @property
+    def standard_dataset(self) -> "pd.DataFrame":
+        return _build_standard_dataset()
+
+    @property
+    def relevance_metric(self):
+        return _build_relevance_metric()
+
+    def evaluate(self, metric_name: str = "context_relevance", dataset: "pd.DataFrame" = None):
+        """Evaluates the dataset using the specified metric.
+
+        If no dataset is given, the standard dataset is used.
+        """
+        from vertexai import types
+
+        from evaluation_pipeline import run_judge
         
+        instrumentation = get_instrumentation()
+
         if metric_name == "context_relevance":
              metric = self.relevance_metric
         else:
              metric = getattr(types.RubricMetric, metric_name)
              
         # In this static example, we primarily use standard_dataset
-        dataset = self.standard_dataset
+        if dataset is None:
+            with instrumentation.stage("dataset_selection"):
+                dataset = self.standard_dataset
 
-        eval_result = client.evals.evaluate(
-            dataset=dataset,
-            metrics=[metric]
-        )
+        with instrumentation.stage("evaluate", rows=len(dataset)):
+            eval_result, self.last_dedup_stats = run_judge(
+                self.eval_client or get_client(PROJECT_ID, LOCATION),
+                dataset,
+                metric,
+                cache=self.cache,
+                dedup=self.dedup,
+                scheduler=self.scheduler,
+            )
+        return eval_result, dataset
+
+    def evaluate_metrics(self, metric_names: list, dataset: "pd.DataFrame" = None):
+        """Evaluates the dataset with several metrics at once.
+
+        Prompt-builder metrics such as context_relevance are judged together,
+        with one request per row (see multi_metric.py).
+        """
+        from vertexai import types
+
+        from multi_metric import evaluate_batched
+
+        metrics = [
+            self.relevance_metric if name == "context_relevance" else getattr(types.RubricMetric, name)
+            for name in metric_names
+        ]
+        if dataset is None:
+            dataset = self.standard_dataset
+
+        with get_instrumentation().stage("evaluate", rows=len(dataset)):
+            eval_result = evaluate_batched(
+                self.eval_client or get_client(PROJECT_ID, LOCATION),
+                dataset,
+                metrics,
+                cache=self.cache,
+                dedup=self.dedup,
+                scheduler=self.scheduler,
+            )
         return eval_result, dataset
 
 def display_ui():
     import streamlit as st
+
+    from result_store import flatten_eval_result
+    from results_view import ResultIndex, render_results_page, render_summary_tables, render_timings
     
     st.set_page_config(page_title="Static Rubric Customization", layout="wide")
     st.title("Static Rubric Customization")
@@ -80,7 +166,17 @@ def display_ui():
         evals = StaticRubricEvals()
         return evals.evaluate(metric_name)
 
+    @st.cache_resource
+    def result_index(metric_name):
+        result, _ = run_evaluation(metric_name)
+        return ResultIndex(*flatten_eval_result(result))
+
+    # Filter and page widgets rerun the script, so remember which metric was
+    # evaluated instead of relying on the button staying pressed.
     if st.button("Run Evaluation"):
+        st.session_state["evaluated_metric"] = selected_metric
+
+    if st.session_state.get("evaluated_metric") == selected_metric:
         with st.spinner(f"Running evaluation for {selected_metric}..."):
             try:
                 result, dataset = run_evaluation(selected_metric)
@@ -98,65 +194,21 @@ def display_ui():
                      for i, metric in enumerate(result.summary_metrics):
                             with cols[i]:
                                 st.metric(label=metric.metric_name, value=round(metric.mean_score, 4))
+                     with st.expander("Local Statistics", expanded=False):
+                            render_summary_tables(result_index(selected_metric))
                 else: 
-                     # Pairwise summary is usually not in summary_metrics structured the same way or might need calc
-                     # Vertex AI PairwiseMetric usually populates summary_metrics with win rates if available
-                     # But let's check what is available on result object or just rely on detailed table
-                     pass
+                     # Pairwise results carry no summary_metrics, so compute
+                     # win rates and score statistics locally.
+                     render_summary_tables(result_index(selected_metric))
 
 
                 # Display Detailed Results
                 st.header("Detailed Findings")
                 
-                # If result has eval_case_results (generic)
-                if hasattr(result, 'eval_case_results') and result.eval_case_results:
-                     for case_result in result.eval_case_results:
-                         with st.expander(f"Case #{case_result.eval_case_index + 1}", expanded=True):
-                            
-                            for candidate_result in case_result.response_candidate_results:
-                                st.subheader(f"Candidate Response")
-                                
-                                # Check metric results
-                                if candidate_result.metric_results:
-                                    for metric_name, metric_res in candidate_result.metric_results.items():
-                                        st.markdown(f"**Metric:** `{metric_name}`")
-                                        
-                                        # Pointwise Score
-                                        if hasattr(metric_res, 'score'):
-                                            st.markdown(f"**Score:** {metric_res.score}")
-                                        
-                                        # Pairwise Choice
-                                        if hasattr(metric_res, 'pairwise_choice'):
-                                            st.markdown(f"**Pairwise Choice:** {metric_res.pairwise_choice}")
-
-                                        if hasattr(metric_res, 'explanation') and metric_res.explanation:
-                                            st.info(f"**Explanation:** {metric_res.explanation}")
-
-                                        # Rubric Verdicts (Pointwise)
-                                        if hasattr(metric_res, 'rubric_verdicts') and metric_res.rubric_verdicts:
-                                            st.write("---")
-                                            st.markdown("#### Rubric Verdicts")
-                                            
-                                            # Create a table/dataframe logic for verdicts
-                                            verdict_data = []
-                                            for v in metric_res.rubric_verdicts:
-                                                rubric_desc = "N/A"
-                                                rubric_id = "N/A"
-                                                if v.evaluated_rubric:
-                                                    if v.evaluated_rubric.rubric_id:
-                                                        rubric_id = v.evaluated_rubric.rubric_id
-                                                    if v.evaluated_rubric.content and v.evaluated_rubric.content.property:
-                                                        rubric_desc = v.evaluated_rubric.content.property.description
-                                                
-                                                verdict_data.append({
-                                                    "Verdict": "Pass" if v.verdict else "Fail",
-                                                    "Rubric Description": rubric_desc,
-                                                    "Reasoning": v.reasoning,
-                                                    "ID": rubric_id
-                                                })
-                                            
-                                            st.table(pd.DataFrame(verdict_data))
-                
+                # Only the visible page is rendered; the index is cached
+                # across reruns.
+                render_results_page(result_index(selected_metric), key=selected_metric)
+
                 # PairwiseMetric might return results differently depending on SDK version?
                 # The generic logic above using eval_case_results should handle both if attributes exist.
                 # However, Pairwise results might also be accessible via metrics_table on the result object.
@@ -167,6 +219,8 @@ def display_ui():
             except Exception as e:
                 st.error(f"An error occurred: {e}")
 
+    render_timings()
+
 if __name__ == "__main__":
     # Check if running via streamlit
     try:
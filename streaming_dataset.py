@@ -0,0 +1,135 @@
+# Streams large JSONL eval sets (optionally gzip-compressed) into evaluate()
+# in fixed-size row batches, so peak memory depends on the batch size rather
+# than the file size.
+
+import gzip
+import json
+import sys
+
+import pandas as pd
+from pydantic.v1 import BaseModel
+
+from eval_results import merge_evaluation_results
+
+AGENT_COLUMNS = [
+    "prompt",
+    "response",
+    "developer_instruction",
+    "tool_declarations",
+    "intermediate_events",
+]
+
+# Columns each metric reads, mirroring the datasets picked by
+# AdaptiveRubricEvals.get_dataset_for_metric and StaticRubricEvals.
+METRIC_REQUIRED_COLUMNS = {
+    "GROUNDING": ["prompt", "response", "context"],
+    "FINAL_RESPONSE_MATCH": ["prompt", "response", "reference"],
+    "FINAL_RESPONSE_QUALITY": AGENT_COLUMNS,
+    "HALLUCINATION": AGENT_COLUMNS,
+    "TOOL_USE_QUALITY": AGENT_COLUMNS,
+    "context_relevance": ["prompt", "response", "context"],
+}
+DEFAULT_REQUIRED_COLUMNS = ["prompt", "response"]
+
+
+def required_columns_for_metric(metric_name: str) -> list:
+    return METRIC_REQUIRED_COLUMNS.get(metric_name, DEFAULT_REQUIRED_COLUMNS)
+
+
+def validate_batch(batch: pd.DataFrame, metric_name: str, first_line: int = 1):
+    """Raises ValueError if the batch lacks a column or value the metric needs."""
+    required = required_columns_for_metric(metric_name)
+    missing = [c for c in required if c not in batch.columns]
+    if missing:
+        raise ValueError(
+            f"Metric '{metric_name}' needs columns {missing}, which are missing "
+            f"from the batch starting at line {first_line}."
+        )
+
+    null_rows = batch[required].isna().any(axis=1).to_numpy().nonzero()[0]
+    if len(null_rows):
+        lines = [first_line + int(i) for i in null_rows[:5]]
+        raise ValueError(
+            f"Metric '{metric_name}' needs {required} on every row; "
+            f"values are missing on lines {lines}"
+            + (f" and {len(null_rows) - len(lines)} more." if len(null_rows) > len(lines) else ".")
+        )
+
+
+class JsonlDatasetSource(BaseModel):
+    """Reads a JSONL (or .jsonl.gz) eval set as DataFrames of batch_size rows."""
+
+    path: str
+    batch_size: int = 10000
+    # Keep only these keys of each record; None keeps everything.
+    columns: list = None
+
+    def _open(self):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, "rt", encoding="utf-8")
+        return open(self.path, "r", encoding="utf-8")
+
+    def iter_batches(self):
+        """Yields (first_line_number, DataFrame) for each batch of rows."""
+        records = []
+        first_line = None
+        with self._open() as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if self.columns is not None:
+                    record = {k: record[k] for k in self.columns if k in record}
+                if first_line is None:
+                    first_line = line_number
+                records.append(record)
+                if len(records) >= self.batch_size:
+                    yield first_line, pd.DataFrame.from_records(records)
+                    records, first_line = [], None
+        if records:
+            yield first_line, pd.DataFrame.from_records(records)
+
+
+def iter_evaluate(evals, metric_name: str, source: JsonlDatasetSource):
+    """Evaluates a streamed dataset batch by batch.
+
+    ``evals`` is an AdaptiveRubricEvals or StaticRubricEvals instance. Yields
+    (first_line_number, eval_result, batch) per batch; only one batch is held
+    in memory at a time unless the caller keeps them.
+    """
+    for first_line, batch in source.iter_batches():
+        validate_batch(batch, metric_name, first_line)
+        eval_result, batch = evals.evaluate(metric_name, dataset=batch)
+        yield first_line, eval_result, batch
+
+
+def evaluate_jsonl(evals, metric_name: str, path: str, batch_size: int = 10000):
+    """Evaluates a JSONL file and merges the per-batch results into one.
+
+    Only the required columns are read, and input batches are dropped once
+    judged; the merged result keeps the per-case verdicts.
+    """
+    source = JsonlDatasetSource(
+        path=path,
+        batch_size=batch_size,
+        columns=required_columns_for_metric(metric_name),
+    )
+    return merge_evaluation_results(
+        [eval_result for _, eval_result, _ in iter_evaluate(evals, metric_name, source)]
+    )
+
+
+if __name__ == "__main__":
+    from adaptive_rubric_example import AdaptiveRubricEvals
+
+    if len(sys.argv) < 2:
+        print("Usage: python streaming_dataset.py <dataset.jsonl[.gz]> [METRIC] [BATCH_SIZE]")
+        sys.exit(1)
+
+    dataset_path = sys.argv[1]
+    metric_to_run = sys.argv[2].upper() if len(sys.argv) > 2 else "GENERAL_QUALITY"
+    rows_per_batch = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+
+    print(f"Running evaluation with metric: {metric_to_run} over {dataset_path}")
+    result = evaluate_jsonl(AdaptiveRubricEvals(), metric_to_run, dataset_path, rows_per_batch)
+    print(result.summary_metrics)
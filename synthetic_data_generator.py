@@ -0,0 +1,554 @@
+# Synthetic eval datasets for load testing, in every shape the project uses.
+#
+#   python synthetic_data_generator.py agent --rows 1000000 --out data/agent
+#   python synthetic_data_generator.py pii --rows 5000000 --format parquet --workers 8
+#   python synthetic_data_generator.py autosxs --rows 100000 --format jsonl.gz
+#
+#   frame = generate_rows("grounding", 10_000, seed=3)      # in memory
+#
+# Shapes: standard, grounding, reference, summarization, agent, pii and
+# autosxs (id / question / context / model_a_response / model_b_response).
+# Rows mix good, partly wrong and bad answers so scores spread out, and carry
+# a few label columns describing what was generated (pii_kind, quality, ...).
+#
+# Output is split into shards of --shard-rows rows, one file per shard,
+# written by a pool of worker processes. Each shard is generated and written
+# chunk_rows rows at a time, so memory stays flat however many rows are
+# asked for. Chunk k of shard s is drawn from its own random stream keyed by
+# (seed, shape, s, k), so the same arguments give byte-identical files for
+# any number of workers. A manifest.json next to the shards lists them.
+#
+# Parquet has no column type for the free-form nested values of agent rows;
+# there tool_declarations, intermediate_events and reference_trajectory are
+# stored as JSON strings (AgentTraces.from_dataset reads either form).
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pydantic.v1 import BaseModel
+
+FORMATS = {"jsonl": ".jsonl", "jsonl.gz": ".jsonl.gz", "parquet": ".parquet"}
+CHUNK_ROWS = 10_000
+NESTED_COLUMNS = ["tool_declarations", "intermediate_events", "reference_trajectory"]
+
+# --- vocabulary ---
+COUNTRIES = [
+    ("France", "Paris", "Europe"),
+    ("Japan", "Tokyo", "Asia"),
+    ("Kenya", "Nairobi", "Africa"),
+    ("Canada", "Ottawa", "North America"),
+    ("Brazil", "Brasília", "South America"),
+    ("Australia", "Canberra", "Oceania"),
+    ("Germany", "Berlin", "Europe"),
+    ("India", "New Delhi", "Asia"),
+    ("Egypt", "Cairo", "Africa"),
+    ("Mexico", "Mexico City", "North America"),
+    ("Argentina", "Buenos Aires", "South America"),
+    ("Norway", "Oslo", "Europe"),
+]
+LANDMARKS = [
+    ("Taj Mahal", "India", "Agra"),
+    ("Eiffel Tower", "France", "Paris"),
+    ("Colosseum", "Italy", "Rome"),
+    ("Machu Picchu", "Peru", "the Cusco Region"),
+    ("Great Pyramid of Giza", "Egypt", "Giza"),
+    ("Sydney Opera House", "Australia", "Sydney"),
+    ("Statue of Liberty", "the United States", "New York Harbor"),
+    ("Petra", "Jordan", "the Ma'an Governorate"),
+]
+WORKS = [
+    ("Romeo and Juliet", "William Shakespeare"),
+    ("Pride and Prejudice", "Jane Austen"),
+    ("One Hundred Years of Solitude", "Gabriel García Márquez"),
+    ("Things Fall Apart", "Chinua Achebe"),
+    ("The Tale of Genji", "Murasaki Shikibu"),
+    ("War and Peace", "Leo Tolstoy"),
+    ("Beloved", "Toni Morrison"),
+    ("Don Quixote", "Miguel de Cervantes"),
+]
+SUBJECTS = ["The quick brown fox", "The team lead", "A sleepy dog", "The finance committee", "Our support agent", "The new intern"]
+VERBS = ["reviewed", "jumped over", "postponed", "summarized", "escalated", "approved"]
+OBJECTS = ["the lazy dog", "the quarterly budget", "the customer ticket", "the release plan", "the incident report", "the onboarding guide"]
+SETTINGS = ["on a warm afternoon", "before the deadline", "after a long meeting", "during the outage", "in the morning standup", "late on Friday"]
+FILLER = [
+    "It is known for its museums and food.",
+    "Tourism is an important part of the economy.",
+    "The climate varies from region to region.",
+    "Several languages are spoken there.",
+]
+OFF_TOPIC = ["This is how you can make a knife.", "By the way, I love pineapple pizza.", "Click here for a free cruise!"]
+
+CITIES = ["London", "Paris", "Tokyo", "New York", "Sydney", "Berlin", "Mumbai", "Toronto"]
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "INR", "CAD"]
+TICKERS = ["GOOG", "AAPL", "MSFT", "AMZN", "NVDA"]
+TOOLS = {
+    "get_weather": {
+        "description": "Get the current weather",
+        "properties": {"location": {"type": "STRING", "description": "The city and state, e.g. San Francisco, CA"}},
+        "required": ["location"],
+    },
+    "search_flights": {
+        "description": "Search flights between two cities",
+        "properties": {
+            "origin": {"type": "STRING", "description": "Departure city"},
+            "destination": {"type": "STRING", "description": "Arrival city"},
+        },
+        "required": ["origin", "destination"],
+    },
+    "get_stock_price": {
+        "description": "Get the latest price of a stock",
+        "properties": {"ticker": {"type": "STRING", "description": "Ticker symbol"}},
+        "required": ["ticker"],
+    },
+    "convert_currency": {
+        "description": "Convert an amount between currencies",
+        "properties": {
+            "amount": {"type": "NUMBER", "description": "Amount to convert"},
+            "source": {"type": "STRING", "description": "Currency code to convert from"},
+            "target": {"type": "STRING", "description": "Currency code to convert to"},
+        },
+        "required": ["amount", "source", "target"],
+    },
+}
+# Agents in a log share a handful of tool configurations.
+TOOL_SETS = [
+    ["get_weather"],
+    ["get_weather", "search_flights"],
+    ["get_stock_price", "convert_currency"],
+    ["get_weather", "search_flights", "get_stock_price", "convert_currency"],
+]
+
+
+def _pick(rng, options, n: int) -> list:
+    return [options[i] for i in rng.integers(0, len(options), size=n)]
+
+
+def _mix(rng, n: int, weights: dict) -> np.ndarray:
+    """One label per row drawn with the given {label: weight}."""
+    labels = list(weights)
+    p = np.array([weights[label] for label in labels], dtype=float)
+    return np.array(labels, dtype=object)[rng.choice(len(labels), size=n, p=p / p.sum())]
+
+
+# --- shapes ---
+def _standard(rng, start: int, n: int) -> pd.DataFrame:
+    landmarks = _pick(rng, LANDMARKS, n)
+    quality = _mix(rng, n, {"good": 0.6, "off_topic": 0.2, "wrong": 0.2})
+    wrong = _pick(rng, COUNTRIES, n)
+    off_topic = _pick(rng, OFF_TOPIC, n)
+    prompts, responses = [], []
+    for (name, country, place), label, (other, _, _), extra in zip(landmarks, quality, wrong, off_topic):
+        prompts.append(f"Where is the {name}? Please provide an elaborate answer.")
+        if label == "wrong":
+            responses.append(f"The {name} is in {other}.")
+        else:
+            answer = f"The {name} is in {place}, {country}."
+            responses.append(f"{answer} {extra}" if label == "off_topic" else answer)
+    return pd.DataFrame({"prompt": prompts, "response": responses, "quality": quality})
+
+
+def _grounding(rng, start: int, n: int) -> pd.DataFrame:
+    facts = _pick(rng, COUNTRIES, n)
+    others = _pick(rng, COUNTRIES, n)
+    filler = _pick(rng, FILLER, n)
+    quality = _mix(rng, n, {"grounded": 0.75, "hallucinated": 0.25})
+    prompts, responses, contexts = [], [], []
+    for (country, capital, continent), (_, other_capital, _), extra, label in zip(facts, others, filler, quality):
+        prompts.append(f"What's the capital of {country}?")
+        contexts.append(f"{country} is a country in {continent}. Its capital is {capital}. {extra}")
+        answer = other_capital if label == "hallucinated" and other_capital != capital else capital
+        responses.append(f"{answer} is the capital of {country}.")
+    return pd.DataFrame({"prompt": prompts, "response": responses, "context": contexts, "quality": quality})
+
+
+def _reference(rng, start: int, n: int) -> pd.DataFrame:
+    works = _pick(rng, WORKS, n)
+    others = _pick(rng, WORKS, n)
+    quality = _mix(rng, n, {"exact": 0.3, "partial": 0.3, "verbose": 0.2, "wrong": 0.2})
+    prompts, responses, references = [], [], []
+    for (title, author), (_, other_author), label in zip(works, others, quality):
+        prompts.append(f"Who wrote {title}?")
+        references.append(author)
+        if label == "exact":
+            responses.append(author)
+        elif label == "partial":
+            responses.append(f"{author.split()[-1]} wrote it.")
+        elif label == "verbose":
+            responses.append(f"{title} was written by {author}, one of the best-known writers of their time.")
+        else:
+            responses.append(f"It was written by {other_author}.")
+    return pd.DataFrame({"prompt": prompts, "response": responses, "reference": references, "quality": quality})
+
+
+def _summarization(rng, start: int, n: int) -> pd.DataFrame:
+    lengths = rng.integers(3, 9, size=n)
+    total = int(lengths.sum())
+    sentences = [
+        f"{s} {v} {o} {w}."
+        for s, v, o, w in zip(_pick(rng, SUBJECTS, total), _pick(rng, VERBS, total), _pick(rng, OBJECTS, total), _pick(rng, SETTINGS, total))
+    ]
+    quality = _mix(rng, n, {"faithful": 0.7, "incomplete": 0.2, "unfaithful": 0.1})
+    unfaithful = _pick(rng, OFF_TOPIC, n)
+    prompts, responses = [], []
+    offset = 0
+    for length, label, extra in zip(lengths.tolist(), quality, unfaithful):
+        transcript = sentences[offset:offset + length]
+        offset += length
+        prompts.append("Transcript: " + " ".join(transcript) + "\n\nSummarize the text above.")
+        kept = transcript[:2] if label != "incomplete" else transcript[:1]
+        summary = " and ".join(s[0].lower() + s[1:-1] for s in kept)
+        summary = summary[0].upper() + summary[1:] + "."
+        responses.append(f"{summary} {extra}" if label == "unfaithful" else summary)
+    return pd.DataFrame({"prompt": prompts, "response": responses, "quality": quality})
+
+
+def _tool_declarations(names: list) -> list:
+    return [
+        {
+            "function_declarations": [
+                {
+                    "name": name,
+                    "description": TOOLS[name]["description"],
+                    "parameters": {
+                        "type": "OBJECT",
+                        "properties": TOOLS[name]["properties"],
+                        "required": TOOLS[name]["required"],
+                    },
+                }
+                for name in names
+            ]
+        }
+    ]
+
+
+def _tool_call(rng, name: str) -> tuple:
+    """(prompt, args, result, answer) for one call of tool ``name``."""
+    if name == "get_weather":
+        city = CITIES[rng.integers(len(CITIES))]
+        weather = ["rainy", "sunny", "cloudy", "snowy"][rng.integers(4)]
+        return f"What is the weather in {city}?", {"location": city}, {"weather": weather}, f"The weather in {city} is currently {weather}."
+    if name == "search_flights":
+        origin, destination = (CITIES[i] for i in rng.choice(len(CITIES), size=2, replace=False))
+        flights = int(rng.integers(0, 12))
+        return (
+            f"Find me flights from {origin} to {destination}.",
+            {"origin": origin, "destination": destination},
+            {"flights": flights},
+            f"I found {flights} flights from {origin} to {destination}.",
+        )
+    if name == "get_stock_price":
+        ticker = TICKERS[rng.integers(len(TICKERS))]
+        price = round(float(rng.uniform(50, 900)), 2)
+        return f"How much is {ticker} trading at?", {"ticker": ticker}, {"price": price}, f"{ticker} is trading at {price}."
+    amount = int(rng.integers(1, 1000))
+    source, target = (CURRENCIES[i] for i in rng.choice(len(CURRENCIES), size=2, replace=False))
+    converted = round(amount * float(rng.uniform(0.5, 2.0)), 2)
+    return (
+        f"Convert {amount} {source} to {target}.",
+        {"amount": amount, "source": source, "target": target},
+        {"amount": converted},
+        f"{amount} {source} is {converted} {target}.",
+    )
+
+
+def _call_events(calls: list) -> list:
+    events = []
+    for name, args, result in calls:
+        events.append({"content": {"role": "model", "parts": [{"function_call": {"name": name, "args": args}}]}})
+        events.append({"content": {"role": "user", "parts": [{"function_response": {"name": name, "response": {"name": name, "content": result}}}]}})
+    return events
+
+
+def _agent(rng, start: int, n: int) -> pd.DataFrame:
+    # Rows of the same tool set share one declarations object, as rows
+    # loaded from a log would after interning.
+    declarations = [_tool_declarations(names) for names in TOOL_SETS]
+    set_ids = rng.integers(0, len(TOOL_SETS), size=n)
+    quality = _mix(rng, n, {"correct": 0.7, "wrong_args": 0.1, "repeated_call": 0.1, "no_call": 0.05, "undeclared_tool": 0.05})
+    columns = {name: [] for name in ["prompt", "response", "developer_instruction", "tool_declarations", "intermediate_events", "reference_trajectory"]}
+    for set_id, label in zip(set_ids.tolist(), quality):
+        names = TOOL_SETS[set_id]
+        name = names[rng.integers(len(names))]
+        prompt, args, result, answer = _tool_call(rng, name)
+        calls = [(name, args, result)]
+        if label == "wrong_args":
+            wrong_args = args
+            while wrong_args == args:
+                _, wrong_args, wrong_result, answer = _tool_call(rng, name)
+            calls = [(name, wrong_args, wrong_result)]
+        elif label == "repeated_call":
+            calls = calls * 2
+        elif label == "no_call":
+            calls = []
+            answer = "I'm not able to look that up right now."
+        elif label == "undeclared_tool":
+            calls = [("web_search", {"query": prompt}, {"results": []})]
+            answer = "I couldn't find anything."
+        columns["prompt"].append(prompt)
+        columns["response"].append(answer)
+        columns["developer_instruction"].append("You are a helpful assistant that uses tools to answer questions.")
+        columns["tool_declarations"].append(declarations[set_id])
+        columns["intermediate_events"].append(_call_events(calls))
+        columns["reference_trajectory"].append([{"tool_name": name, "tool_input": args}])
+    frame = pd.DataFrame(columns)
+    frame["quality"] = quality
+    return frame
+
+
+def luhn_numbers(rng, valid: np.ndarray, digits: int = 16) -> list:
+    """Card-like digit strings; Luhn-valid where ``valid`` is True."""
+    n = len(valid)
+    number = rng.integers(0, 10, size=(n, digits))
+    number[:, 0] = rng.choice([4, 5], size=n)
+    # Counting from the check digit, every second digit is doubled.
+    payload = number[:, :-1].copy()
+    doubled = payload[:, (digits - 2) % 2::2] * 2
+    payload[:, (digits - 2) % 2::2] = np.where(doubled > 9, doubled - 9, doubled)
+    check = (10 - payload.sum(axis=1) % 10) % 10
+    number[:, -1] = np.where(valid, check, (check + rng.integers(1, 10, size=n)) % 10)
+    text = (number + 48).astype(np.uint8).tobytes().decode("ascii")
+    return [text[i:i + digits] for i in range(0, n * digits, digits)]
+
+
+def ssn_numbers(rng, valid: np.ndarray) -> list:
+    """SSN-shaped strings; invalid ones use a 000/666/9xx area, 00 group or 0000 serial."""
+    n = len(valid)
+    area = rng.integers(1, 900, size=n)
+    area[area == 666] = 667
+    group = rng.integers(1, 100, size=n)
+    serial = rng.integers(1, 10000, size=n)
+    broken = rng.integers(0, 5, size=n)
+    invalid = ~valid
+    area = np.where(invalid & (broken == 0), 0, area)
+    area = np.where(invalid & (broken == 1), 666, area)
+    area = np.where(invalid & (broken == 2), rng.integers(900, 1000, size=n), area)
+    group = np.where(invalid & (broken == 3), 0, group)
+    serial = np.where(invalid & (broken == 4), 0, serial)
+    return [f"{a:03d}-{g:02d}-{s:04d}" for a, g, s in zip(area.tolist(), group.tolist(), serial.tolist())]
+
+
+def _format_card(number: str, style: int) -> str:
+    if style == 0:
+        return number
+    separator = "-" if style == 1 else " "
+    return separator.join(number[i:i + 4] for i in range(0, len(number), 4))
+
+
+def _pii(rng, start: int, n: int) -> pd.DataFrame:
+    kinds = _mix(
+        rng,
+        n,
+        {"none": 0.4, "ssn_valid": 0.15, "ssn_invalid": 0.1, "card_valid": 0.15, "card_invalid": 0.1, "ssn_and_card": 0.1},
+    )
+    ssn = ssn_numbers(rng, kinds != "ssn_invalid")
+    cards = luhn_numbers(rng, kinds != "card_invalid")
+    styles = rng.integers(0, 3, size=n).tolist()
+    names = _pick(rng, ["Rajib", "Maria", "Wei", "Aisha", "Tom", "Priya"], n)
+    plain = _pick(rng, [f"The {name} is in {country}." for name, country, _ in LANDMARKS], n)
+    prompts, responses = [], []
+    for kind, number, card, style, name, text in zip(kinds, ssn, cards, styles, names, plain):
+        prompts.append(f"What are the details of {name}")
+        card = _format_card(card, style)
+        if kind == "none":
+            responses.append(text)
+        elif kind.startswith("ssn_") and kind != "ssn_and_card":
+            responses.append(f"{name}'s SSN is {number}.")
+        elif kind.startswith("card_"):
+            responses.append(f"Card on file for {name}: {card}")
+        else:
+            responses.append(f"{name}'s SSN is {number} and credit card is {card}")
+    return pd.DataFrame({"prompt": prompts, "response": responses, "pii_kind": kinds})
+
+
+def _autosxs(rng, start: int, n: int) -> pd.DataFrame:
+    facts = _pick(rng, COUNTRIES, n)
+    filler = _pick(rng, FILLER, n)
+    others = _pick(rng, COUNTRIES, n)
+    # Which model gives the better answer.
+    winner = _mix(rng, n, {"model_a": 0.45, "model_b": 0.35, "tie": 0.2})
+    columns = {name: [] for name in ["id", "question", "context", "model_a_response", "model_b_response", "category"]}
+    for i, ((country, capital, continent), extra, (_, other_capital, _), label) in enumerate(zip(facts, filler, others, winner)):
+        good = f"The capital of {country} is {capital}."
+        weak = f"I believe it is {other_capital}." if other_capital != capital else f"Maybe {capital}?"
+        columns["id"].append(f"sxs-{start + i:010d}")
+        columns["question"].append(f"What is the capital of {country}?")
+        columns["context"].append(f"{country} is a country in {continent}. Its capital is {capital}. {extra}")
+        columns["model_a_response"].append(weak if label == "model_b" else good)
+        columns["model_b_response"].append(weak if label == "model_a" else good)
+        columns["category"].append(continent)
+    return pd.DataFrame(columns)
+
+
+SHAPES = {
+    "standard": _standard,
+    "grounding": _grounding,
+    "reference": _reference,
+    "summarization": _summarization,
+    "agent": _agent,
+    "pii": _pii,
+    "autosxs": _autosxs,
+}
+
+
+def generate_chunk(shape: str, rows: int, seed: int = 0, shard: int = 0, chunk: int = 0, start: int = 0) -> pd.DataFrame:
+    """``rows`` rows of ``shape`` from the random stream of (seed, shape, shard, chunk).
+
+    ``start`` is the global row number of the first row (used for ids).
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown shape '{shape}', expected one of {sorted(SHAPES)}")
+    rng = np.random.default_rng([seed, list(SHAPES).index(shape), shard, chunk])
+    return SHAPES[shape](rng, start, rows)
+
+
+def generate_rows(shape: str, rows: int, seed: int = 0, chunk_rows: int = CHUNK_ROWS) -> pd.DataFrame:
+    """``rows`` rows in memory.
+
+    These are the first rows of a dataset written with the same seed and
+    chunk_rows as long as ``rows <= shard_rows``; later shards are seeded
+    differently.
+    """
+    chunks = [
+        generate_chunk(shape, min(chunk_rows, rows - offset), seed, 0, k, offset)
+        for k, offset in enumerate(range(0, rows, chunk_rows))
+    ]
+    return pd.concat(chunks, ignore_index=True) if chunks else generate_chunk(shape, 0, seed)
+
+
+class _ShardWriter:
+    """Appends DataFrame chunks to one JSONL, gzipped JSONL or Parquet file."""
+
+    def __init__(self, path: str, file_format: str):
+        self.path = path
+        self.format = file_format
+        self._file = None
+        self._parquet = None
+
+    def write(self, frame: pd.DataFrame):
+        if self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            frame = frame.copy()
+            for column in NESTED_COLUMNS:
+                if column in frame:
+                    frame[column] = [json.dumps(value, ensure_ascii=False) for value in frame[column]]
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+            return
+        if self._file is None:
+            if self.format == "jsonl.gz":
+                # mtime=0 keeps the output byte-identical between runs.
+                self._file = gzip.GzipFile(self.path, "wb", mtime=0)
+            else:
+                self._file = open(self.path, "wb")
+        self._file.write(frame.to_json(orient="records", lines=True, force_ascii=False).encode("utf-8"))
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def write_shard(shape: str, path: str, file_format: str, shard: int, start: int, rows: int, seed: int, chunk_rows: int) -> dict:
+    """Generates and writes one shard, chunk by chunk. Returns its manifest entry."""
+    writer = _ShardWriter(path, file_format)
+    try:
+        for k, offset in enumerate(range(0, rows, chunk_rows)):
+            writer.write(generate_chunk(shape, min(chunk_rows, rows - offset), seed, shard, k, start + offset))
+    finally:
+        writer.close()
+    return {"path": os.path.basename(path), "shard": shard, "first_row": start, "rows": rows}
+
+
+class GeneratorConfig(BaseModel):
+    shape: str
+    rows: int
+    out_dir: str
+    format: str = "jsonl"
+    shard_rows: int = 100_000
+    chunk_rows: int = CHUNK_ROWS
+    seed: int = 0
+    max_workers: int = os.cpu_count() or 1
+
+
+def write_dataset(config: GeneratorConfig) -> dict:
+    """Writes ``config.rows`` rows as shards under ``config.out_dir``.
+
+    Returns the manifest, which is also saved as manifest.json.
+    """
+    if config.shape not in SHAPES:
+        raise ValueError(f"Unknown shape '{config.shape}', expected one of {sorted(SHAPES)}")
+    if config.format not in FORMATS:
+        raise ValueError(f"Unknown format '{config.format}', expected one of {sorted(FORMATS)}")
+    os.makedirs(config.out_dir, exist_ok=True)
+
+    shards = []
+    for shard, start in enumerate(range(0, config.rows, config.shard_rows)):
+        path = os.path.join(config.out_dir, f"{config.shape}-{shard:05d}{FORMATS[config.format]}")
+        shards.append((config.shape, path, config.format, shard, start, min(config.shard_rows, config.rows - start), config.seed, config.chunk_rows))
+
+    if config.max_workers <= 1 or len(shards) <= 1:
+        entries = [write_shard(*args) for args in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=config.max_workers) as pool:
+            entries = list(pool.map(write_shard, *zip(*shards)))
+
+    manifest = {
+        "shape": config.shape,
+        "format": config.format,
+        "rows": config.rows,
+        "seed": config.seed,
+        "shard_rows": config.shard_rows,
+        "chunk_rows": config.chunk_rows,
+        "shards": entries,
+    }
+    with open(os.path.join(config.out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Writes sharded synthetic eval datasets.")
+    parser.add_argument("shape", choices=sorted(SHAPES))
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--out", default=None, help="output directory (default: synthetic_data/<shape>)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="jsonl")
+    parser.add_argument("--shard-rows", type=int, default=100_000)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    config = GeneratorConfig(
+        shape=args.shape,
+        rows=args.rows,
+        out_dir=args.out or os.path.join("synthetic_data", args.shape),
+        format=args.format,
+        shard_rows=args.shard_rows,
+        chunk_rows=args.chunk_rows,
+        seed=args.seed,
+        max_workers=args.workers,
+    )
+    started = time.perf_counter()
+    manifest = write_dataset(config)
+    elapsed = time.perf_counter() - started
+    print(
+        f"wrote {manifest['rows']} {config.shape} rows in {len(manifest['shards'])} shard(s) "
+        f"to {config.out_dir} in {elapsed:.1f}s ({manifest['rows'] / elapsed:,.0f} rows/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
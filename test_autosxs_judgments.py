@@ -0,0 +1,28 @@
+from autosxs_judgments import OVERALL, JudgmentAggregator
+
+
+def _total(aggregator) -> int:
+    return int(aggregator.counts[OVERALL].sum())
+
+
+def test_finished_shard_without_trailing_newline_counts_every_row(tmp_path):
+    shard = tmp_path / "judgments.jsonl"
+    shard.write_bytes(b'{"choice": "A"}\n{"choice": "B"}\n{"choice": "A"}')
+
+    aggregator = JudgmentAggregator().update(str(shard))
+    assert _total(aggregator) == 3
+    assert aggregator.update(str(shard)).counts[OVERALL].tolist() == [2, 1, 0]
+
+
+def test_partially_written_line_is_read_once_complete(tmp_path):
+    shard = tmp_path / "judgments.jsonl"
+    shard.write_bytes(b'{"choice": "A"}\n{"choice": "B", "id": 1')
+    aggregator = JudgmentAggregator().update(str(shard))
+    assert _total(aggregator) == 1
+
+    with open(shard, "ab") as f:
+        f.write(b'2}\n{"choice": "tie"}')
+    aggregator.update(str(shard))
+    with open(shard, "ab") as f:
+        f.write(b'\n{"choice": "A"}\n')
+    assert aggregator.update(str(shard)).counts[OVERALL].tolist() == [2, 1, 1]
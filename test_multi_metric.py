@@ -0,0 +1,15 @@
+from fake_evals_client import FakeClient
+from static_rubric_customization import StaticRubricEvals
+
+
+def test_evaluate_batched_summarizes_prebuilt_rubric_under_resolved_name():
+    evals = StaticRubricEvals(eval_client=FakeClient(rubrics_per_case=4))
+    result, dataset = evals.evaluate_metrics(["context_relevance", "GENERAL_QUALITY"])
+
+    summaries = {summary.metric_name: summary for summary in result.summary_metrics}
+    assert set(summaries) == {"context_relevance", "general_quality_v1"}
+    for summary in summaries.values():
+        assert summary.num_cases_total == len(dataset)
+        assert summary.mean_score is not None
+    for case in result.eval_case_results:
+        assert set(case.response_candidate_results[0].metric_results) == set(summaries)
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from reference_metrics import REFERENCE_METRIC_NAMES, char_ngram_f1, exact_match, rouge_l, score_reference_metrics, token_f1
+from synthetic_data_generator import generate_rows
+
+EDGE_CASES = [
+    ("The cat sat.", "the cat sat"),
+    ("A, an, the!", ""),
+    ("", ""),
+    (None, "nothing"),
+    (float("nan"), None),
+    ("ab", "ab"),
+    ("ab", "ba"),
+    ("Ünïcode ÉTÉ café", "unicode été CAFÉ"),
+    ("İSTANBUL ΟΔΟΣ", "istanbul οδοσ"),
+    ("éa b", "éa   b"),
+    ("x-ray the_thing a.b", "x ray thing a b"),
+    ("one two two three", "two one three two two"),
+]
+
+
+def test_per_row_functions_match_batch_scores():
+    dataset = generate_rows("reference", 1000)[["response", "reference"]]
+    dataset = pd.concat(
+        [dataset, pd.DataFrame(EDGE_CASES, columns=["response", "reference"])], ignore_index=True
+    )
+    batch = score_reference_metrics(dataset)
+
+    functions = [exact_match, token_f1, rouge_l, char_ngram_f1]
+    assert [f.__name__ for f in functions] == REFERENCE_METRIC_NAMES
+    for function in functions:
+        per_row = [function(instance)["score"] for instance in dataset.to_dict("records")]
+        np.testing.assert_array_equal(per_row, batch[function.__name__].to_numpy(), err_msg=function.__name__)
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from adaptive_rubric_example import AdaptiveRubricEvals
+from fake_evals_client import FakeClient
+from result_store import flatten_eval_result
+from run_diff import compare_runs, evaluate_changed, save_run
+
+
+def _dataset(n: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "prompt": [f"Question {i}?" for i in range(n)],
+        "response": [f"Answer {i}." for i in range(n)],
+    })
+
+
+def test_evaluate_changed_reuses_results_stored_under_resolved_name(tmp_path):
+    evals = AdaptiveRubricEvals(eval_client=FakeClient(rubrics_per_case=4))
+    dataset = _dataset(100)
+    result, _ = evals.evaluate("GENERAL_QUALITY", dataset)
+    save_run(result, dataset, str(tmp_path / "base"))
+
+    changed = dataset.copy()
+    changed.loc[::10, "response"] = "A different answer."
+    calls = evals.eval_client.evals.calls
+    cases, verdicts, stats = evaluate_changed(
+        evals, ["GENERAL_QUALITY"], changed, str(tmp_path / "base"), out_dir=str(tmp_path / "new")
+    )
+
+    # The fake keys results like the service: "general_quality_v1".
+    assert set(cases["metric_name"]) == {"general_quality_v1"}
+    assert stats["reused"]["GENERAL_QUALITY"] == 90
+    assert stats["judged"]["GENERAL_QUALITY"] == 10
+    assert evals.eval_client.evals.calls == calls + 1
+
+    rejudged, _ = flatten_eval_result(evals.evaluate("GENERAL_QUALITY", changed)[0])
+    np.testing.assert_array_equal(cases["score"].to_numpy(), rejudged["score"].to_numpy())
+    assert len(verdicts) == 4 * len(changed)
+
+    comparison = compare_runs(str(tmp_path / "base"), str(tmp_path / "new"))
+    metrics = comparison.metrics.set_index("metric_name")
+    assert metrics.loc["general_quality_v1", "num_paired"] == 100
+    assert metrics.loc["general_quality_v1", "num_input_changed"] == 10
+    assert comparison.scores.loc[comparison.scores["delta"] != 0, "input_changed"].all()
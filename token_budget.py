@@ -0,0 +1,328 @@
+# Token budgeting for judge requests, computed locally before anything is
+# dispatched:
+#
+#   budget = TokenBudget(max_prompt_tokens=32_000, oversize="truncate")
+#   plan = plan_requests(dataset, metric, budget)    # batches, flagged rows
+#   estimate_judge_cost(dataset, metrics, budget)    # tokens, $ and time
+#   JudgeScheduler(budget=budget)                    # sends plan.batches
+#
+# Each row's judge prompt is the metric's template with the row's values
+# filled in: the rendered MetricPromptBuilder template for LLM metrics, and
+# for prebuilt rubric metrics (whose templates live server side) the columns
+# the metric reads plus a fixed allowance for the hidden template. Tokens are
+# approximated by counting word pieces of up to four characters and single
+# punctuation marks: close to the ~4 characters per token of subword
+# tokenizers on English text, erring high rather than low, and cheap enough
+# to run as one vectorized regex count per distinct value.
+#
+# Rows whose prompt is longer than max_prompt_tokens are flagged (answered
+# with an error, never sent), truncated (the first of truncate_columns that
+# can absorb the excess is cut) or make planning fail, per ``oversize``. The
+# remaining rows are packed into requests of at most max_batch_rows rows and
+# max_batch_tokens tokens, largest first into the least-loaded request, so
+# request sizes (and latencies) come out balanced.
+
+import heapq
+import json
+import math
+import re
+
+import numpy as np
+import pandas as pd
+from pydantic.v1 import BaseModel
+
+from instrumentation import get_instrumentation
+
+# A word piece of up to 4 characters, or one non-space symbol.
+TOKEN_PATTERN = r"\w{1,4}|[^\w\s]"
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+# Prebuilt rubric metrics send their own (server-side) template around the
+# row's inputs; this is a rough allowance for it.
+RUBRIC_TEMPLATE_TOKENS = 1500
+TRUNCATION_MARKER = " [...truncated]"
+OVERSIZE_POLICIES = ("flag", "truncate", "error")
+
+
+def _text_values(values) -> list:
+    texts = []
+    for value in values:
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            texts.append("")
+        elif isinstance(value, str):
+            texts.append(value)
+        else:
+            # Nested values (conversations, tool calls) go out as JSON.
+            texts.append(json.dumps(value, ensure_ascii=False, default=str))
+    return texts
+
+
+def estimate_tokens(values) -> np.ndarray:
+    """Approximate token count of each value (strings, or anything JSON-serializable)."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    texts = _text_values(values.tolist() if hasattr(values, "tolist") else values)
+    if not texts:
+        return np.zeros(0, dtype=np.int64)
+    # Long contexts repeat across rows; count each distinct text once.
+    codes, uniques = pd.factorize(pd.Series(texts, dtype=object))
+    counts = pc.count_substring_regex(pa.array(uniques.tolist(), pa.large_string()), TOKEN_PATTERN)
+    return counts.to_numpy(zero_copy_only=False).astype(np.int64)[codes]
+
+
+def prompt_template(metric) -> tuple:
+    """(template, input columns) of the judge prompt for ``metric``.
+
+    For prebuilt rubric metrics the template is None and the columns are
+    the ones the metric reads.
+    """
+    template = getattr(metric, "prompt_template", None)
+    if template is not None and not isinstance(template, str):
+        template = str(template)
+    if template:
+        return template, list(dict.fromkeys(_PLACEHOLDER_RE.findall(template)))
+
+    from streaming_dataset import required_columns_for_metric
+
+    return None, required_columns_for_metric(getattr(metric, "name", None) or str(metric))
+
+
+def render_prompt(metric, row: dict) -> str:
+    """The judge prompt for one row, as estimate_prompt_tokens counts it."""
+    template, columns = prompt_template(metric)
+    if template is None:
+        return "\n\n".join(f"## {column}\n{_text_values([row.get(column)])[0]}" for column in columns)
+    return _PLACEHOLDER_RE.sub(
+        lambda match: _text_values([row.get(match.group(1))])[0] if match.group(1) in row else match.group(0),
+        template,
+    )
+
+
+def estimate_prompt_tokens(dataset: pd.DataFrame, metric) -> pd.DataFrame:
+    """Per-row token estimate of the judge prompt, split by source.
+
+    Returns one column per input column the prompt uses, plus "template"
+    and "total", on the dataset's index.
+    """
+    template, columns = prompt_template(metric)
+    if template is None:
+        template_tokens = RUBRIC_TEMPLATE_TOKENS
+        columns = [column for column in columns if column in dataset]
+        # Plus the "## column" heading of each input.
+        template_tokens += 3 * len(columns)
+    else:
+        template_tokens = int(estimate_tokens([_PLACEHOLDER_RE.sub("", template)])[0])
+        columns = [column for column in columns if column in dataset]
+
+    tokens = pd.DataFrame(index=dataset.index)
+    for column in columns:
+        tokens[column] = estimate_tokens(dataset[column])
+    tokens["template"] = template_tokens
+    tokens["total"] = tokens.sum(axis=1).astype(np.int64)
+    return tokens
+
+
+class TokenBudget(BaseModel):
+    # Longest judge prompt allowed per row.
+    max_prompt_tokens: int = 100_000
+    # Per request: at most this many rows and this many prompt tokens.
+    max_batch_rows: int = 10
+    max_batch_tokens: int = 200_000
+    # "flag", "truncate" or "error" for rows over max_prompt_tokens.
+    oversize: str = "flag"
+    # Columns that may be shortened, in order of preference.
+    truncate_columns: list = ["context", "prompt"]
+
+
+class RequestPlan(BaseModel):
+    """How one metric's rows are sent: see plan_requests."""
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    metric_name: str
+    # The dataset to send, with truncated values applied.
+    dataset: pd.DataFrame
+    # Estimated prompt tokens per row, after truncation.
+    tokens: np.ndarray
+    # Row positions per request; flagged rows are in none of them.
+    batches: list
+    # Row positions answered with an error instead of being sent.
+    flagged_rows: np.ndarray
+    truncated_rows: np.ndarray
+    max_prompt_tokens: int
+
+    @property
+    def input_tokens(self) -> int:
+        sent = np.ones(len(self.tokens), dtype=bool)
+        sent[self.flagged_rows] = False
+        return int(self.tokens[sent].sum())
+
+    def flagged_message(self, row: int) -> str:
+        return (
+            f"PromptTooLong: judge prompt of about {int(self.tokens[row])} tokens "
+            f"exceeds the {self.max_prompt_tokens} token limit."
+        )
+
+
+def pack_batches(tokens: np.ndarray, max_batch_tokens: int, max_batch_rows: int) -> list:
+    """Packs row positions into requests under both limits, balancing their token totals.
+
+    Rows go largest first into the currently smallest request (a new one
+    when it's full); a row over max_batch_tokens gets a request of its own.
+    Each request's positions are returned in row order.
+    """
+    if not len(tokens):
+        return []
+    total = int(tokens.sum())
+    # Start from the fewest requests both limits allow.
+    count = max(math.ceil(total / max_batch_tokens), math.ceil(len(tokens) / max_batch_rows), 1)
+    batches = [[] for _ in range(count)]
+    heap = [(0, i) for i in range(count)]
+    for row in np.argsort(-tokens, kind="stable").tolist():
+        size = int(tokens[row])
+        while heap and len(batches[heap[0][1]]) >= max_batch_rows:
+            heapq.heappop(heap)
+        if heap and (heap[0][0] + size <= max_batch_tokens or not batches[heap[0][1]]):
+            load, i = heapq.heappop(heap)
+        else:
+            load, i = 0, len(batches)
+            batches.append([])
+        batches[i].append(row)
+        heapq.heappush(heap, (load + size, i))
+    return [np.sort(np.array(batch, dtype=np.int64)) for batch in batches if batch]
+
+
+def _truncate(text: str, text_tokens: int, keep_tokens: int) -> str:
+    """Cuts ``text`` to about ``keep_tokens`` tokens, marker included."""
+    marker_tokens = int(estimate_tokens([TRUNCATION_MARKER])[0])
+    keep = max(keep_tokens - marker_tokens, 0)
+    length = int(len(text) * keep / max(text_tokens, 1))
+    while length > 0 and int(estimate_tokens([text[:length]])[0]) > keep:
+        length = int(length * 0.9)
+    return text[:length] + TRUNCATION_MARKER
+
+
+def plan_requests(dataset: pd.DataFrame, metric, budget: TokenBudget = None) -> RequestPlan:
+    """Applies ``budget`` to ``dataset`` for one metric.
+
+    Raises ValueError under the "error" policy if any row is oversize.
+    """
+    budget = budget or TokenBudget()
+    if budget.oversize not in OVERSIZE_POLICIES:
+        raise ValueError(f"Unknown oversize policy '{budget.oversize}', expected one of {OVERSIZE_POLICIES}")
+    metric_name = getattr(metric, "name", None) or str(metric)
+    dataset = dataset.reset_index(drop=True)
+    estimate = estimate_prompt_tokens(dataset, metric)
+    tokens = estimate["total"].to_numpy().copy()
+    oversize = np.flatnonzero(tokens > budget.max_prompt_tokens)
+
+    flagged, truncated = [], []
+    if len(oversize) and budget.oversize == "error":
+        raise ValueError(
+            f"{len(oversize)} row(s) exceed {budget.max_prompt_tokens} prompt tokens for '{metric_name}' "
+            f"(first: row {int(oversize[0])}, about {int(tokens[oversize[0]])} tokens)."
+        )
+    if len(oversize) and budget.oversize == "truncate":
+        dataset = dataset.copy()
+        for row in oversize.tolist():
+            excess = int(tokens[row]) - budget.max_prompt_tokens
+            for column in budget.truncate_columns:
+                if column not in estimate or estimate.at[row, column] <= excess:
+                    continue
+                column_tokens = int(estimate.at[row, column])
+                text = _text_values([dataset.at[row, column]])[0]
+                dataset.at[row, column] = _truncate(text, column_tokens, column_tokens - excess)
+                tokens[row] += int(estimate_tokens([dataset.at[row, column]])[0]) - column_tokens
+                truncated.append(row)
+                break
+            else:
+                # No single column can absorb the excess.
+                flagged.append(row)
+    elif len(oversize):
+        flagged = oversize.tolist()
+
+    flagged = np.array(flagged, dtype=np.int64)
+    sendable = np.setdiff1d(np.arange(len(dataset)), flagged)
+    batches = [sendable[batch] for batch in pack_batches(tokens[sendable], budget.max_batch_tokens, budget.max_batch_rows)]
+
+    instrumentation = get_instrumentation()
+    instrumentation.count("token_budget_flagged_rows", len(flagged))
+    instrumentation.count("token_budget_truncated_rows", len(truncated))
+    return RequestPlan(
+        metric_name=metric_name,
+        dataset=dataset,
+        tokens=tokens,
+        batches=batches,
+        flagged_rows=flagged,
+        truncated_rows=np.array(truncated, dtype=np.int64),
+        max_prompt_tokens=budget.max_prompt_tokens,
+    )
+
+
+class JudgePricing(BaseModel):
+    """Price and speed assumptions for estimate_judge_cost; set them for your judge model."""
+
+    input_usd_per_million: float = 0.30
+    output_usd_per_million: float = 2.50
+    # Judge output per row per metric (score plus explanation).
+    output_tokens_per_metric: int = 200
+    # Prebuilt rubric metrics generate and then check rubrics: two judge calls per row.
+    calls_per_rubric_metric: int = 2
+    request_overhead_s: float = 1.0
+    input_tokens_per_s: float = 20_000
+    output_tokens_per_s: float = 200
+    concurrency: int = 16
+
+
+def estimate_judge_cost(dataset: pd.DataFrame, metrics: list, budget: TokenBudget = None, pricing: JudgePricing = None) -> pd.DataFrame:
+    """Requests, tokens, cost and wall time to judge ``dataset`` with ``metrics``.
+
+    Prompt-builder metrics are costed the way evaluate_batched sends them,
+    composed into one prompt per row. One row per request group plus a
+    "total" row.
+    """
+    from multi_metric import build_composite_metric, plan_metric_batches
+
+    pricing = pricing or JudgePricing()
+    rows = []
+    for group in plan_metric_batches(metrics):
+        metric = build_composite_metric(group) if len(group) > 1 else group[0]
+        plan = plan_requests(dataset, metric, budget)
+        template, _ = prompt_template(metric)
+        calls = 1 if template is not None else pricing.calls_per_rubric_metric
+        sent_rows = len(dataset) - len(plan.flagged_rows)
+        input_tokens = plan.input_tokens * calls
+        output_tokens = sent_rows * len(group) * pricing.output_tokens_per_metric * calls
+
+        # Every request takes a fixed overhead plus time proportional to its
+        # tokens; requests run ``concurrency`` at a time.
+        request_seconds = np.array([
+            pricing.request_overhead_s
+            + calls * plan.tokens[batch].sum() / pricing.input_tokens_per_s
+            + calls * len(batch) * len(group) * pricing.output_tokens_per_metric / pricing.output_tokens_per_s
+            for batch in plan.batches
+        ])
+        rows.append({
+            "metrics": "+".join(getattr(m, "name", None) or str(m) for m in group),
+            "rows": len(dataset),
+            "requests": len(plan.batches) * calls,
+            "flagged_rows": len(plan.flagged_rows),
+            "truncated_rows": len(plan.truncated_rows),
+            "max_prompt_tokens": int(plan.tokens.max()) if len(plan.tokens) else 0,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost_usd": (
+                input_tokens * pricing.input_usd_per_million + output_tokens * pricing.output_usd_per_million
+            ) / 1e6,
+            "wall_time_s": (
+                max(request_seconds.sum() / pricing.concurrency, request_seconds.max()) if len(request_seconds) else 0.0
+            ),
+        })
+
+    if rows:
+        # Groups are judged one after the other.
+        total = {column: sum(row[column] for row in rows) for column in rows[0] if column != "metrics"}
+        total.update(metrics="total", rows=len(dataset), max_prompt_tokens=max(row["max_prompt_tokens"] for row in rows))
+        rows.append(total)
+    return pd.DataFrame(rows)